@@ -1,11 +1,21 @@
 # AIST 2025 design script
 # created on: 2026/01/18
-# last change: 2026/01/25
+# last change: 2026/10/19
 
+import sys
 import gdstk
 import numpy as np
 import lib_v6 as lib
 import lib_v6_RF as lib_RF
+sys.path.append("../tools")
+import lib_hash
+import lib_drc
+import lib_electrical
+import lib_enclosure
+import lib_optical
+import lib_overlap
+import lib_pathlength
+import lib_ports
 
 top_cell = gdstk.Cell("TOP_Ren")
 
@@ -116,37 +126,27 @@ top_cell.add(gdstk.Reference(pin_mzm_L50_GC, origin=PINL50GC_03_origin, rotation
 # #---------- right ssc region ----------#
 ssc_right_origin = [CHIP_WIDTH-150, JIANG_HEIGHT]
 ssc_right = lib.new_ssc_cell(lib.LAYER_SiWG, "ssc_right", position='right')
-top_cell.add(
-	# ssc for MZM
-	gdstk.Reference(
-		ssc_right, rotation=-np.pi/2, x_reflection=True,
-		origin=[ ssc_right_origin[0], ssc_right_origin[1] ],
-		columns=1, rows=16, spacing=(0, lib.ssc_pitch)
-	),
-	# ssc for GC array
-	gdstk.Reference(
-		ssc_right, rotation=-np.pi/2, x_reflection=True,
-		origin=[ ssc_right_origin[0]-16*lib.ssc_pitch, ssc_right_origin[1] ],
-		columns=1, rows=22, spacing=(0, lib.ssc_pitch)
-	),
+# ssc for MZM
+ssc_MZM = gdstk.Reference(
+	ssc_right, rotation=-np.pi/2, x_reflection=True,
+	origin=[ ssc_right_origin[0], ssc_right_origin[1] ],
+	columns=1, rows=16, spacing=(0, lib.ssc_pitch)
+)
+# ssc for GC array
+ssc_GC = gdstk.Reference(
+	ssc_right, rotation=-np.pi/2, x_reflection=True,
+	origin=[ ssc_right_origin[0]-16*lib.ssc_pitch, ssc_right_origin[1] ],
+	columns=1, rows=22, spacing=(0, lib.ssc_pitch)
 )
+top_cell.add(ssc_MZM, ssc_GC)
 loop_straight_length = 1 # um
 loop_right = lib.new_loopback_cell(loop_straight_length, lib.LAYER_SiWG, "loopback_right")
 top_cell.add(
 	# loopbacks of ssc for MZM
-	gdstk.Reference(
-		loop_right, rotation=np.pi/2, x_reflection=True,
-		origin=[ ssc_right_origin[0] - lib.ssc_pitch, ssc_right_origin[1] + lib.ssc_length + lib.dicing_length, ]
-	),
-	gdstk.Reference(
-		loop_right, rotation=np.pi/2,
-		origin=[ ssc_right_origin[0] - lib.ssc_pitch*14, ssc_right_origin[1] + lib.ssc_length + lib.dicing_length, ]
-	),
+	gdstk.Reference(loop_right, rotation=np.pi/2, x_reflection=True, origin=lib_ports.port(ssc_MZM, "o1", 1)[0]),
+	gdstk.Reference(loop_right, rotation=np.pi/2, origin=lib_ports.port(ssc_MZM, "o1", 14)[0]),
 	# loopbacks of ssc for GC array
-	gdstk.Reference(
-		loop_right, rotation=np.pi/2, x_reflection=True,
-		origin=[ ssc_right_origin[0] - lib.ssc_pitch*(16+21), ssc_right_origin[1] + lib.ssc_length + lib.dicing_length, ]
-	),
+	gdstk.Reference(loop_right, rotation=np.pi/2, x_reflection=True, origin=lib_ports.port(ssc_GC, "o1", 21)[0]),
 )
 
 # right ssc labels
@@ -154,10 +154,7 @@ ssc_labels = lib.new_ssc_labels_cell(ssc_right_origin, "ssc_right_labels")
 top_cell.add(gdstk.Reference(ssc_labels, origin=(0,0)))
 
 #---------- PIN MZM routing ----------#
-ssc_point = [
-	ssc_right_origin[0],
-	ssc_right_origin[1] + lib.ssc_length + lib.dicing_length,
-]
+ssc_point = lib_ports.port(ssc_MZM, "o1", 0)[0]
 PINL500_01_route = lib.PINL500_01_route_cell(PINL500_01_origin, pin_mzm_L500_end_o, ssc_point, lib.LAYER_SiWG, "PINL500_01_route", right_end=PINL200TERM_02_origin)
 PINL200_01_route = lib.PINL200_01_route_cell(PINL200_01_origin, pin_mzm_L200_end_o, ssc_point, lib.LAYER_SiWG, "PINL200_01_route", right_end=PINL200TERM_02_origin)
 PINL100TERM_02_route = lib.PINL100TERM_02_route_cell(PINL100TERM_02_origin, pin_mzm_L100_TERM_end_o, ssc_point, lib.LAYER_SiWG, "PINL100TERM_02_route")
@@ -171,17 +168,11 @@ top_cell.add(gdstk.Reference(PINL50GC_03_route, origin=(0,0)))
 
 #---------- GC array routing ----------#
 # GC 4x4 array
-ssc_point = [
-	ssc_right_origin[0] - lib.ssc_pitch*(16+21),
-	ssc_right_origin[1] + lib.ssc_length + lib.dicing_length,
-]
+ssc_point = lib_ports.port(ssc_GC, "o1", 21)[0]
 GC4x4_route = lib.GC4x4_route_cell(GC_output_origin, GC_pitch, ssc_point, lib.LAYER_SiWG, "GC4x4_route")
 top_cell.add(gdstk.Reference(GC4x4_route, origin=(0,0)))
 # GC 4x1 output
-ssc_point = [
-	ssc_right_origin[0] - lib.ssc_pitch*(16+21),
-	ssc_right_origin[1] + lib.ssc_length + lib.dicing_length,
-]
+ssc_point = lib_ports.port(ssc_GC, "o1", 21)[0]
 GC4x1output_route = lib.GC4x1output_route_cell(GC4x1_output_origin, GC_pitch, ssc_point, lib.LAYER_SiWG, "GC4x1output_route")
 top_cell.add(gdstk.Reference(GC4x1output_route, origin=(0,0)))
 # GC 1x4 input
@@ -221,3 +212,45 @@ top_cell.add(gdstk.Reference(passive_cell))
 
 lib.LIB.add(top_cell, *top_cell.dependencies(True))
 lib.LIB.write_gds("AIST2025_CR_v6.gds")
+
+# per-cell geometry hashes and chip fingerprint
+lib_hash.write_manifest("AIST2025_CR_v6.gds")
+
+# width / spacing check, markers in AIST2025_CR_v6_drc.gds
+if lib.DRC_RULES_PLACEHOLDER:
+	print("[drc] rule values are placeholders (lib_v6.DRC_RULES), not the foundry rule deck")
+lib_drc.check_gds("AIST2025_CR_v6.gds", lib.DRC_RULES, cache="AIST2025_CR_v6.drc_cache")
+
+# doping, contact and probe window enclosures, markers in AIST2025_CR_v6_enclosure.gds
+lib_enclosure.check_gds("AIST2025_CR_v6.gds", lib.ENCLOSURE_RULES)
+
+# metal over Si waveguide outside the PIN contacts (easily shorted by the Si below)
+lib_overlap.check_gds(
+	"AIST2025_CR_v6.gds", [lib.LAYER_MET], [lib.LAYER_SiWG, lib.LAYER_RIB], [lib.LAYER_CT2PN],
+	name_a="MET", name_b="SiWG/RIB"
+)
+
+# port netlist: connected, exported and open ports of every cell
+lib_ports.check_gds("AIST2025_CR_v6.gds")
+
+# electrical nets through CT2PN / CT2TIN: shorts, opens and pad to pad resistance over the TiN (27 Ohm/sq);
+# the short and open calibration structures are expected
+lib_electrical.check_gds("AIST2025_CR_v6.gds", expected=(Short_01.name, Open_01.name))
+
+# optical nets: every right SSC on the net of its device (ssc labels)
+SSC_DEVICES = {"TR": "CR_PINL200AMZ_TERM", "TL": "CR_PINL100AMZ_TERM", "BR": "CR_PINL200AMZ", "BL": "CR_PINL500AMZ"}
+ssc_terminals = {}
+ssc_expected = {}
+for k, (text, group) in enumerate(lib.ssc_label_map()):
+	ref, element = (ssc_MZM, k) if k < 16 else (ssc_GC, k - 16)
+	ssc_terminals[text] = lib_ports.port(ref, "o1", element)[0]
+	device = loop_right.name if group.startswith("U") else SSC_DEVICES.get(group, GC_T20P0_6A35L10.name)
+	ssc_expected[text] = (group, device)
+lib_optical.check_gds("AIST2025_CR_v6.gds", lib.LAYER_SiWG, ssc_terminals, ssc_expected)
+
+# waveguide length per net (MMIs left out) and the AMZM arm difference against dL
+AMZM_CELLS = [pin_mzm_L200, pin_mzm_L500, pin_mzm_L100_TERM, pin_mzm_L200_TERM, pin_mzm_L50_GC]
+lib_pathlength.check_gds(
+	"AIST2025_CR_v6.gds", lib.LAYER_SiWG, {c.name: lib.AMZM_DELAY_LENGTH for c in AMZM_CELLS},
+	exclude={"AIST_MMI_2x2", "AIST_MMI_1x2"}
+)
@@ -1,9 +1,12 @@
 # AIST 2025 design library
 # created on: 2026/01/13
-# last change: 2026/01/13
+# last change: 2026/10/19
 
+import sys
 import gdstk
 import numpy as np
+sys.path.append("../tools")
+import lib_ports
 
 AIST_PDK = gdstk.read_rawcells("../PDK_Device_Cells_20251112.gds")
 LIB = gdstk.Library()
@@ -25,6 +28,39 @@ LAYER_DW     = 42 # deep window (trench)
 LAYER_SSC    = 53 # ssc box
 LAYER_NODMY  = 60 # no dummy area
 
+# min width / min space (um), checked by tools/lib_drc.py
+# PLACEHOLDERS until the foundry rule values are available: except for the PW
+# space (4 um, asserted by the pad builders), these were set just below the
+# smallest features of this design (noted per layer), so they only catch
+# shapes that get smaller than today's layout, not foundry rule violations.
+DRC_RULES_PLACEHOLDER = True
+DRC_RULES = {
+	LAYER_SiWG:   {"width": 0.15, "space": 0.18}, # placeholder: ssc tip 0.16, MMI output gap 0.19
+	LAYER_RIB:    {"width": 0.25, "space": 0.25}, # placeholder: GC teeth 0.3
+	LAYER_NP:     {"width": 2, "space": 2}, # placeholder
+	LAYER_PP:     {"width": 2, "space": 2}, # placeholder
+	LAYER_NPP:    {"width": 2, "space": 2}, # placeholder
+	LAYER_PPP:    {"width": 2, "space": 2}, # placeholder
+	LAYER_TIN:    {"width": 2, "space": 2}, # placeholder
+	LAYER_CT2PN:  {"width": 2, "space": 2}, # placeholder
+	LAYER_CT2TIN: {"width": 2, "space": 2}, # placeholder
+	LAYER_MET:    {"width": 1.5, "space": 0.3}, # placeholder: label text strokes 1.875, gaps 0.375
+	LAYER_PW:     {"width": 10, "space": 4}, # space: foundry rule; width: placeholder
+	LAYER_SSC:    {"width": 10}, # placeholder
+}
+
+# enclosure (inner inside outer by d um), checked by tools/lib_enclosure.py
+ENCLOSURE_RULES = [
+	{"inner": LAYER_NPP, "outer": LAYER_NP, "enclosure": 0},
+	{"inner": LAYER_PPP, "outer": LAYER_PP, "enclosure": 0},
+	{"inner": LAYER_CT2PN, "outer": [LAYER_NPP, LAYER_PPP], "enclosure": 1},
+	{"inner": [LAYER_NP, LAYER_PP], "outer": LAYER_SiWG, "enclosure": 0.5},
+	{"inner": LAYER_CT2PN, "outer": LAYER_MET, "enclosure": 1},
+	{"inner": LAYER_CT2TIN, "outer": LAYER_TIN, "enclosure": 2}, # MZM heaters 3, 50 Ohm loads 2
+	{"inner": LAYER_CT2TIN, "outer": LAYER_MET, "enclosure": 1},
+	{"inner": LAYER_PW, "outer": LAYER_MET, "enclosure": 5},
+]
+
 # constants
 wg_width = 0.44        # waveguide width (um)
 radius = 10            # waveguide bending radius (um)
@@ -34,6 +70,7 @@ ssc_width_small = 0.16 # ssc small width (um)
 ssc_length = 100       # ssc length (um)
 ssc_pitch = 127        # ssc pitch (um)
 label_size = 50        # label text size (um)
+AMZM_DELAY_LENGTH = 100 # AMZM arm length difference dL (um), checked by tools/lib_pathlength.py
 
 RF_PAD_PITCH = 125
 RF_PAD_GAP = 9
@@ -256,6 +293,9 @@ def new_ssc_cell(layer, cell_name, position='left'):
 		ret_cell.add(rect)
 		rect = gdstk.rectangle(( dicing_length, -10), (dicing_length+length, 10), layer=LAYER_SSC, datatype=0)
 		ret_cell.add(rect)
+		# ports
+		lib_ports.add_port(ret_cell, "facet", (0, 0), np.pi, width_small, layer, external=True)
+		lib_ports.add_port(ret_cell, "o1", (dicing_length+length, 0), 0, width_large, layer)
 	else:
 		path = gdstk.FlexPath((-length-dicing_length, 0), width_large, layer=layer, datatype=0, tolerance=1e-3)
 		path.horizontal(length, width=width_small, relative=True)
@@ -271,6 +311,9 @@ def new_ssc_cell(layer, cell_name, position='left'):
 		ret_cell.add(rect)
 		rect = gdstk.rectangle((-dicing_length, -10), (dicing_length, 10), layer=LAYER_SSC, datatype=0)
 		ret_cell.add(rect)
+		# ports
+		lib_ports.add_port(ret_cell, "facet", (0, 0), 0, width_small, layer, external=True)
+		lib_ports.add_port(ret_cell, "o1", (-length-dicing_length, 0), np.pi, width_large, layer)
 	return ret_cell
 
 def new_loopback_cell(straight_length, layer, cell_name):
@@ -281,6 +324,9 @@ def new_loopback_cell(straight_length, layer, cell_name):
 	o = vertical(o, ssc_pitch-2*(radius+dr), layer, ret_cell)
 	o = arc_UL(o, layer, ret_cell)
 	o = horizontal(o, -straight_length, layer, ret_cell)
+	# ports
+	lib_ports.add_port(ret_cell, "o1", (0, 0), np.pi, wg_width, layer)
+	lib_ports.add_port(ret_cell, "o2", o, np.pi, wg_width, layer)
 	return ret_cell
 
 def new_GC_cell(grating_num, grating_pitch, angle_deg, taper_length, cell_name):
@@ -323,6 +369,8 @@ def new_GC_cell(grating_num, grating_pitch, angle_deg, taper_length, cell_name):
 	NODMY_size = 30
 	no_dummy = gdstk.rectangle((0, -NODMY_size/2), (NODMY_size, NODMY_size/2), layer=LAYER_NODMY, datatype=0)
 	ret_cell.add(no_dummy)
+	# port
+	lib_ports.add_port(ret_cell, "o1", (0, 0), np.pi, wg_width, LAYER_SiWG)
 	return ret_cell
 
 def new_RF_PAD_cell():
@@ -424,6 +472,9 @@ def new_RF_PAD_cell():
 		taper_right_SIG_topleft, taper_right_SIG_topright,
 		taper_right_GND_topleft, taper_right_GND_topright,
 	]
+	# ports
+	for name, (left, right) in zip(("G1", "S1", "G2", "S2", "G3"), zip(ret_points[0::2], ret_points[1::2])):
+		lib_ports.add_port(ret_cell, name, ((left[0]+right[0])/2, origin[1]), np.pi/2, right[0]-left[0], LAYER_MET, external=True)
 	return ret_cell, ret_points
 RF_PAD_cell, RF_PAD_cell_points = new_RF_PAD_cell()
 
@@ -555,6 +606,10 @@ def new_TIN_SERIES_TERM_cell(TIN_width=60, TIN_length=90):
 		]
 		pad_metal = gdstk.rectangle(MET_MIDDLE_corner_botleft, MET_MIDDLE_corner_topright, layer=layer, datatype=0)
 		ret_cell.add(pad_metal)
+	# ports (top edges of the pads)
+	for k, name in enumerate(("G1", "S1", "G2", "S2", "G3")):
+		position = (pad_origin[0] + (k-2)*RF_PAD_PITCH, pad_origin[1] - RF_PAD_taper_length)
+		lib_ports.add_port(ret_cell, name, position, np.pi/2, RF_PAD_size, LAYER_MET, external=True)
 	return ret_cell
 TIN_SERIES_TERM_30Ohm = new_TIN_SERIES_TERM_cell()
 
@@ -568,7 +623,7 @@ def new_PIN_AMZM_cell(PIN_length, cell_name):
 	MMI2x2_BOTRIGHT_CENTER = [+0.55, 0.0]
 	MMI2x2_TOPLEFT_CENTER  = [-0.55, 41.016]
 	MMI2x2_TOPRIGHT_CENTER = [+0.55, 41.016]
-	AMZM_total_delay_length = 100 # um, total optical path difference
+	AMZM_total_delay_length = AMZM_DELAY_LENGTH # um, total optical path difference
 	AMZM_delayloop_length = AMZM_total_delay_length # delay on one side, total delay is doubled to match AMZM_total_delay_length
 	assert AMZM_delayloop_length > 0
 	routing_waveguide_pitch = 5
@@ -633,6 +688,11 @@ def new_PIN_AMZM_cell(PIN_length, cell_name):
 	]
 	ret_cell.add(gdstk.Reference(AIST_PDK["AIST_MMI_2x2"], origin=o, rotation=-np.pi/2)); o[0] += MMI2x2_TOPLEFT_CENTER[1]
 	ret_o = o.copy()
+	# ports
+	lib_ports.add_port(ret_cell, "o1", MZM_BOTLEFT_CENTER, np.pi, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o2", MZM_BOTRIGHT_CENTER, np.pi, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o3", (ret_o[0], ret_o[1] - MMI2x2_TOPLEFT_CENTER[0]), 0, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o4", (ret_o[0], ret_o[1] - MMI2x2_TOPRIGHT_CENTER[0]), 0, wg_width, LAYER_SiWG)
 	## PIN pad ##
 	#----- LAYER_MET = 36 (AlCu contact and metal wire) -----#
 	layer = LAYER_MET
@@ -679,7 +739,7 @@ def new_PIN_AMZM_TERM_cell(PIN_length, cell_name, with_TERM=True):
 	MMI2x2_BOTRIGHT_CENTER = [+0.55, 0.0]
 	MMI2x2_TOPLEFT_CENTER  = [-0.55, 41.016]
 	MMI2x2_TOPRIGHT_CENTER = [+0.55, 41.016]
-	AMZM_total_delay_length = 100 # um, total optical path difference
+	AMZM_total_delay_length = AMZM_DELAY_LENGTH # um, total optical path difference
 	AMZM_delayloop_length = AMZM_total_delay_length # delay on one side, total delay is doubled to match AMZM_total_delay_length
 	assert AMZM_delayloop_length > 0
 	routing_waveguide_pitch = 5
@@ -744,6 +804,11 @@ def new_PIN_AMZM_TERM_cell(PIN_length, cell_name, with_TERM=True):
 	]
 	ret_cell.add(gdstk.Reference(AIST_PDK["AIST_MMI_2x2"], origin=o, rotation=-np.pi/2)); o[0] += MMI2x2_TOPLEFT_CENTER[1]
 	ret_o = o.copy()
+	# ports
+	lib_ports.add_port(ret_cell, "o1", MZM_BOTLEFT_CENTER, np.pi, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o2", MZM_BOTRIGHT_CENTER, np.pi, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o3", (ret_o[0], ret_o[1] - MMI2x2_TOPLEFT_CENTER[0]), 0, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o4", (ret_o[0], ret_o[1] - MMI2x2_TOPRIGHT_CENTER[0]), 0, wg_width, LAYER_SiWG)
 	## PAD cell
 	SIG_GND_line_length = PIN_length + 1
 	PAD_cell = PAD_structure(SIG_GND_line_length, RF_PAD_PITCH, [0,0], cell_name+"PAD")
@@ -775,7 +840,7 @@ def new_PIN_AMZM_GC_cell(PIN_length, cell_name, with_TERM=False):
 	MMI1x2_BOT_CENTER  = [0, 0]
 	MMI1x2_TOPLEFT_CENTER  = [-0.55, 15.704]
 	MMI1x2_TOPRIGHT_CENTER = [+0.55, 15.704]
-	AMZM_total_delay_length = 100 # um, total optical path difference
+	AMZM_total_delay_length = AMZM_DELAY_LENGTH # um, total optical path difference
 	AMZM_delayloop_length = AMZM_total_delay_length # delay on one side, total delay is doubled to match AMZM_total_delay_length
 	assert AMZM_delayloop_length > 0
 	routing_waveguide_pitch = 5
@@ -840,6 +905,9 @@ def new_PIN_AMZM_GC_cell(PIN_length, cell_name, with_TERM=False):
 	]
 	ret_cell.add(gdstk.Reference(AIST_PDK["AIST_MMI_1x2"], origin=o, rotation=np.pi/2))
 	ret_o = o.copy()
+	# ports
+	lib_ports.add_port(ret_cell, "o1", MZM_BOTLEFT_CENTER, np.pi, wg_width, LAYER_SiWG)
+	lib_ports.add_port(ret_cell, "o2", ret_o, 0, wg_width, LAYER_SiWG)
 	## PAD cell
 	SIG_GND_line_length = PIN_length + 1
 	PAD_cell = PAD_structure(SIG_GND_line_length, RF_PAD_PITCH, [0,0], cell_name+"PAD")
@@ -1906,6 +1974,31 @@ def port_number(n):
 	binary = binary.replace('1', 'X')
 	return binary
 
+def ssc_label_map():
+	# [(label text, group)] of the right SSCs, from the right; SSCs of one
+	# group belong to one device (one optical net)
+	labels = []
+	def add(text, group):
+		labels.append((f"{len(labels)}{text}", group))
+	def loop_back():
+		group = f"U{len(labels)}"
+		for i in range(2):
+			add("U", group)
+	loop_back()
+	for group in ("TR", "TL", "BR", "BL"): # AMZM-L200-TERM, AMZM-L100-TERM, AMZM-L200, AMZM-L500
+		for suffix in ("o", "iR", "iL"):
+			add(group + suffix, group)
+	loop_back()
+	# GC 4x1 output
+	for i in range(4):
+		add("G4" + {0: "B", 3: "T"}.get(i, ""), f"G4_{i}") # bottom, top
+	# GC 4x4 array
+	for i in range(4): # row (bottom to top in GC array)
+		for j in range(4): # column (left to right in GC array)
+			add("G16" + {0: "L", 3: "R"}.get(j, ""), f"G16_{i}{j}") # left, right
+	loop_back()
+	return labels
+
 def new_ssc_labels_cell(ssc_right_origin, cell_name):
 	ret_cell = gdstk.Cell(cell_name)
 	o = [
@@ -1914,132 +2007,18 @@ def new_ssc_labels_cell(ssc_right_origin, cell_name):
 	]
 	size = 30
 	#----- LAYER_MET = 36 -----#
-	label_index = 0
-	# loop back
-	for i in range(2):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		label_cell = new_label_cell(f"{label_index}U", cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# AMZM-L200-TERM (top right)
-	for j in range(3):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		if   j == 0: text = f"{label_index}TRo"
-		elif j == 1: text = f"{label_index}TRiR"
-		elif j == 2: text = f"{label_index}TRiL"
-		label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# AMZM-L100-TERM (top left)
-	for j in range(3):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		if   j == 0: text = f"{label_index}TLo"
-		elif j == 1: text = f"{label_index}TLiR"
-		elif j == 2: text = f"{label_index}TLiL"
-		label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# AMZM-L200 (bot right)
-	for j in range(3):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		if   j == 0: text = f"{label_index}BRo"
-		elif j == 1: text = f"{label_index}BRiR"
-		elif j == 2: text = f"{label_index}BRiL"
-		label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# AMZM-L100 (bot left)
-	for j in range(3):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		if   j == 0: text = f"{label_index}BLo"
-		elif j == 1: text = f"{label_index}BLiR"
-		elif j == 2: text = f"{label_index}BLiL"
-		label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# loop back
-	for i in range(2):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		label_cell = new_label_cell(f"{label_index}U", cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
-	# GC 4x1 output
-	for i in range(4):
+	for label_index, (text, _) in enumerate(ssc_label_map()):
 		pos = [
 			o[0] - label_index*ssc_pitch,
 			o[1]
 		]
-		text = f"{label_index}G4"
 		label_origin = pos
 		number_origin = (0, size)
-		if i == 0:
-			text += "B" # bottom
-		if i == 3:
-			text += "T" # top
+		if text.endswith("G4T"):
 			label_origin = [pos[0] - 70 + 2.5, pos[1]] # to avoid dicing line
 			number_origin = (0, size - 9)
 		label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
 		number = gdstk.text(port_number(label_index), size, number_origin, layer=LAYER_MET)
 		label_cell.add(*number)
 		ret_cell.add(gdstk.Reference(label_cell, origin=label_origin, rotation=-np.pi/2))
-		label_index += 1
-	# GC 4x4 array
-	for i in range(4): # row (bottom to top in GC array)
-		for j in range(4): # column (left to right in GC array)
-			pos = [
-				o[0] - label_index*ssc_pitch,
-				o[1]
-			]
-			text = f"{label_index}G16"
-			label_origin = pos
-			if j == 0:
-				text += "L" # left
-			if j == 3:
-				text += "R" # right
-			label_cell = new_label_cell(text, cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-			number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-			label_cell.add(*number)
-			ret_cell.add(gdstk.Reference(label_cell, origin=label_origin, rotation=-np.pi/2))
-			label_index += 1
-	# loop back
-	for i in range(2):
-		pos = [
-			o[0] - label_index*ssc_pitch,
-			o[1]
-		]
-		label_cell = new_label_cell(f"{label_index}U", cell_name+f"_{label_index}", size=size, layer=LAYER_MET)
-		number = gdstk.text(port_number(label_index), size, (0,size), layer=LAYER_MET)
-		label_cell.add(*number)
-		ret_cell.add(gdstk.Reference(label_cell, origin=pos, rotation=-np.pi/2))
-		label_index += 1
 	return ret_cell
@@ -1,9 +1,12 @@
 # AIST 2025 design library
 # created on: 2026/01/22
-# last change: 2026/01/22
+# last change: 2026/10/19
 
+import sys
 import gdstk
 import numpy as np
+sys.path.append("../tools")
+import lib_ports
 
 # AIST_PDK = gdstk.read_rawcells("../PDK_Device_Cells_20251112.gds")
 # LIB = gdstk.Library()
@@ -149,6 +152,9 @@ def new_RF_PAD_cell():
 		taper_right_SIG_topleft, taper_right_SIG_topright,
 		taper_right_GND_topleft, taper_right_GND_topright,
 	]
+	# ports (same as lib_v6.new_RF_PAD_cell, both are written as "RF_PAD")
+	for name, (left, right) in zip(("G1", "S1", "G2", "S2", "G3"), zip(ret_points[0::2], ret_points[1::2])):
+		lib_ports.add_port(ret_cell, name, ((left[0]+right[0])/2, origin[1]), np.pi/2, right[0]-left[0], LAYER_MET, external=True)
 	return ret_cell, ret_points
 RF_PAD_cell, RF_PAD_cell_points = new_RF_PAD_cell()
 
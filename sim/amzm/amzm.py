@@ -1,9 +1,13 @@
 # Simulating transmittance of asymmetric MZM
 # created on: 2026/01/21
-# last change: 2026/01/21
+# last change: 2026/10/19
 
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
+import lib_amzm
+sys.path.append("..")
+import lib_render
+import lib_waveguide
 
 phi_num = 6
 phi_list = [np.pi * i/phi_num for i in range(phi_num)]
@@ -17,7 +21,7 @@ color_list = [
 	'darkorchid',
 ]
 
-n_Si = 3.48
+wg_width = 0.44e-6 # m, strip waveguide of the delay line
 dL_list = [ # m, difference of optical path length
 	1e-6,
 	10e-6,
@@ -33,40 +37,16 @@ lamb_max = 1565e-9 # m
 lamb_num = 1000
 lamb = np.linspace(lamb_min, lamb_max, lamb_num)
 
-def amzm_transmittance(lamb, dL, phi):
-	branch1 = 1/np.sqrt(2) # reference path
-	branch2 = 1/np.sqrt(2) * np.exp(1j*2*np.pi*n_Si*dL/lamb + 1j*phi)
-	return np.abs(1/np.sqrt(2) * (branch1 + branch2)) ** 2
-
-def plot(x, y_list, phi_list, dL, color_list, filename):
-	dlamb_FSR = (1550e-9*1550e-9)/(n_Si*dL)
-	# print(f"[debug] dL={dL*1e6:.0f}um, dlamb_FSR={dlamb_FSR*1e9:.5f}nm")
-	# multiple plot on one graph
-	plt.rcParams["font.size"] = 16
-	fig = plt.figure(figsize=(12,6))
-	for i in range(len(y_list)):
-		phi = phi_list[i]
-		y = y_list[i]
-		y_dB = 10*np.log10(y)
-		color = color_list[i]
-		plt.plot(x*1e9, y_dB, color=color, label="$\\phi=\\frac{"+f"{2*i}"+"\\pi}{"+f"{phi_num}"+"}$")
-	plt.legend(loc='right', bbox_to_anchor=(1.2,0.5))
-	plt.xlim([lamb_min*1e9, lamb_max*1e9])
-	plt.ylim([-70, 0])
-	plt.xlabel("Wavelength (nm)")
-	plt.ylabel("Transmittance (dB)")
-	plt.title(f"dL={dL*1e6:.0f}µm, "+"$\\Delta \\lambda_{FSR}="+f"{dlamb_FSR*1e9:.3f}$nm")
-	plt.tight_layout()
-	plt.savefig(filename)
-	# free used memory
-	plt.clf()
-	plt.close()
-	print(f"[out] saved figure as '{filename}'")
-
-for dL in dL_list:
-	y_list = []
-	for i in range(phi_num):
-		phi = phi_list[i]
-		y = amzm_transmittance(lamb, dL, phi)
-		y_list.append(y)
-	plot(lamb, y_list, phi_list, dL, color_list, f"amzm_T_dL{dL*1e6:.0f}um.svg")
+# dispersive effective index of the strip, group index for the FSR
+strip = lib_waveguide.table("strip")
+n_eff = lib_waveguide.n_eff(strip, lamb, wg_width)
+n_g = float(lib_waveguide.n_g(strip, 1550e-9, wg_width))
+
+# all dL x phi x lamb at once, grid["T"][k]: phi x lamb of dL_list[k]
+grid = lib_amzm.transmittance(lamb, dL_list, phi_list, n_eff)
+# one figure per dL, drawn in parallel, unchanged figures skipped ("--png": light previews)
+jobs = [
+	(lib_amzm.plot, (lamb, grid["T"][k], phi_list, dL, color_list, n_g), f"amzm_T_dL{dL*1e6:.0f}um.svg")
+	for k, dL in enumerate(dL_list)
+]
+lib_render.render(jobs, png="--png" in sys.argv)
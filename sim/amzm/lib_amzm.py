@@ -0,0 +1,86 @@
+# Batched transmittance of asymmetric MZM
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# T = |(1 + exp(1j*(2*pi*n*dL/lamb + phi))) / 2|^2 = (1 + cos(dL*k + phi)) / 2,
+# k = 2*pi*n/lamb, over a whole dL x phi x lamb grid at once. With
+# cos(a + b) = cos(a)cos(b) - sin(a)sin(b) the cosines are taken on the
+# dL x lamb and phi axes only; the grid itself is two broadcast products,
+# written in place into the output. The dL axis is cut into chunks of at
+# most chunk grid points, so the temporaries stay small; float32 halves the
+# memory of the output. n is a number or n_eff(lamb), (len(lamb),) (e.g. from
+# sim/lib_waveguide); the FSR takes the group index.
+#
+# usage:
+#   import lib_amzm
+#   grid = lib_amzm.transmittance(lamb, dL, phi)          # m, m, rad
+#   grid["T"][i, j]                                        # T(lamb) of dL[i], phi[j]
+#   lib_amzm.select(grid, dL=100e-6, phi=0)                # nearest grid point
+#   lib_amzm.plot(lamb, grid["T"][i], phi, dL[i], colors, n_g, "T.svg") # matplotlib
+
+import numpy as np
+
+N_SI = 3.48         # Si material index, the former constant index of dL
+CHUNK = 1 << 22     # grid points per chunk (32 MB of float64)
+
+def transmittance(lamb, dL, phi, n=N_SI, dtype=np.float64, chunk=CHUNK):
+	# {"T": (len(dL), len(phi), len(lamb)) array, "dims": ("dL", "phi", "lamb"), "dL", "phi", "lamb"}
+	lamb = np.atleast_1d(np.asarray(lamb, dtype=np.float64))
+	dL = np.atleast_1d(np.asarray(dL, dtype=np.float64))
+	phi = np.atleast_1d(np.asarray(phi, dtype=np.float64))
+	T = np.empty((len(dL), len(phi), len(lamb)), dtype=dtype)
+	theta = np.multiply.outer(dL, 2*np.pi*n/lamb)
+	cos_a = np.cos(theta).astype(dtype)[:, None, :]
+	sin_a = np.sin(theta).astype(dtype)[:, None, :]
+	cos_b = (0.5*np.cos(phi)).astype(dtype)[None, :, None]
+	sin_b = (0.5*np.sin(phi)).astype(dtype)[None, :, None]
+	step = max(1, chunk // max(1, len(phi)*len(lamb)))
+	for start in range(0, len(dL), step):
+		block = T[start:start + step]
+		part = np.empty_like(block)
+		np.multiply(cos_a[start:start + step], cos_b, out=block)
+		np.multiply(sin_a[start:start + step], sin_b, out=part)
+		block -= part
+		block += 0.5
+	return {"T": T, "dims": ("dL", "phi", "lamb"), "dL": dL, "phi": phi, "lamb": lamb}
+
+def select(grid, **coords):
+	# sub-array at the grid points nearest to the given coordinates, e.g.
+	# select(grid, dL=100e-6) -> (phi, lamb) array
+	index = [slice(None)] * len(grid["dims"])
+	for name, value in coords.items():
+		index[grid["dims"].index(name)] = int(np.argmin(np.abs(grid[name] - value)))
+	return grid["T"][tuple(index)]
+
+def fsr(dL, lamb=1550e-9, n_g=N_SI):
+	# free spectral range (m), n_g: group index
+	return lamb**2 / (n_g*np.asarray(dL))
+
+def plot(x, y_list, phi_list, dL, color_list, n_g, filename):
+	# transmittance (dB) of one dL for each phi, saved as filename; n_g: group
+	# index at 1550 nm for the FSR
+	import matplotlib.pyplot as plt # only where figures are drawn
+	phi_num = len(phi_list)
+	dlamb_FSR = fsr(dL, 1550e-9, n_g)
+	# print(f"[debug] dL={dL*1e6:.0f}um, dlamb_FSR={dlamb_FSR*1e9:.5f}nm")
+	# multiple plot on one graph
+	plt.rcParams["font.size"] = 16
+	fig = plt.figure(figsize=(12,6))
+	for i in range(len(y_list)):
+		phi = phi_list[i]
+		y = y_list[i]
+		y_dB = 10*np.log10(y)
+		color = color_list[i]
+		plt.plot(x*1e9, y_dB, color=color, label="$\\phi=\\frac{"+f"{2*i}"+"\\pi}{"+f"{phi_num}"+"}$")
+	plt.legend(loc='right', bbox_to_anchor=(1.2,0.5))
+	plt.xlim([x[0]*1e9, x[-1]*1e9])
+	plt.ylim([-70, 0])
+	plt.xlabel("Wavelength (nm)")
+	plt.ylabel("Transmittance (dB)")
+	plt.title(f"dL={dL*1e6:.0f}µm, "+"$\\Delta \\lambda_{FSR}="+f"{dlamb_FSR*1e9:.3f}$nm")
+	plt.tight_layout()
+	plt.savefig(filename)
+	# free used memory
+	plt.clf()
+	plt.close()
+	print(f"[out] saved figure as '{filename}'")
@@ -0,0 +1,88 @@
+# Simulating the optical paths of AIST2025_CR_v6 from the layout
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# The netlist is read from the GDS (lib_pathlength.circuit_netlist: device
+# ports and the waveguide nets between them), the AMZMs are modelled with
+# their measured arm lengths, and every path between two external ports
+# (SSC facets, GC fibers) is solved at once over the C band. The waveguides
+# take n_eff(lamb) of the strip from the sim/lib_waveguide tables, the PIN
+# phase shifters of the AMZM arms (N++ length of the "<AMZM>_PIN" cell) the
+# rib with the 0.51 um core.
+
+import sys
+import time
+import functools
+import gdstk
+import numpy as np
+import lib_circuit
+sys.path.append("../../tools")
+import lib_pathlength
+sys.path.append("..")
+import lib_waveguide
+
+GDS = "../../design/AIST2025_CR_v6.gds"
+LAYER_SiWG = 30
+LAYER_NPP = 33
+MMIS = {"AIST_MMI_2x2": "2x2", "AIST_MMI_1x2": "1x2"}
+WG_WIDTH = 0.44e-6 # m, strip width (wg_width of the design)
+RIB_WIDTH = 0.51e-6 # m, rib core of the PIN section
+AMZMS = ["CR_PINL200AMZ", "CR_PINL500AMZ", "CR_PINL100AMZ_TERM", "CR_PINL200AMZ_TERM", "CR_PINL50AMZ_GC"]
+
+lamb = np.linspace(1530e-9, 1565e-9, 1000) # m
+
+strip = lib_waveguide.table("strip")
+def strip_index(l):
+	return lib_waveguide.n_eff(strip, l, WG_WIDTH)
+
+rib = lib_waveguide.table("rib")
+def rib_index(l):
+	return lib_waveguide.n_eff(rib, l, RIB_WIDTH)
+
+def pin_length(cell):
+	# um, extent of the N++ stripe along the PIN section
+	box = np.array([p.bounding_box() for p in cell.get_polygons(layer=LAYER_NPP, datatype=0)])
+	return float(np.ptp(box[:, :, 1]))
+
+lib = gdstk.read_gds(GDS)
+top = lib.top_level()[0]
+cells = {cell.name: cell for cell in lib.cells}
+
+# AMZM arms: the two longest nets of each cell with the MMIs left out
+models = {
+	"waveguide": functools.partial(lib_circuit.waveguide, n_eff=strip_index),
+	"ssc_right": lib_circuit.ssc,
+	"GC_T20P0.6A35L10": lib_circuit.grating_coupler,
+	"GC_T20P0.6A35L10_woNODMY": lib_circuit.grating_coupler,
+}
+for name in AMZMS:
+	nets = lib_pathlength.net_lengths(lib_pathlength.device_free_polygons(cells[name], LAYER_SiWG, set(MMIS)))
+	arm1, arm2 = sorted((net["length"] for net in nets), reverse=True)[:2]
+	splitter = "2x2" if any(ref.cell.name == "AIST_MMI_2x2" for ref in cells[name].references) else "1x2"
+	pin = pin_length(cells[name + "_PIN"])
+	models[name] = functools.partial(
+		lib_circuit.amzm, arm1=arm1*1e-6, arm2=arm2*1e-6, splitter=splitter,
+		pin_length=pin*1e-6, pin_n_eff=rib_index, n_eff=strip_index
+	)
+	print(f"[circuit] {name}: arms {arm1:.3f} / {arm2:.3f} um, PIN {pin:.0f} um, {splitter} MMIs")
+
+start = time.time()
+netlist = lib_pathlength.circuit_netlist(top, LAYER_SiWG, set(models) - {"waveguide"})
+for problem in netlist["problems"]:
+	print(f"[circuit] {problem}")
+extracted = time.time()
+result = lib_circuit.solve(netlist, lamb, models)
+solved = time.time()
+
+# peak transmission of every path between two external ports
+for names, S in result["groups"]:
+	for i in range(len(names)):
+		for j in range(i + 1, len(names)):
+			T = np.abs(S[:, j, i])**2
+			if T.max() > 0:
+				k = int(np.argmax(T))
+				print(f"[circuit] {names[i]} -> {names[j]}: {10*np.log10(T[k]):.2f} dB at {lamb[k]*1e9:.2f} nm")
+print(
+	f"[circuit] {len(netlist['instances'])} instances, {len(result['groups'])} subcircuits, {len(lamb)} wavelengths: "
+	f"netlist {extracted - start:.2f} s, solve {solved - extracted:.2f} s"
+)
@@ -0,0 +1,184 @@
+# Frequency domain S-matrix circuit solver
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# A netlist is
+#   {"instances": {name: (model, {parameters})}, "connections": [("a/o2", "b/o1"), ...]}
+# with ports named "<instance>/<port>" (the instance name may hold "/" itself,
+# as the instance paths of lib_ports do). A model is a function
+# model(lamb, **parameters) -> (port names, (len(lamb), n, n) S-matrix),
+# looked up in the models dict when it is given by name (the cell names of a
+# layout netlist).
+#
+# The instances fall apart into independent subcircuits (connected groups);
+# each one is solved on its own, for all wavelengths at once (batched dense
+# solve), so the work grows with the size of the subcircuits and not with
+# the chip. Within a subcircuit, with b = S a and a_i = P b_i on the
+# connected ports (P swaps the two ports of every connection):
+#   b_i = (1 - S_ii P)^-1 S_ie a_e,  S_ext = S_ee + S_ei P (1 - S_ii P)^-1 S_ie
+# Ports left unconnected are the external ports of the result.
+#
+# Units: m for lengths and wavelengths, as sim/amzm.
+
+import numpy as np
+
+N_EFF = 2.35      # effective index of the 440 x 220 nm strip at LAMB0
+N_G = 4.2         # group index of the strip
+LAMB0 = 1550e-9   # m
+LOSS = 2.0        # dB/cm propagation loss
+
+def split_port(name):
+	# "a:0/b:1[2]/o1" -> ("a:0/b:1[2]", "o1")
+	instance, _, port = name.rpartition("/")
+	return instance, port
+
+def two_port(amplitude, names):
+	# (names, S) of a reciprocal two-port with transmission amplitude (len(lamb),)
+	S = np.zeros((len(amplitude), 2, 2), dtype=complex)
+	S[:, 0, 1] = S[:, 1, 0] = amplitude
+	return names, S
+
+def waveguide(lamb, length, n_eff=N_EFF, n_g=N_G, lamb0=LAMB0, loss=LOSS, names=("o1", "o2"), **_):
+	# straight or bent waveguide, first order dispersion around lamb0, or
+	# n_eff(lamb) when n_eff is a function (e.g. a sim/lib_waveguide table)
+	lamb = np.asarray(lamb, dtype=float)
+	n = n_eff(lamb) if callable(n_eff) else n_eff - (n_g - n_eff) * (lamb - lamb0) / lamb0
+	amplitude = 10**(-loss * length * 1e2 / 20) * np.exp(1j*2*np.pi*n*length/lamb)
+	return two_port(amplitude, names)
+
+def phase_shifter(lamb, length, phase=0.0, loss_dB=0.0, **kwargs):
+	# waveguide (PIN section) with an extra phase and insertion loss
+	names, S = waveguide(lamb, length, **kwargs)
+	return names, S * (10**(-loss_dB / 20) * np.exp(1j*phase))
+
+def mmi1x2(lamb, loss_dB=0.0, **_):
+	# o1 -> o2, o3 (equal split)
+	S = np.zeros((len(np.atleast_1d(lamb)), 3, 3), dtype=complex)
+	t = 10**(-loss_dB / 20) / np.sqrt(2)
+	S[:, 1, 0] = S[:, 0, 1] = S[:, 2, 0] = S[:, 0, 2] = t
+	return ("o1", "o2", "o3"), S
+
+def mmi2x2(lamb, loss_dB=0.0, **_):
+	# o1, o2 -> o3, o4: bar 1/sqrt(2), cross 1j/sqrt(2)
+	S = np.zeros((len(np.atleast_1d(lamb)), 4, 4), dtype=complex)
+	t = 10**(-loss_dB / 20) / np.sqrt(2)
+	block = t * np.array([[1, 1j], [1j, 1]])
+	S[:, 2:, :2] = block
+	S[:, :2, 2:] = block.T
+	return ("o1", "o2", "o3", "o4"), S
+
+def grating_coupler(lamb, peak_dB=-5.0, center=1550e-9, bandwidth_1dB=30e-9, **_):
+	# o1 (waveguide) <-> fiber, Gaussian in dB around center
+	lamb = np.asarray(lamb, dtype=float)
+	loss = peak_dB - (2 * (lamb - center) / bandwidth_1dB)**2
+	return two_port(10**(loss / 20) + 0j, ("o1", "fiber"))
+
+def ssc(lamb, loss_dB=1.5, **_):
+	# o1 (waveguide) <-> facet (fiber)
+	return two_port(np.full(len(np.atleast_1d(lamb)), 10**(-loss_dB / 20), dtype=complex), ("o1", "facet"))
+
+def subcircuits(netlist):
+	# [[instance names]] of the independent groups of connected instances
+	parent = {name: name for name in netlist["instances"]}
+	def root(name):
+		while parent[name] != name:
+			parent[name] = parent[parent[name]]
+			name = parent[name]
+		return name
+	for a, b in netlist["connections"]:
+		parent[root(split_port(a)[0])] = root(split_port(b)[0])
+	groups = {}
+	for name in netlist["instances"]:
+		groups.setdefault(root(name), []).append(name)
+	return list(groups.values())
+
+def solve_group(lamb, names, netlist, models):
+	# (external port names, (len(lamb), n, n) S) of one subcircuit
+	blocks = []
+	ports = []
+	for name in names:
+		model, parameters = netlist["instances"][name]
+		model = models[model] if isinstance(model, str) else model
+		found, S = model(lamb, **parameters)
+		blocks.append(S)
+		ports += [f"{name}/{port}" for port in found]
+	index = {port: k for k, port in enumerate(ports)}
+	n = len(ports)
+	S = np.zeros((len(lamb), n, n), dtype=complex)
+	start = 0
+	for block in blocks:
+		size = block.shape[1]
+		S[:, start:start + size, start:start + size] = block
+		start += size
+	pairs = [(index[a], index[b]) for a, b in netlist["connections"] if a in index and b in index]
+	inner = np.array([k for pair in pairs for k in pair], dtype=int)
+	outer = np.setdiff1d(np.arange(n), inner)
+	if not len(inner):
+		return [ports[k] for k in outer], S[:, outer][:, :, outer]
+	# P: swap the two ports of each connection, in the order of inner
+	m = len(inner)
+	P = np.zeros((m, m))
+	P[np.arange(0, m, 2), np.arange(1, m, 2)] = 1
+	P[np.arange(1, m, 2), np.arange(0, m, 2)] = 1
+	S_ii = S[:, inner][:, :, inner]
+	S_ie = S[:, inner][:, :, outer]
+	S_ei = S[:, outer][:, :, inner]
+	S_ee = S[:, outer][:, :, outer]
+	b_i = np.linalg.solve(np.eye(m) - S_ii @ P, S_ie)
+	return [ports[k] for k in outer], S_ee + S_ei @ P @ b_i
+
+def solve(netlist, lamb, models=None):
+	# {"ports": {port: (group, index)}, "groups": [(port names, S)], "lamb": lamb}
+	lamb = np.atleast_1d(np.asarray(lamb, dtype=float))
+	models = models or {}
+	groups = [solve_group(lamb, names, netlist, models) for names in subcircuits(netlist)]
+	ports = {port: (g, k) for g, (names, _) in enumerate(groups) for k, port in enumerate(names)}
+	return {"ports": ports, "groups": groups, "lamb": lamb}
+
+def transmission(result, source, target):
+	# |S(target, source)|^2 over the wavelengths, 0 if not connected
+	g, i = result["ports"][source]
+	h, j = result["ports"][target]
+	if g != h:
+		return np.zeros(len(result["lamb"]))
+	return np.abs(result["groups"][g][1][:, j, i])**2
+
+def subcircuit(netlist, ports, models=None):
+	# model of a netlist, ports {outer name: "<instance>/<port>"}
+	def model(lamb, **_):
+		result = solve(netlist, lamb, models)
+		names = list(ports)
+		S = np.zeros((len(result["lamb"]), len(names), len(names)), dtype=complex)
+		for i, a in enumerate(names):
+			for j, b in enumerate(names):
+				g, k = result["ports"][ports[b]]
+				h, l = result["ports"][ports[a]]
+				if g == h:
+					S[:, i, j] = result["groups"][g][1][:, l, k]
+		return tuple(names), S
+	return model
+
+def amzm(lamb, arm1, arm2, phase=0.0, splitter="2x2", pin_length=0.0, pin_n_eff=None, **kwargs):
+	# asymmetric MZM: splitter, arms of length arm1 / arm2 (m), combiner; ports
+	# o1 (o2) in, o3 (o4) out; "1x2": o1 in, o2 out. Both arms hold a PIN
+	# section of pin_length (m, part of the arm length) with index pin_n_eff
+	# (default: the arm waveguide); the phase is applied on the arm1 section
+	mmi = mmi2x2 if splitter == "2x2" else mmi1x2
+	pin = {**kwargs, "n_eff": pin_n_eff} if pin_n_eff is not None else kwargs
+	netlist = {
+		"instances": {
+			"split": (mmi, {}), "join": (mmi, {}),
+			"pin1": (phase_shifter, {"length": pin_length, "phase": phase, **pin}),
+			"pin2": (waveguide, {"length": pin_length, **pin}),
+			"arm1": (waveguide, {"length": arm1 - pin_length, **kwargs}),
+			"arm2": (waveguide, {"length": arm2 - pin_length, **kwargs}),
+		},
+		"connections": [("pin1/o2", "arm1/o1"), ("pin2/o2", "arm2/o1")],
+	}
+	if splitter == "2x2":
+		netlist["connections"] += [("split/o3", "pin1/o1"), ("split/o4", "pin2/o1"), ("arm1/o2", "join/o1"), ("arm2/o2", "join/o2")]
+		ports = {"o1": "split/o1", "o2": "split/o2", "o3": "join/o3", "o4": "join/o4"}
+	else:
+		netlist["connections"] += [("split/o2", "pin1/o1"), ("split/o3", "pin2/o1"), ("arm1/o2", "join/o2"), ("arm2/o2", "join/o3")]
+		ports = {"o1": "split/o1", "o2": "join/o1"}
+	return subcircuit(netlist, ports)(lamb)
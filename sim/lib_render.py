@@ -0,0 +1,117 @@
+# Parallel, cache-aware figure rendering for simulation sweeps
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# A figure job is (plot function, arguments, filename); the function draws
+# and saves one figure, plot(*arguments, filename). Jobs run in a process
+# pool on the non-interactive Agg backend. Every job is keyed by a hash of
+# its arguments (numpy arrays by content) and of the source of its plot
+# function; the keys of the written figures are kept in RENDER_CACHE next to
+# them, and a figure whose file exists with the same key is not drawn again.
+# So after a change of one sweep parameter only the affected figures are
+# redrawn.
+#
+# png=True writes light PNG previews (PNG_DPI) instead of the vector files,
+# same name with ".png", cached separately.
+#
+# usage:
+#   import lib_render
+#   lib_render.render([(plot, (x, y, dL), "amzm_T_dL100um.svg"), ...])
+#
+# plot functions must be importable (module level, not in a script's
+# __main__ when processes are spawned).
+
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+import numpy as np
+
+RENDER_CACHE = "render_cache.json" # per output directory
+PNG_DPI = 72
+
+def feed(h, value):
+	# hash of nested arguments, arrays by dtype, shape and content
+	if isinstance(value, np.ndarray):
+		h.update(f"{value.dtype}{value.shape}".encode())
+		h.update(np.ascontiguousarray(value).tobytes())
+	elif isinstance(value, (list, tuple)):
+		h.update(f"{type(value).__name__}{len(value)}".encode())
+		for item in value:
+			feed(h, item)
+	elif isinstance(value, dict):
+		h.update(f"dict{len(value)}".encode())
+		for key in sorted(value, key=str):
+			feed(h, key)
+			feed(h, value[key])
+	else:
+		h.update(pickle.dumps(value))
+
+def job_key(plot, arguments, png=False):
+	h = hashlib.blake2b(digest_size=16)
+	try:
+		h.update(inspect.getsource(plot).encode())
+	except (OSError, TypeError):
+		h.update(f"{plot.__module__}.{plot.__qualname__}".encode())
+	feed(h, arguments)
+	h.update(b"png" if png else b"")
+	return h.hexdigest()
+
+def output_name(filename, png):
+	return os.path.splitext(filename)[0] + ".png" if png else filename
+
+def read_cache(directory):
+	path = os.path.join(directory or ".", RENDER_CACHE)
+	if not os.path.exists(path):
+		return {}
+	with open(path) as f:
+		return json.load(f)
+
+def write_cache(directory, cache):
+	with open(os.path.join(directory or ".", RENDER_CACHE), "w") as f:
+		json.dump(cache, f, indent=1, sort_keys=True)
+
+def start_worker(png):
+	import matplotlib
+	matplotlib.use("Agg")
+	if png:
+		matplotlib.rcParams["savefig.dpi"] = PNG_DPI
+
+def draw(job):
+	plot, arguments, filename = job
+	plot(*arguments, filename)
+	return filename
+
+def render(jobs, processes=None, png=False, force=False):
+	# draws the jobs whose figure is missing or out of date; returns
+	# (drawn filenames, skipped filenames)
+	caches = {}
+	todo = []
+	skipped = []
+	for plot, arguments, filename in jobs:
+		filename = output_name(filename, png)
+		directory, name = os.path.split(filename)
+		cache = caches.setdefault(directory, read_cache(directory))
+		key = job_key(plot, arguments, png)
+		if not force and cache.get(name) == key and os.path.exists(filename):
+			skipped.append(filename)
+			continue
+		todo.append(((plot, arguments, filename), directory, name, key))
+	drawn = []
+	def done(results):
+		for (_, directory, name, key), filename in zip(todo, results):
+			caches[directory][name] = key
+			drawn.append(filename)
+	if processes == 1 or len(todo) <= 1:
+		start_worker(png)
+		done(draw(job) for job, _, _, _ in todo)
+	else:
+		with concurrent.futures.ProcessPoolExecutor(processes, initializer=start_worker, initargs=(png,)) as pool:
+			done(pool.map(draw, [job for job, _, _, _ in todo]))
+	for directory, cache in caches.items():
+		write_cache(directory, cache)
+	print(f"[render] {len(drawn)} figure(s) drawn, {len(skipped)} up to date")
+	return drawn, skipped
@@ -0,0 +1,108 @@
+# Effective and group index tables of the Si waveguides
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# n_eff(lamb, width) of the fundamental TE-like mode by the effective index
+# method: the vertical slab(s) of the cross section are solved first (TE),
+# then the lateral slab of the core width with their indices (TM). Each
+# slab is solved for the whole (lamb, width) grid at once, by bisection on
+# u tan(u) = r sqrt(V^2 - u^2) over the fundamental branch, with Sellmeier
+# indices of Si (Li 1980) and SiO2 (Malitson). n_g = n_eff - lamb dn_eff/dlamb
+# along the wavelength axis of the table.
+#
+# The tables are computed once per set of parameters and cached on disk
+# (CACHE_DIR, .npz keyed by a hash of the parameters and TABLE_VERSION),
+# then interpolated bilinearly with numpy, so simulations only pay for the
+# lookups.
+#
+# usage:
+#   import lib_waveguide
+#   strip = lib_waveguide.table("strip")            # 220 nm strip, SiO2 clad
+#   lib_waveguide.n_eff(strip, lamb, 0.44e-6)      # m, m -> (len(lamb),)
+#   lib_waveguide.n_g(strip, lamb, 0.44e-6)
+#
+# Units: m, as the other sim modules.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_cache")
+TABLE_VERSION = 1 # bump when compute() or the table format changes
+
+# cross sections: Si thickness, slab thickness beside the core (0: strip)
+WAVEGUIDES = {
+	"strip": {"thickness": 220e-9, "slab": 0.0},
+	"rib":   {"thickness": 220e-9, "slab": 110e-9}, # PIN section (RIB layer etched to the slab)
+}
+LAMB = np.linspace(1450e-9, 1650e-9, 201)    # m, table wavelengths
+WIDTH = np.linspace(300e-9, 1500e-9, 121)    # m, table core widths
+
+def n_si(lamb):
+	# Si at 293 K, Li (1980)
+	x = np.asarray(lamb) * 1e6
+	return np.sqrt(11.6858 + 0.939816/x**2 + 0.00810461*1.1071**2/(x**2 - 1.1071**2))
+
+def n_sio2(lamb):
+	# fused silica, Malitson (1965)
+	x2 = (np.asarray(lamb) * 1e6)**2
+	return np.sqrt(1 + 0.6961663*x2/(x2 - 0.0684043**2) + 0.4079426*x2/(x2 - 0.1162414**2) + 0.8974794*x2/(x2 - 9.896161**2))
+
+def slab_index(lamb, thickness, n_core, n_clad, polarization="TE", iterations=60):
+	# effective index of the fundamental mode of a symmetric slab; arrays broadcast
+	lamb, thickness, n_core, n_clad = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (lamb, thickness, n_core, n_clad)))
+	V = np.pi * thickness / lamb * np.sqrt(np.maximum(n_core**2 - n_clad**2, 0))
+	r = 1.0 if polarization == "TE" else (n_core / n_clad)**2
+	lo = np.zeros_like(V)
+	hi = np.minimum(V, np.pi/2 - 1e-12)
+	for _ in range(iterations):
+		u = (lo + hi) / 2
+		above = u*np.tan(u) > r*np.sqrt(np.maximum(V**2 - u**2, 0))
+		hi = np.where(above, u, hi)
+		lo = np.where(above, lo, u)
+	u = (lo + hi) / 2
+	kappa = 2*u / thickness
+	return np.sqrt(n_core**2 - (kappa*lamb / (2*np.pi))**2)
+
+def compute(name, lamb=LAMB, width=WIDTH):
+	# (len(lamb), len(width)) n_eff and n_g of one cross section
+	section = WAVEGUIDES[name]
+	clad = n_sio2(lamb)
+	core = slab_index(lamb, section["thickness"], n_si(lamb), clad, "TE")
+	side = slab_index(lamb, section["slab"], n_si(lamb), clad, "TE") if section["slab"] > 0 else clad
+	L, W = np.meshgrid(lamb, width, indexing="ij")
+	index = slab_index(L, W, core[:, None], side[:, None], "TM")
+	group = index - lamb[:, None] * np.gradient(index, lamb, axis=0)
+	return index, group
+
+def table(name, lamb=LAMB, width=WIDTH, cache_dir=CACHE_DIR):
+	# {"lamb", "width", "n_eff", "n_g"} of one cross section, from the disk cache
+	key = json.dumps([TABLE_VERSION, name, WAVEGUIDES[name], lamb.tolist(), width.tolist()], sort_keys=True)
+	path = os.path.join(cache_dir, f"{name}_{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}.npz")
+	if os.path.exists(path):
+		with np.load(path) as data:
+			return {key: data[key] for key in ("lamb", "width", "n_eff", "n_g")}
+	index, group = compute(name, lamb, width)
+	os.makedirs(cache_dir, exist_ok=True)
+	np.savez(path, lamb=lamb, width=width, n_eff=index, n_g=group)
+	print(f"[out] saved {name} index table as '{path}'")
+	return {"lamb": lamb, "width": width, "n_eff": index, "n_g": group}
+
+def interpolate(data, lamb, width):
+	# bilinear interpolation of a (lamb, width) table; lamb, width broadcast
+	lamb, width = np.broadcast_arrays(np.asarray(lamb, dtype=float), np.asarray(width, dtype=float))
+	found = []
+	for axis, value in ((data[0], lamb), (data[1], width)):
+		k = np.clip(np.searchsorted(axis, value) - 1, 0, len(axis) - 2)
+		found.append((k, (value - axis[k]) / (axis[k + 1] - axis[k])))
+	(i, s), (j, t) = found
+	z = data[2]
+	return (1-s)*(1-t)*z[i, j] + s*(1-t)*z[i + 1, j] + (1-s)*t*z[i, j + 1] + s*t*z[i + 1, j + 1]
+
+def n_eff(data, lamb, width):
+	return interpolate((data["lamb"], data["width"], data["n_eff"]), lamb, width)
+
+def n_g(data, lamb, width):
+	return interpolate((data["lamb"], data["width"], data["n_g"]), lamb, width)
@@ -0,0 +1,174 @@
+# AIST 2025 pattern density
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Local pattern density of a layer over sliding windows, for dummy fill and
+# CMP rules. The merged layer (lib_flatten) is rasterized by a numpy scanline
+# fill: every edge is cut by sub-scanlines (subrows per pixel row), the
+# crossings of each scanline are sorted and paired into spans, and each span
+# adds its exact x coverage to the pixel row through difference arrays.
+# Window densities come from a summed-area table of the coverage map.
+#
+# usage: python lib_density.py input.gds 30,36 [--window 100] [--step 50] [--pixel 2]
+
+import argparse
+import os
+
+import gdstk
+import numpy as np
+
+import lib_flatten
+
+def polygon_edges(polygons):
+	# (n, 4) x0, y0, x1, y1 of all non-horizontal edges
+	edges = [np.concatenate([p, np.roll(p, -1, axis=0)], axis=1) for p in polygons]
+	if not edges:
+		return np.zeros((0, 4))
+	edges = np.concatenate(edges)
+	return edges[edges[:, 1] != edges[:, 3]]
+
+def rasterize(polygons, bbox, pixel=2, subrows=16, strip=512):
+	# coverage (0..1) of non-overlapping polygons on a pixel grid starting at
+	# bbox[0]; rows are y, columns x. Rows are filled in strips of pixel rows
+	# to bound the number of crossings held at once.
+	(x0, y0), (x1, y1) = bbox
+	cols = max(1, int(np.ceil((x1 - x0) / pixel)))
+	rows = max(1, int(np.ceil((y1 - y0) / pixel)))
+	coverage = np.zeros((rows, cols), dtype=np.float32)
+	edges = polygon_edges(polygons)
+	ylo = np.minimum(edges[:, 1], edges[:, 3])
+	yhi = np.maximum(edges[:, 1], edges[:, 3])
+	dy = pixel / subrows
+	weight = 1 / subrows
+	for row0 in range(0, rows, strip):
+		row1 = min(rows, row0 + strip)
+		sel = (yhi > y0 + row0*pixel) & (ylo < y0 + row1*pixel)
+		e = edges[sel]
+		# sub-scanlines y = y0 + (k + 0.5) dy crossing each edge, half-open in y
+		k0 = np.maximum(np.ceil((ylo[sel] - y0) / dy - 0.5), row0 * subrows).astype(np.int64)
+		k1 = np.minimum(np.ceil((yhi[sel] - y0) / dy - 0.5), row1 * subrows).astype(np.int64)
+		counts = np.maximum(k1 - k0, 0)
+		edge = np.repeat(np.arange(len(e)), counts)
+		k = np.repeat(k0, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+		ys = y0 + (k + 0.5) * dy
+		ex0, ey0, ex1, ey1 = e[edge].T
+		xs = ex0 + (ys - ey0) * (ex1 - ex0) / (ey1 - ey0)
+		# pairs of sorted crossings on each scanline are the spans inside
+		order = np.lexsort((xs, k))
+		k = k[order][0::2]
+		xa = np.clip((xs[order][0::2] - x0) / pixel, 0, cols)
+		xb = np.clip((xs[order][1::2] - x0) / pixel, 0, cols)
+		r = k // subrows - row0
+		w = np.full(len(r), weight)
+		fa = np.clip(np.floor(xa), 0, cols).astype(np.int64)
+		fb = np.clip(np.floor(xb), 0, cols).astype(np.int64)
+		# span [xa, xb) = full pixels [fa, fb) - frac(xa) at fa + frac(xb) at fb
+		width = cols + 1
+		size = (row1 - row0) * width
+		step = np.bincount(r*width + fa, w, size) - np.bincount(r*width + fb, w, size)
+		part = np.bincount(r*width + fb, w * (xb - fb), size) - np.bincount(r*width + fa, w * (xa - fa), size)
+		strip_map = np.cumsum(step.reshape(-1, width), axis=1) + part.reshape(-1, width)
+		coverage[row0:row1] = strip_map[:, :cols]
+	return np.clip(coverage, 0, 1)
+
+def window_density(coverage, window, step):
+	# densities of window x window pixel windows every step pixels, from a
+	# summed-area table; result[j, i] is the window starting at row j*step, column i*step
+	rows, cols = coverage.shape
+	table = np.zeros((rows + 1, cols + 1))
+	table[1:, 1:] = coverage.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+	window = min(window, rows, cols)
+	r = np.arange(0, rows - window + 1, step)
+	c = np.arange(0, cols - window + 1, step)
+	total = (
+		table[r[:, None] + window, c[None, :] + window] - table[r[:, None], c[None, :] + window] -
+		table[r[:, None] + window, c[None, :]] + table[r[:, None], c[None, :]]
+	)
+	return np.clip(total / window**2, 0, 1) # float rounding of the table
+
+def density_result(coverage, layer, origin, pixel=2, window=100, step=50):
+	# {"density": (ny, nx) windows, "extent": (x0, x1, y0, y1) of window centers, ...}
+	# of a coverage map whose pixel (0, 0) starts at origin
+	window_px = max(1, round(window / pixel))
+	step_px = max(1, round(step / pixel))
+	density = window_density(coverage, window_px, step_px)
+	x0, y0 = origin
+	half = window_px * pixel / 2
+	ny, nx = density.shape
+	extent = (x0 + half, x0 + half + (nx - 1)*step_px*pixel, y0 + half, y0 + half + (ny - 1)*step_px*pixel)
+	return {
+		"layer": layer, "density": density, "extent": extent, "window": window_px * pixel,
+		"step": step_px * pixel, "total": float(coverage.mean()),
+	}
+
+def layer_density(cell, layer, window=100, step=50, pixel=2, processes=None):
+	bbox = cell.bounding_box()
+	merged = list(lib_flatten.merge_layer(lib_flatten.flat_polygons(cell, layer), bbox, processes=processes))
+	return density_result(rasterize(merged, bbox, pixel), layer, bbox[0], pixel, window, step)
+
+def window_center(result, index):
+	j, i = np.unravel_index(index, result["density"].shape)
+	x0, _, y0, _ = result["extent"]
+	return x0 + i*result["step"], y0 + j*result["step"]
+
+def report(result, limits=None):
+	# min/max windows; limits (min, max) also lists the number of windows outside
+	density = result["density"]
+	low = np.argmin(density)
+	high = np.argmax(density)
+	print(
+		f"[density] layer {result['layer']}: total {result['total']:.1%}, "
+		f"{result['window']:g} um windows every {result['step']:g} um, "
+		f"min {density.flat[low]:.1%} at ({window_center(result, low)[0]:.0f}, {window_center(result, low)[1]:.0f}), "
+		f"max {density.flat[high]:.1%} at ({window_center(result, high)[0]:.0f}, {window_center(result, high)[1]:.0f})"
+	)
+	if limits is not None:
+		below = int((density < limits[0]).sum())
+		above = int((density > limits[1]).sum())
+		print(f"[density] layer {result['layer']}: {below} window(s) below {limits[0]:.0%}, {above} above {limits[1]:.0%}")
+
+def heatmap(result, filename):
+	import matplotlib
+	matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+	x0, x1, y0, y1 = result["extent"]
+	step = result["step"]
+	fig, ax = plt.subplots(figsize=(5, 8))
+	image = ax.imshow(
+		result["density"] * 100, origin="lower", cmap="viridis", vmin=0, vmax=100,
+		extent=(x0 - step/2, x1 + step/2, y0 - step/2, y1 + step/2),
+	)
+	fig.colorbar(image, ax=ax, label="density (%)")
+	ax.set_title(f"layer {result['layer']}, {result['window']:g} um window")
+	ax.set_xlabel("x (um)")
+	ax.set_ylabel("y (um)")
+	fig.tight_layout()
+	fig.savefig(filename)
+	plt.close(fig)
+
+def check_gds(filename, layers, window=100, step=50, pixel=2, limits=None, cell=None, plot=True):
+	# density of each layer of the top cell (or cell); limits {layer: (min, max)};
+	# heatmaps are saved as "<name>_density_<layer>.png"
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	results = []
+	for layer in layers:
+		result = layer_density(top, layer, window, step, pixel)
+		report(result, (limits or {}).get(layer))
+		if plot:
+			output = f"{os.path.splitext(filename)[0]}_density_{layer}.png"
+			heatmap(result, output)
+			print(f"[out] saved density map as '{output}'")
+		results.append(result)
+	return results
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="pattern density map of GDS layers")
+	parser.add_argument("input")
+	parser.add_argument("layers", help="comma separated layers, e.g. 30,36")
+	parser.add_argument("--window", type=float, default=100)
+	parser.add_argument("--step", type=float, default=50)
+	parser.add_argument("--pixel", type=float, default=2)
+	args = parser.parse_args()
+	layers = [int(layer) for layer in args.layers.split(",")]
+	check_gds(args.input, layers, args.window, args.step, args.pixel)
@@ -0,0 +1,164 @@
+# AIST 2025 dicing lane and chip region checker
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# The chip is partitioned into regions (one per design team), each diced free
+# along its edges: a lane of the given width inside every region edge, so two
+# neighbouring regions share a lane of twice that width around their common
+# boundary, as drawn by the NODMY dicing strips. Every shape must stay inside
+# the core of one region (the region shrunk by its lane); only the SSC tips
+# (tip layers) run through the lanes to the facets.
+#
+# The hierarchy is walked from the top cell with composed affine transforms;
+# a reference element (or own shape) whose box lies inside a core is skipped
+# with everything below it, so only the shapes near the lanes are looked at.
+# Those are cut by the cores and the tip shapes (R-tree of the flattened tip
+# layers); what is left is reported as "lane" (inside one region) or
+# "boundary" (across a region boundary or off the chip), with its cell path.
+# Markers go to lib_drc.DRC_LAYER, datatype DRC_DICING.
+#
+# usage: python lib_dicing.py input.gds regions.json [markers.gds]
+#   regions.json: {"lane": 50, "regions": {"JIANG": [[0, 0], [5000, 3500]], ...}}
+
+import json
+import os
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_drc
+import lib_region
+import lib_rtree
+import lib_tile
+
+DRC_DICING = 4
+TIP_LAYERS = (53,)         # SSC boxes
+IGNORE_LAYERS = (0, 50, 60) # chip areas, NODMY
+
+def region_boxes(regions, lane):
+	# (names, (n, 4) region boxes, (n, 4) cores); lane: one-side width, or {name: width}
+	names = list(regions)
+	boxes = np.array([np.ravel(regions[name]) for name in names], dtype=float).reshape(-1, 4)
+	widths = np.array([lane[name] if isinstance(lane, dict) else lane for name in names], dtype=float)
+	cores = boxes + np.stack([widths, widths, -widths, -widths], axis=1)
+	return names, boxes, cores
+
+def inside_any(boxes, containers, tol=0.0):
+	# mask of the boxes that lie inside one of the containers
+	if len(boxes) == 0 or len(containers) == 0:
+		return np.zeros(len(boxes), dtype=bool)
+	b = boxes[:, None, :]
+	c = containers[None, :, :]
+	return np.any(
+		(b[..., 0] >= c[..., 0] - tol) & (b[..., 1] >= c[..., 1] - tol) &
+		(b[..., 2] <= c[..., 2] + tol) & (b[..., 3] <= c[..., 3] + tol), axis=1
+	)
+
+class CellShapes:
+	# own shapes of cells outside the ignored layers, with their boxes and the
+	# box of each cell and everything below it, once per cell
+	def __init__(self, ignore_layers=IGNORE_LAYERS):
+		self.ignore = set(ignore_layers)
+		self.cells = {}
+		self.boxes = {}
+
+	def own(self, cell):
+		# (point arrays, (n, 4) boxes)
+		if cell.name not in self.cells:
+			polygons = [p.points for p in cell.get_polygons(depth=0) if p.layer not in self.ignore]
+			self.cells[cell.name] = polygons, lib_tile.polygon_boxes(polygons)
+		return self.cells[cell.name]
+
+	def box(self, cell):
+		# (4,) box of the shapes of a cell and below it, None if there are none
+		if cell.name not in self.boxes:
+			boxes = [self.own(cell)[1]]
+			for ref in cell.references:
+				if isinstance(ref.cell, gdstk.Cell) and self.box(ref.cell) is not None:
+					boxes.append(lib_region.placed_boxes(self.box(ref.cell)[None], lib_region.reference_matrix(ref), ref.origin + lib_region.reference_offsets(ref)))
+			boxes = np.concatenate(boxes)
+			self.boxes[cell.name] = np.concatenate([boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)]) if len(boxes) else None
+		return self.boxes[cell.name]
+
+def near_lanes(cell, cores, shapes):
+	# yields (cell path, placed point arrays) of the own shapes of every placed
+	# cell whose box is not inside a core
+	stack = [(cell, np.eye(2), np.zeros(2), cell.name)]
+	while stack:
+		cell, matrix, shift, path = stack.pop()
+		polygons, boxes = shapes.own(cell)
+		if polygons:
+			outside = np.flatnonzero(~inside_any(lib_region.placed_boxes(boxes, matrix, shift[None]), cores))
+			if len(outside):
+				yield path, [polygons[k] @ matrix.T + shift for k in outside]
+		for ref in cell.references:
+			if not isinstance(ref.cell, gdstk.Cell) or shapes.box(ref.cell) is None:
+				continue
+			element = matrix @ lib_region.reference_matrix(ref)
+			offsets = (ref.origin + lib_region.reference_offsets(ref)) @ matrix.T + shift
+			boxes = lib_region.placed_boxes(shapes.box(ref.cell)[None], element, offsets)
+			for k in np.flatnonzero(~inside_any(boxes, cores)):
+				stack.append((ref.cell, element, offsets[k], f"{path}/{ref.cell.name}"))
+
+def check(cell, regions, lane, tip_layers=TIP_LAYERS, ignore_layers=IGNORE_LAYERS, precision=1e-3):
+	# [(cell path, kind, area, marker points)] of the shapes outside the region cores
+	names, boxes, cores = region_boxes(regions, lane)
+	core_polygons = [gdstk.rectangle(c[:2], c[2:]) for c in cores if np.all(c[:2] < c[2:])]
+	tips = [p.points for p in cell.get_polygons() if p.layer in set(tip_layers)]
+	tip_tree = lib_rtree.RTree(lib_tile.polygon_boxes(tips))
+	violations = []
+	for path, polygons in near_lanes(cell, cores, CellShapes(ignore_layers)):
+		for points in polygons:
+			left = gdstk.boolean(gdstk.Polygon(points), core_polygons, "not", precision)
+			if left and tips:
+				box = np.concatenate([points.min(axis=0), points.max(axis=0)])
+				near = [tips[k] for k in tip_tree.query(box)]
+				left = gdstk.boolean(left, near, "not", precision) if near else left
+			for piece in left:
+				area = piece.area()
+				if area <= precision**2:
+					continue
+				box = np.ravel(piece.bounding_box())
+				kind = "lane" if inside_any(box[None], boxes, precision)[0] else "boundary"
+				violations.append((path, kind, area, piece.points))
+	return violations
+
+def add_markers(cell, violations):
+	for _, _, _, points in violations:
+		cell.add(gdstk.Polygon(points, lib_drc.DRC_LAYER, DRC_DICING))
+
+def report(violations, limit=20):
+	# per cell path and kind, largest area first, at most limit lines (None: all)
+	counts = {}
+	for path, kind, area, _ in violations:
+		n, total = counts.get((path, kind), (0, 0.0))
+		counts[(path, kind)] = (n + 1, total + area)
+	ranked = sorted(counts.items(), key=lambda item: -item[1][1])
+	for (path, kind), (n, total) in ranked[:limit]:
+		print(f"[dicing] {path}: {n} shape(s) in a {'dicing lane' if kind == 'lane' else 'region boundary'}, {total:.3f} um2")
+	if limit is not None and len(ranked) > limit:
+		print(f"[dicing] ... {len(ranked) - limit} more cell path(s) not listed")
+	print(f"[dicing] {len(violations)} violation(s)")
+
+def check_gds(filename, regions, lane, output=None, cell=None, tip_layers=TIP_LAYERS, ignore_layers=IGNORE_LAYERS, limit=20):
+	# checks the top cell of a GDS file (or cell); markers are written to output
+	# (default "<name>_dicing.gds") when there are violations
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	violations = check(top, regions, lane, tip_layers, ignore_layers, lib.precision / lib.unit)
+	report(violations, limit)
+	if violations:
+		output = output or os.path.splitext(filename)[0] + "_dicing.gds"
+		add_markers(top, violations)
+		lib.write_gds(output)
+		print(f"[out] saved dicing markers (layer {lib_drc.DRC_LAYER}) as '{output}'")
+	return violations
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (3, 4):
+		print("usage: python lib_dicing.py input.gds regions.json [markers.gds]")
+		sys.exit(1)
+	with open(sys.argv[2]) as f:
+		spec = json.load(f)
+	check_gds(sys.argv[1], spec["regions"], spec["lane"], sys.argv[3] if len(sys.argv) == 4 else None, limit=None)
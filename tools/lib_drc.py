@@ -0,0 +1,384 @@
+# AIST 2025 width and spacing DRC
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Minimum width and minimum spacing checks from a rule deck
+#
+# rules = {
+#     30: {"width": 0.15, "space": 0.2},  # any datatype of layer 30
+#     "36/0": {"width": 5},               # "layer/datatype", "layer" or (layer, datatype)
+# }
+#
+# Every cell is checked once on its own (merged) geometry, however often it is
+# placed. Shapes of different items of a cell (own shapes, reference elements)
+# only meet in its interaction regions (lib_hier), where they come within the
+# rule distance of each other; each congruent region is checked once, on the
+# merged shapes of all its items, keeping the violations that none of the items
+# has alone. Run time follows the unique geometry, not the instance count.
+# The merged polygons are turned into oriented edges (interior on the
+# left); candidate edge pairs come from a uniform grid hash of the edge boxes
+# and their distances are computed as numpy arrays. Two facing edges with the
+# interior between them are a width pair (opposite edges only), with the
+# exterior between them a space pair (corner to corner included). Violations
+# are written as markers on DRC_LAYER, datatype DRC_WIDTH or DRC_SPACE, into
+# the cell where they occur.
+#
+# Results can be cached in a file across runs: cell results are keyed by a
+# hash of the cell's own shapes, region results by a hash of the shapes
+# gathered for the region (relative to its corner). Regions are found again
+# by their hierarchy key (lib_hier.LayerDigests of the placed cells), so after
+# an edit only the edited cells and the regions below them gather shapes, and
+# only the regions whose shapes really changed are checked again.
+#
+# usage: python lib_drc.py input.gds rules.json [markers.gds]
+
+import json
+import os
+import pickle
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_flatten
+import lib_hier
+import lib_rewrite
+import lib_rtree
+import lib_tile
+
+DRC_LAYER = 999 # debug layer for markers
+DRC_WIDTH = 0
+DRC_SPACE = 1
+FACING_COS = np.cos(np.pi/4) # edges within 45 deg of antiparallel face each other
+CACHE_VERSION = 1 # bump when the cached results change
+
+def parse_rules(rules):
+	# {(layer, datatype or None): {"width": w, "space": s}}
+	deck = {}
+	for spec, values in rules.items():
+		key = (spec, None) if isinstance(spec, int) else lib_rewrite.parse_layer(spec)
+		deck[key] = values
+	return deck
+
+def layer_polygons(cell, layer, datatype=None):
+	# own polygons and paths of a cell (no references) on one layer
+	if datatype is not None:
+		return cell.get_polygons(depth=0, layer=layer, datatype=datatype)
+	return [p for p in cell.get_polygons(depth=0) if p.layer == layer]
+
+def polygon_edges(polygons, precision=1e-3):
+	# oriented edges (a, b) of merged polygons, interior on the left; the
+	# coincident edge pairs gdstk uses to link holes to their outline are removed
+	a_list = []
+	b_list = []
+	for points in polygons:
+		points = np.asarray(points, dtype=float)
+		x, y = points[:, 0], points[:, 1]
+		if np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y) < 0:
+			points = points[::-1]
+		a_list.append(points)
+		b_list.append(np.roll(points, -1, axis=0))
+	if not a_list:
+		return np.zeros((0, 2)), np.zeros((0, 2))
+	a = np.concatenate(a_list)
+	b = np.concatenate(b_list)
+	q = np.round(np.concatenate([a, b], axis=1) / precision).astype(np.int64)
+	as_void = lambda k: np.ascontiguousarray(k).view(np.dtype((np.void, k.dtype.itemsize * 4))).ravel()
+	bridge = np.isin(as_void(q), as_void(q[:, [2, 3, 0, 1]]))
+	keep = ~bridge & np.any(q[:, :2] != q[:, 2:], axis=1)
+	return a[keep], b[keep]
+
+def candidate_pairs(a, b, distance):
+	# (i, j), i < j, of edges whose boxes grown by distance share a grid bin
+	boxes = np.concatenate([np.minimum(a, b), np.maximum(a, b)], axis=1)
+	lengths = np.hypot(*(b - a).T)
+	size = max(2 * distance, float(np.median(lengths))) if len(a) else 1
+	return lib_tile.box_pairs(boxes, distance, size)
+
+def point_segment_distance(p, a, b):
+	d = b - a
+	t = np.clip(np.einsum("ij,ij->i", p - a, d) / np.maximum(np.einsum("ij,ij->i", d, d), 1e-30), 0, 1)
+	return np.hypot(*(p - a - t[:, None] * d).T)
+
+def segment_distance(a0, a1, b0, b1):
+	return np.min([
+		point_segment_distance(a0, b0, b1), point_segment_distance(a1, b0, b1),
+		point_segment_distance(b0, a0, a1), point_segment_distance(b1, a0, a1),
+	], axis=0)
+
+def facing_pairs(a, b, i, j, interior, tol):
+	# mask of edge pairs facing each other across the interior (width) or the exterior (space)
+	da = b[i] - a[i]
+	db = b[j] - a[j]
+	na = np.stack([-da[:, 1], da[:, 0]], axis=1) # left normal, into the interior
+	nb = np.stack([-db[:, 1], db[:, 0]], axis=1)
+	sign = 1 if interior else -1
+	side_b = sign * np.stack([np.einsum("ij,ij->i", a[j] - a[i], na), np.einsum("ij,ij->i", b[j] - a[i], na)])
+	side_a = sign * np.stack([np.einsum("ij,ij->i", a[i] - a[j], nb), np.einsum("ij,ij->i", b[i] - a[j], nb)])
+	length_a = np.hypot(*da.T)
+	length_b = np.hypot(*db.T)
+	return (
+		(np.einsum("ij,ij->i", da, db) < -FACING_COS * length_a * length_b) &
+		np.all(side_b >= -tol * length_a, axis=0) & np.any(side_b > tol * length_a, axis=0) &
+		np.all(side_a >= -tol * length_b, axis=0) & np.any(side_a > tol * length_b, axis=0)
+	)
+
+def projection_overlap(a, b, i, j):
+	# length of edge i covered by the projection of edge j
+	d = b[i] - a[i]
+	length2 = np.maximum(np.einsum("ij,ij->i", d, d), 1e-30)
+	t0 = np.einsum("ij,ij->i", a[j] - a[i], d) / length2
+	t1 = np.einsum("ij,ij->i", b[j] - a[i], d) / length2
+	overlap = np.minimum(np.maximum(t0, t1), 1) - np.maximum(np.minimum(t0, t1), 0)
+	return np.maximum(overlap, 0) * np.sqrt(length2)
+
+def shares_point(a, b, i, j):
+	return (
+		np.all(a[i] == a[j], axis=1) | np.all(a[i] == b[j], axis=1) |
+		np.all(b[i] == a[j], axis=1) | np.all(b[i] == b[j], axis=1)
+	)
+
+def marker(a0, a1, b0, b1, distance):
+	# region between two facing edges: each edge cut to the projection of the other
+	def cut(p0, p1, q0, q1):
+		d = p1 - p0
+		t = np.clip([np.dot(q0 - p0, d), np.dot(q1 - p0, d)] / np.dot(d, d), 0, 1)
+		return p0 + t.min() * d, p0 + t.max() * d
+	points = np.array(cut(a0, a1, b0, b1) + cut(b0, b1, a0, a1))
+	center = points.mean(axis=0)
+	points = points[np.argsort(np.arctan2(*(points - center).T[::-1]))]
+	if gdstk.Polygon(points).area() < 1e-6:
+		lo = points.min(axis=0) - distance / 2
+		hi = points.max(axis=0) + distance / 2
+		points = np.array([lo, (hi[0], lo[1]), hi, (lo[0], hi[1])])
+	return points
+
+def check_edges(a, b, rule, interior, precision=1e-3):
+	# [(distance, marker points)] of the facing edge pairs closer than rule
+	i, j = candidate_pairs(a, b, rule)
+	keep = ~shares_point(a, b, i, j)
+	i, j = i[keep], j[keep]
+	d = segment_distance(a[i], b[i], a[j], b[j])
+	keep = d < rule - precision / 2
+	i, j, d = i[keep], j[keep], d[keep]
+	keep = facing_pairs(a, b, i, j, interior, precision / 2)
+	if interior:
+		# width is measured between opposite edges only, so that jogs of a few
+		# grid points at path joints do not count as narrow corners
+		keep &= projection_overlap(a, b, i, j) > precision / 2
+	return [(dist, marker(a[k], b[k], a[l], b[l], rule)) for k, l, dist in zip(i[keep], j[keep], d[keep])]
+
+def check_polygons(polygons, width=None, space=None, precision=1e-3, zones=None):
+	# {"width": [...], "space": [...]} violations of one layer of one cell;
+	# zones (n, 4) limits the check to the edges that touch them
+	merged = [p.points for p in gdstk.boolean(polygons, [], "or", precision)]
+	a, b = polygon_edges(merged, precision)
+	if zones is not None:
+		boxes = np.concatenate([np.minimum(a, b), np.maximum(a, b)], axis=1)
+		size = float(np.median(np.maximum(zones[:, 2] - zones[:, 0], zones[:, 3] - zones[:, 1]))) if len(zones) else 1
+		i, j = lib_tile.box_pairs(np.concatenate([boxes, zones]), 0, max(size, precision))
+		keep = np.zeros(len(a), dtype=bool)
+		keep[i[(i < len(a)) & (j >= len(a))]] = True
+		a, b = a[keep], b[keep]
+	result = {}
+	if width:
+		result["width"] = check_edges(a, b, width, True, precision)
+	if space:
+		result["space"] = check_edges(a, b, space, False, precision)
+	return result
+
+def check_cell(job):
+	# [(cell name, layer, "width"/"space", distance, marker points)]
+	name, layers, deck, precision = job
+	violations = []
+	for key, polygons in layers.items():
+		rule = deck[key]
+		found = check_polygons(polygons, rule.get("width"), rule.get("space"), precision)
+		for kind, items in found.items():
+			violations += [(name, key, kind, d, m) for d, m in items]
+	return violations
+
+def rule_key(digest, key, rule):
+	return f"{digest}:{key}:{rule.get('width')}:{rule.get('space')}"
+
+def cell_jobs(cells, deck, precision, cache):
+	# (jobs of the layers missing in cache["cells"], [(cell name, layer, cache key)] of all checked layers)
+	jobs = []
+	checked = []
+	for cell in cells:
+		layers = {}
+		for key, rule in deck.items():
+			polygons = [p.points for p in layer_polygons(cell, *key)]
+			if not polygons:
+				continue
+			k = rule_key(lib_hier.polygons_digest(polygons, precision), key, rule)
+			checked.append((cell.name, key, k))
+			if k not in cache["cells"]:
+				layers[key] = polygons
+		if layers:
+			jobs.append((cell.name, layers, deck, precision))
+	return jobs, checked
+
+def marker_key(kind, points, precision=1e-3):
+	return (kind,) + tuple(np.round(np.concatenate([points.min(axis=0), points.max(axis=0)]) / precision).astype(int))
+
+def check_region(job):
+	# [(kind, distance, marker points)] between the item groups of one
+	# interaction region: found on all groups merged, not on any group alone
+	groups, zones, width, space, precision = job
+	def found(polygons):
+		result = check_polygons(polygons, width, space, precision, zones)
+		return [(kind, d, m) for kind, items in result.items() for d, m in items]
+	merged = found([p for group in groups for p in group])
+	if not merged:
+		return []
+	# only the groups near a violation can have it alone
+	boxes = np.array([np.concatenate([m.min(axis=0), m.max(axis=0)]) for _, _, m in merged])
+	alone = set()
+	for group in groups:
+		if len(lib_rtree.RTree(lib_tile.polygon_boxes(group)).query_pairs(boxes)[0]):
+			alone.update(marker_key(kind, m, precision) for kind, _, m in found(group))
+	return [(kind, d, m) for kind, d, m in merged if marker_key(kind, m, precision) not in alone]
+
+def region_geometry_key(region, groups, zones, key, rule, precision):
+	# content hash of the shapes gathered for a region, relative to its corner
+	corner = region[:2]
+	parts = sorted(lib_hier.polygons_digest([p - corner for p in group], precision) for group in groups)
+	parts.append(lib_hier.polygons_digest([np.reshape(z, (2, 2)) - corner for z in zones], precision))
+	return rule_key(":".join(parts), key, rule)
+
+def region_jobs(cells, deck, precision, flat, digests, cache):
+	# ({geometry key: (region, job)} of the regions missing in cache["regions"],
+	# {geometry key: [(cell name, layer key, region corner)]}). Regions are
+	# looked up by their hierarchy key in cache["index"] first; only the
+	# regions below an edited cell gather their shapes for the geometry key.
+	jobs = {}
+	instances = {}
+	index = {}
+	for cell in cells:
+		for key, rule in deck.items():
+			distance = max(rule.get("width") or 0, rule.get("space") or 0)
+			own = [p.points for p in layer_polygons(cell, *key)]
+			placed, regions = lib_hier.interaction_regions(cell, key, distance, flat, own)
+			own_boxes = lib_tile.polygon_boxes(own)
+			for region, items in regions:
+				if len(items) < 2:
+					continue
+				own_near = [own[k] for k in np.flatnonzero(lib_rtree.overlaps(own_boxes, region))] if "own" in items else []
+				digest = lib_hier.region_key(region, items, placed, own_near, precision, lambda c: digests.get(c, key))
+				k = index.get(digest) or cache["index"].get(digest)
+				if k is None:
+					groups = [flat.near(placed[item], key, region) for item in items if item != "own"]
+					groups, zones = lib_hier.interacting([group for group in groups + [own_near] if group], distance)
+					# zones clipped to the region, so that overlapping regions share no zone
+					zones = np.concatenate([np.maximum(zones[:, :2], region[:2]), np.minimum(zones[:, 2:], region[2:])], axis=1)
+					zones = zones[np.all(zones[:, :2] <= zones[:, 2:], axis=1)]
+					k = region_geometry_key(region, groups, zones, key, rule, precision)
+					if k not in cache["regions"]:
+						jobs[k] = region, (groups, zones, rule.get("width"), rule.get("space"), precision)
+				index[digest] = k
+				instances.setdefault(k, []).append((cell.name, key, region[:2]))
+	cache["index"] = index
+	return jobs, instances
+
+def check_interactions(cells, deck, precision=1e-3, processes=None, cache=None):
+	# violations of the interaction regions; cache["regions"] holds the
+	# violations of each region relative to its corner
+	cache = cache if cache is not None else {"cells": {}, "regions": {}, "index": {}}
+	flat = lib_hier.FlatLayers(lambda cell, key: lib_flatten.flat_polygons(cell, *key))
+	digests = lib_hier.LayerDigests(lambda cell, key: [p.points for p in layer_polygons(cell, *key)], precision)
+	jobs, instances = region_jobs(cells, deck, precision, flat, digests, cache)
+	for k in jobs:
+		cache["regions"][k] = []
+	work = {k: job for k, (_, job) in jobs.items() if len(job[1])}
+	print(f"[drc] {len(instances)} interaction region(s), {len(jobs)} checked, {len(instances) - len(jobs)} cached")
+	for k, found in zip(work, lib_tile.run_tiles(check_region, work.values(), processes if len(work) > 1 else 1)):
+		corner = jobs[k][0][:2]
+		cache["regions"][k] = [(kind, d, m - corner) for kind, d, m in found]
+	# entries of regions that are gone are dropped
+	cache["regions"] = {k: cache["regions"][k] for k in instances}
+	violations = {}
+	for k, placed in instances.items():
+		for name, key, at in placed:
+			for kind, d, m in cache["regions"][k]:
+				m = m + at
+				violations[name, key, marker_key(kind, m, precision)] = (name, key, kind, d, m)
+	return list(violations.values())
+
+def check(cells, rules, precision=1e-3, processes=None, cache=None):
+	# checks each cell once (own geometry) and each unique interaction region
+	# once; returns the violation list. cache (read_cache(), updated in place)
+	# holds the results by content hash, so that a run after an edit only
+	# checks the changed cells and the regions around them.
+	deck = parse_rules(rules)
+	cells = list(cells)
+	cache = cache if cache is not None else {"cells": {}, "regions": {}, "index": {}}
+	jobs, checked = cell_jobs(cells, deck, precision, cache)
+	found = {}
+	for violations in lib_tile.run_tiles(check_cell, jobs, processes):
+		for name, key, kind, d, m in violations:
+			found.setdefault((name, key), []).append((kind, d, m))
+	count = sum(len(job[1]) for job in jobs)
+	print(f"[drc] {len(checked)} cell layer(s), {count} checked, {len(checked) - count} cached")
+	violations = []
+	cells_cache = {}
+	for name, key, k in checked:
+		cells_cache[k] = cache["cells"].get(k, found.get((name, key), []))
+		violations += [(name, key, kind, d, m) for kind, d, m in cells_cache[k]]
+	cache["cells"] = cells_cache
+	return violations + check_interactions(cells, deck, precision, processes, cache)
+
+def read_cache(filename, precision):
+	# {"cells": {}, "regions": {}, "index": {}} from a cache file of the same version and precision
+	if filename and os.path.exists(filename):
+		with open(filename, "rb") as f:
+			cache = pickle.load(f)
+		if cache.get("version") == CACHE_VERSION and cache.get("precision") == precision:
+			return cache
+	return {"version": CACHE_VERSION, "precision": precision, "cells": {}, "regions": {}, "index": {}}
+
+def write_cache(filename, cache):
+	with open(filename, "wb") as f:
+		pickle.dump(cache, f)
+
+def add_markers(lib, violations):
+	cells = {cell.name: cell for cell in lib.cells}
+	for name, _, kind, _, points in violations:
+		datatype = DRC_WIDTH if kind == "width" else DRC_SPACE
+		cells[name].add(gdstk.Polygon(points, DRC_LAYER, datatype))
+
+def report(violations):
+	counts = {}
+	for name, (layer, datatype), kind, d, _ in violations:
+		key = (name, layer if datatype is None else f"{layer}/{datatype}", kind)
+		n, worst = counts.get(key, (0, np.inf))
+		counts[key] = (n + 1, min(worst, d))
+	for (name, layer, kind), (n, worst) in sorted(counts.items(), key=str):
+		print(f"[drc] {name}: {n} {kind} violation(s) on layer {layer}, min {worst:.3f} um")
+	print(f"[drc] {len(violations)} violation(s)")
+
+def check_gds(filename, rules, output=None, processes=None, cache=None):
+	# checks all cells of a GDS file; markers are written to output (default
+	# "<name>_drc.gds") when there are violations. cache: results file reused
+	# by the next run, e.g. "<name>.drc_cache"
+	lib = gdstk.read_gds(filename)
+	precision = lib.precision / lib.unit
+	results = read_cache(cache, precision)
+	violations = check(lib.cells, rules, precision, processes, results)
+	if cache:
+		write_cache(cache, results)
+	report(violations)
+	if violations:
+		output = output or os.path.splitext(filename)[0] + "_drc.gds"
+		add_markers(lib, violations)
+		lib.write_gds(output)
+		print(f"[out] saved DRC markers (layer {DRC_LAYER}) as '{output}'")
+	return violations
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (3, 4):
+		print("usage: python lib_drc.py input.gds rules.json [markers.gds]")
+		sys.exit(1)
+	with open(sys.argv[2]) as f:
+		rules = json.load(f)
+	check_gds(sys.argv[1], rules, sys.argv[3] if len(sys.argv) == 4 else None)
@@ -0,0 +1,184 @@
+# AIST 2025 dummy fill
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Dummy fill on a site grid (one fill square per pitch x pitch site) over the
+# die (default: the bounding box of the top cell). Sites are blocked by the
+# keep-out layers (NODMY, SSC boxes), by the dicing lanes along the die edges
+# and by a halo around the drawn layers (waveguides); all of them are
+# rasterized on the site grid (lib_density) and the halo is a dilation of the
+# drawn sites by a summed-area table. Only the
+# windows below the minimum density are filled, every free site of them. A
+# fill square covers (size/pitch)^2 of its site, so the fill alone reaches at
+# most 25% with the default size 2 and pitch 4; windows still below the
+# minimum after the fill are listed with the share of their sites taken by
+# the keep-out layers, the drawn shapes, their halo and the dicing lanes:
+# limited by the fill ceiling when filling every site but the drawn ones
+# would still fall short (a larger size / pitch ratio is needed), by the
+# keep-outs (NODMY, SSC, halo, dicing) otherwise. Filled sites are written as
+# arrayed references of one fill cell: runs of sites in a row, joined with the
+# identical runs of the following rows. The fill squares go on a datatype of
+# their own (FILL_DATATYPE), so the net and length tools (lib_optical
+# IGNORE_DATATYPES) and the per-datatype flat export keep them apart from the
+# drawn waveguides.
+#
+# usage: python lib_dummy.py input.gds [output.gds] [--min 0.2] [--size 2] [--pitch 4]
+#            [--halo 3] [--dicing 50] [--die 0,0,5000,10000] [--datatype 1]
+
+import argparse
+import os
+
+import gdstk
+import numpy as np
+
+import lib_density
+import lib_flatten
+
+FILL_DATATYPE = 1 # dummy datatype, the drawn shapes are on datatype 0
+FILL_LAYERS = ((30, FILL_DATATYPE),) # SiWG squares
+AVOID_LAYERS = (30, 40)  # SiWG, RIB: kept halo away from the fill
+KEEPOUT_LAYERS = (53, 60) # SSC, NODMY
+
+def coverage(cell, layers, grid_box, pitch, processes=None):
+	# per site coverage of the merged union of some layers
+	polygons = [p for layer in layers for p in lib_flatten.flat_polygons(cell, layer)]
+	merged = list(lib_flatten.merge_layer(polygons, grid_box, processes=processes))
+	return lib_density.rasterize(merged, grid_box, pitch)
+
+def dilate(mask, n):
+	# sites within n sites (chebyshev) of a set site
+	if n <= 0:
+		return mask
+	rows, cols = mask.shape
+	table = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+	table[1:, 1:] = mask.cumsum(axis=0, dtype=np.int64).cumsum(axis=1)
+	r0 = np.clip(np.arange(rows) - n, 0, rows)[:, None]
+	r1 = np.clip(np.arange(rows) + n + 1, 0, rows)[:, None]
+	c0 = np.clip(np.arange(cols) - n, 0, cols)[None, :]
+	c1 = np.clip(np.arange(cols) + n + 1, 0, cols)[None, :]
+	return (table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]) > 0
+
+def fill_arrays(fill):
+	# (row, column, columns, rows) of rectangular blocks of filled sites
+	padded = np.pad(fill, ((0, 0), (1, 1))).astype(np.int8)
+	d = np.diff(padded, axis=1)
+	row, start = np.nonzero(d == 1)
+	stop = np.nonzero(d == -1)[1]
+	length = stop - start
+	# runs with the same start and length in consecutive rows form one block
+	order = np.lexsort((row, length, start))
+	row, start, length = row[order], start[order], length[order]
+	new = np.ones(len(row), dtype=bool)
+	new[1:] = (start[1:] != start[:-1]) | (length[1:] != length[:-1]) | (row[1:] != row[:-1] + 1)
+	first = np.flatnonzero(new)
+	return row[first], start[first], length[first], np.diff(np.append(first, len(row)))
+
+def fill_sites(cell, size=2, pitch=4, halo=3, dicing=50, min_density=0.2, window=100, die=None,
+		fill_layers=FILL_LAYERS, avoid_layers=AVOID_LAYERS, keepout_layers=KEEPOUT_LAYERS, processes=None):
+	# (filled site mask, origin of site (0, 0), density before, density after,
+	#  [windows still below min_density]), a window being {"box", "density",
+	#  "keepout", "drawn", "halo", "dicing", "limit"} with the site fractions
+	(x0, y0), (x1, y1) = die or cell.bounding_box()
+	cols = int((x1 - x0) // pitch)
+	rows = int((y1 - y0) // pitch)
+	grid_box = ((x0, y0), (x0 + cols*pitch, y0 + rows*pitch))
+	layers = sorted({layer for layer, _ in fill_layers})
+	before = coverage(cell, layers, grid_box, pitch, processes)
+	drawn = before if layers == sorted(avoid_layers) else coverage(cell, avoid_layers, grid_box, pitch, processes)
+	# the fill square keeps (pitch - size)/2 from its site border already
+	n = int(np.ceil((halo - (pitch - size)/2) / pitch - 1e-9))
+	lane = int(np.ceil(dicing / pitch))
+	blocked = {"dicing": np.zeros((rows, cols), dtype=bool)}
+	blocked["dicing"][:lane] = blocked["dicing"][rows - lane:] = True
+	blocked["dicing"][:, :lane] = blocked["dicing"][:, cols - lane:] = True
+	blocked["keepout"] = (coverage(cell, keepout_layers, grid_box, pitch, processes) > 0) & ~blocked["dicing"]
+	blocked["drawn"] = (drawn > 0) & ~blocked["dicing"] & ~blocked["keepout"]
+	blocked["halo"] = dilate(drawn > 0, n) & ~blocked["dicing"] & ~blocked["keepout"] & ~blocked["drawn"]
+	free = ~(blocked["dicing"] | blocked["keepout"] | blocked["drawn"] | blocked["halo"])
+	if min_density is None:
+		return free, (x0, y0), before, before + free * (size / pitch)**2, []
+	# non-overlapping windows below the minimum; the last one takes the rest of the sites
+	w = max(1, round(window / pitch))
+	low = lib_density.window_density(before, w, w) < min_density
+	j = np.minimum(np.arange(rows) // w, low.shape[0] - 1)
+	i = np.minimum(np.arange(cols) // w, low.shape[1] - 1)
+	free &= low[j[:, None], i[None, :]]
+	ceiling = (size / pitch)**2
+	after = before + free * ceiling
+	density = lib_density.window_density(after, w, w)
+	# density with every site but the drawn ones filled, keep-outs aside
+	ideal = lib_density.window_density(before + (drawn == 0) * ceiling, w, w)
+	shares = {key: lib_density.window_density(mask.astype(float), w, w) for key, mask in blocked.items()}
+	short = []
+	for j, i in zip(*np.nonzero(density < min_density)):
+		short.append({
+			"box": (x0 + i*w*pitch, y0 + j*w*pitch, x0 + (i + 1)*w*pitch, y0 + (j + 1)*w*pitch),
+			"density": float(density[j, i]), **{key: float(share[j, i]) for key, share in shares.items()},
+			"limit": "fill ceiling" if ideal[j, i] < min_density else "keep-outs",
+		})
+	return free, (x0, y0), before, after, short
+
+def add_fill(cell, fill, origin, size=2, pitch=4, fill_layers=FILL_LAYERS, name="DUMMY"):
+	# adds the fill (one cell of arrayed references) to cell; returns the new cells
+	square = gdstk.Cell(f"{name}_{size:g}")
+	for layer, datatype in fill_layers:
+		square.add(gdstk.rectangle((-size/2, -size/2), (size/2, size/2), layer=layer, datatype=datatype))
+	array = gdstk.Cell(name)
+	for row, col, columns, rows in zip(*fill_arrays(fill)):
+		center = (origin[0] + (col + 0.5)*pitch, origin[1] + (row + 0.5)*pitch)
+		array.add(gdstk.Reference(square, center, columns=int(columns), rows=int(rows), spacing=(pitch, pitch)))
+	cell.add(gdstk.Reference(array))
+	return [square, array]
+
+def fill_gds(filename, output=None, size=2, pitch=4, halo=3, dicing=50, min_density=0.2, window=100, die=None,
+		fill_layers=FILL_LAYERS, avoid_layers=AVOID_LAYERS, keepout_layers=KEEPOUT_LAYERS, cell=None, processes=None, limit=20):
+	# fills the top cell (or cell) and writes output (default "<name>_dummy.gds");
+	# lists the lowest windows still below min_density (limit None: all)
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	fill, origin, before, after, short = fill_sites(
+		top, size, pitch, halo, dicing, min_density, window, die, fill_layers, avoid_layers, keepout_layers, processes
+	)
+	label = "/".join(str(layer) for layer in sorted({layer for layer, _ in fill_layers}))
+	lib_density.report(lib_density.density_result(before, f"{label} before fill", origin, pitch, window, window))
+	lib_density.report(lib_density.density_result(after, f"{label} after fill", origin, pitch, window, window))
+	for new in add_fill(top, fill, origin, size, pitch, fill_layers):
+		lib.add(new)
+	print(f"[dummy] {int(fill.sum())} fill squares in {len(lib['DUMMY'].references)} arrays")
+	for found in sorted(short, key=lambda found: found["density"])[:limit]:
+		x0, y0, x1, y1 = found["box"]
+		print(
+			f"[dummy] window ({x0:.0f}, {y0:.0f})-({x1:.0f}, {y1:.0f}): {found['density']:.1%} after fill, sites in "
+			f"NODMY/SSC {found['keepout']:.0%}, drawn {found['drawn']:.0%}, halo {found['halo']:.0%}, "
+			f"dicing {found['dicing']:.0%}: limited by {found['limit']}"
+		)
+	if limit is not None and len(short) > limit:
+		print(f"[dummy] ... {len(short) - limit} more window(s)")
+	if min_density is not None:
+		limits = {limit: sum(found["limit"] == limit for found in short) for limit in ("keep-outs", "fill ceiling")}
+		print(f"[dummy] {limits['keep-outs']} by keep-outs, {limits['fill ceiling']} by the fill ceiling")
+		print(f"[dummy] {len(short)} window(s) below {min_density:.0%} after fill (fill ceiling {(size / pitch)**2:.0%})")
+	output = output or os.path.splitext(filename)[0] + "_dummy.gds"
+	lib.write_gds(output)
+	print(f"[out] saved filled GDS as '{output}'")
+	return output
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="dummy fill of a GDS file")
+	parser.add_argument("input")
+	parser.add_argument("output", nargs="?", default=None)
+	parser.add_argument("--min", type=float, default=0.2, help="fill windows below this density")
+	parser.add_argument("--window", type=float, default=100)
+	parser.add_argument("--size", type=float, default=2)
+	parser.add_argument("--pitch", type=float, default=4)
+	parser.add_argument("--halo", type=float, default=3)
+	parser.add_argument("--dicing", type=float, default=50)
+	parser.add_argument("--die", default=None, help="die box x0,y0,x1,y1 (default: cell bounding box)")
+	parser.add_argument("--datatype", type=int, default=FILL_DATATYPE, help="datatype of the fill squares")
+	args = parser.parse_args()
+	die = None
+	if args.die:
+		x0, y0, x1, y1 = (float(v) for v in args.die.split(","))
+		die = ((x0, y0), (x1, y1))
+	fill_layers = tuple((layer, args.datatype) for layer, _ in FILL_LAYERS)
+	fill_gds(args.input, args.output, args.size, args.pitch, args.halo, args.dicing, args.min, args.window, die, fill_layers)
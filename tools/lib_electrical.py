@@ -0,0 +1,237 @@
+# AIST 2025 electrical netlist extraction
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Conductor connectivity of the metal (MET), the doped silicon (N++, P++) and
+# the resistor layer (TiN) through their contact layers (CT2PN, CT2TIN).
+# Shapes of one conductor layer that touch or overlap are joined (lib_optical
+# union-find); a contact joins the metal and the conductor below it where it
+# overlaps both (R-tree of the conductor boxes, boolean "and"). N++ and P++
+# are separate conductors, so a PIN junction is not a connection.
+#
+# Nets are the zero-ohm nets: metal and silicon. TiN shapes are resistors
+# between the nets of their contacts: contacts are ordered along the shape
+# and neighbouring ones are joined by R = sheet * d / w, d the distance of
+# the contact centers, w the area of the TiN shape over its extent along
+# them (27 Ohm/sq: 60 x 90 um with contacts 74 um apart, 33.3 Ohm). Pad to
+# pad resistances through the resistors are solved on the conductance
+# matrix of each resistor network (pseudo-inverse).
+#
+# Pads are the probe windows (PW) on the metal, named by the metal ports
+# (lib_ports) on their net. Reported:
+# - shorts: nets holding ports of different classes (S*, G*)
+# - opens: contacts missing the metal or the conductor below, TiN shapes
+#   with fewer than two contacts, pads whose net reaches nothing else
+# - resistors shorted by the metal (all contacts on one net)
+# Shorts and unconnected pads whose ports all lie in the expected cells
+# (calibration structures such as SHORT_L50um and OPEN_L50um) are counted as
+# expected instead.
+#
+# usage: python lib_electrical.py input.gds [cell]
+
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_flatten
+import lib_optical
+import lib_ports
+import lib_rtree
+import lib_tile
+
+METAL = 36
+SEMICONDUCTORS = (33, 34) # N++, P++
+CT_SEMICONDUCTOR = 35     # CT2PN
+RESISTOR = 38             # TiN
+CT_RESISTOR = 39          # CT2TIN
+PAD = 41                  # probe window
+SHEET_RESISTANCE = 27     # Ohm/sq of TiN
+
+def port_class(name):
+	# "RF_PAD:0/S1" -> "S"
+	return name.rsplit("/", 1)[-1].rstrip("0123456789")
+
+def in_cells(names, cells):
+	# every port path ("SHORT_L50um:0/RF_PAD:1/G1") passes through one of cells
+	return bool(names) and all(any(part.split(":")[0] in cells for part in name.split("/")[:-1]) for name in names)
+
+def overlapping(points, polygons, tree, precision=1e-3):
+	# indices of the polygons that overlap the polygon points (area > 0)
+	box = np.concatenate([points.min(axis=0), points.max(axis=0)])
+	shape = gdstk.Polygon(points)
+	return [
+		k for k in tree.query(box)
+		if sum(p.area() for p in gdstk.boolean(shape, gdstk.Polygon(polygons[k]), "and", precision)) > precision**2
+	]
+
+def join(parent, i, j):
+	parent[lib_optical.find_root(parent, i)] = lib_optical.find_root(parent, j)
+
+def resistor_values(body, contacts, sheet):
+	# [(contact a, contact b, Ohm)] of neighbouring contacts along a TiN shape;
+	# body: point arrays, contacts: [(index, center)]
+	centers = np.array([center for _, center in contacts])
+	axis = np.linalg.svd(centers - centers.mean(axis=0))[2][0]
+	order = np.argsort(centers @ axis)
+	points = np.concatenate(body)
+	extent = np.ptp(points @ axis)
+	width = sum(abs(gdstk.Polygon(p).area()) for p in body) / max(extent, 1e-9)
+	found = []
+	for a, b in zip(order[:-1], order[1:]):
+		d = np.hypot(*(centers[b] - centers[a]))
+		found.append((contacts[a][0], contacts[b][0], sheet * d / width))
+	return found
+
+def effective_resistance(nodes, resistors, terminals):
+	# {(a, b): Ohm} between terminal nodes, resistors [(node, node, Ohm)]
+	index = {node: k for k, node in enumerate(nodes)}
+	g = np.zeros((len(nodes), len(nodes)))
+	for a, b, r in resistors:
+		i, j = index[a], index[b]
+		g[i, i] += 1/r
+		g[j, j] += 1/r
+		g[i, j] -= 1/r
+		g[j, i] -= 1/r
+	inverse = np.linalg.pinv(g)
+	found = {}
+	for x, a in enumerate(terminals):
+		for b in terminals[x + 1:]:
+			i, j = index[a], index[b]
+			found[a, b] = inverse[i, i] + inverse[j, j] - 2*inverse[i, j]
+	return found
+
+def extract(cell, sheet=SHEET_RESISTANCE, precision=1e-3, expected=()):
+	# {"nets", "pads", "names", "shorts", "opens", "expected", "resistors", "shorted", "resistance"};
+	# expected: names of cells whose shorts and unconnected pads are intended
+	ignore = lib_optical.IGNORE_DATATYPES # dummy fill is floating
+	metal = lib_flatten.flat_polygons(cell, METAL, ignore_datatypes=ignore)
+	layers = [metal] + [lib_flatten.flat_polygons(cell, layer, ignore_datatypes=ignore) for layer in SEMICONDUCTORS]
+	conductors = [p for polygons in layers for p in polygons]
+	offsets = np.cumsum([0] + [len(polygons) for polygons in layers])
+	parent = list(range(len(conductors)))
+	for polygons, offset in zip(layers, offsets):
+		for i, j in lib_optical.touching_pairs(polygons, precision):
+			join(parent, offset + i, offset + j)
+	opens = []
+	trees = [lib_rtree.RTree(lib_tile.polygon_boxes(polygons)) for polygons in layers]
+	contacted = set()
+	# CT2PN: metal to N++ / P++
+	for points in lib_flatten.flat_polygons(cell, CT_SEMICONDUCTOR):
+		above = overlapping(points, metal, trees[0], precision)
+		below = [offset + k for polygons, tree, offset in zip(layers[1:], trees[1:], offsets[1:]) for k in overlapping(points, polygons, tree, precision)]
+		if not above or not below:
+			opens.append(f"CT2PN at ({points[:, 0].mean():.1f}, {points[:, 1].mean():.1f}): no {'metal' if not above else 'N++/P++'}")
+			continue
+		for k in above[1:] + below:
+			join(parent, above[0], k)
+		contacted.add(above[0])
+	roots = np.array([lib_optical.find_root(parent, k) for k in range(len(conductors))], dtype=int)
+	nets = np.unique(roots, return_inverse=True)[1].ravel() if len(roots) else roots
+	metal_nets = nets[:len(metal)]
+	# TiN shapes and their contacts
+	tin = lib_flatten.flat_polygons(cell, RESISTOR, ignore_datatypes=ignore)
+	bodies = lib_optical.components(tin, precision)
+	tin_tree = lib_rtree.RTree(lib_tile.polygon_boxes(tin))
+	body_contacts = {}
+	for k, points in enumerate(lib_flatten.flat_polygons(cell, CT_RESISTOR)):
+		above = overlapping(points, metal, trees[0], precision)
+		below = overlapping(points, tin, tin_tree, precision)
+		center = points.mean(axis=0)
+		if not above or not below:
+			opens.append(f"CT2TIN at ({center[0]:.1f}, {center[1]:.1f}): no {'metal' if not above else 'TiN'}")
+			continue
+		contacted.add(above[0])
+		body_contacts.setdefault(int(bodies[below[0]]), []).append((int(metal_nets[above[0]]), center))
+	resistors = []
+	shorted = []
+	for body in range(int(bodies.max()) + 1 if len(bodies) else 0):
+		polygons = [tin[k] for k in np.flatnonzero(bodies == body)]
+		contacts = body_contacts.get(body, [])
+		box = lib_tile.polygon_boxes(polygons)
+		where = f"({box[:, 0].min():.1f}, {box[:, 1].min():.1f})"
+		if len(contacts) < 2:
+			opens.append(f"TiN at {where}: {len(contacts)} contact(s)")
+		elif len({net for net, _ in contacts}) == 1:
+			shorted.append(where)
+		else:
+			resistors += [(a, b, r, where) for a, b, r in resistor_values(polygons, contacts, sheet) if a != b]
+	# pads and port names of the nets
+	pad_nets = {}
+	for points in lib_flatten.flat_polygons(cell, PAD):
+		center = points.mean(axis=0)
+		hits = lib_optical.point_nets([center], metal, metal_nets, precision)[0]
+		if hits:
+			pad_nets.setdefault(min(hits), []).append(center)
+	ports = lib_ports.PortIndex().flat(cell)
+	on_metal = ports["layer"] == METAL
+	names = {}
+	for name, hits in zip([n for n, keep in zip(ports["name"], on_metal) if keep], lib_optical.point_nets(ports["position"][on_metal], metal, metal_nets, precision)):
+		for net in hits:
+			names.setdefault(net, []).append(name)
+	shorts = [(net, sorted(found)) for net, found in sorted(names.items()) if len({port_class(n) for n in found}) > 1]
+	intended = [f"short: {', '.join(found)}" for _, found in shorts if in_cells(found, expected)]
+	shorts = [(net, found) for net, found in shorts if not in_cells(found, expected)]
+	# pads whose net holds nothing but pad metal
+	resistor_nets = {net for a, b, _, _ in resistors for net in (a, b)}
+	contacted_nets = {int(metal_nets[k]) for k in contacted} | resistor_nets
+	for net, centers in sorted(pad_nets.items()):
+		if net not in contacted_nets and len(centers) == 1:
+			text = f"pad at ({centers[0][0]:.1f}, {centers[0][1]:.1f}) ({', '.join(names.get(net, ['unnamed']))}): no connection"
+			(intended if in_cells(names.get(net, []), expected) else opens).append(text)
+	# pad to pad resistance per resistor network
+	parent = {net: net for net in resistor_nets}
+	for a, b, _, _ in resistors:
+		join(parent, a, b)
+	networks = {}
+	for net in resistor_nets:
+		networks.setdefault(lib_optical.find_root(parent, net), []).append(net)
+	resistance = []
+	for members in networks.values():
+		terminals = sorted(net for net in members if net in pad_nets)
+		if len(terminals) > 1:
+			inside = [r for r in resistors if r[0] in members]
+			for (a, b), r in effective_resistance(sorted(members), [(a, b, r) for a, b, r, _ in inside], terminals).items():
+				resistance.append((a, b, r))
+	return {
+		"nets": int(nets.max()) + 1 if len(nets) else 0, "pads": pad_nets, "names": names, "shorts": shorts,
+		"opens": opens, "expected": intended, "resistors": resistors, "shorted": shorted, "resistance": resistance,
+	}
+
+def net_name(result, net):
+	found = result["names"].get(net)
+	if found:
+		return found[0] if len(found) == 1 else f"{found[0]} (+{len(found) - 1})"
+	centers = result["pads"].get(net)
+	return f"net {net} at ({centers[0][0]:.1f}, {centers[0][1]:.1f})" if centers else f"net {net}"
+
+def report(result, limit=20):
+	for net, found in result["shorts"][:limit]:
+		print(f"[electrical] short: {', '.join(found)}")
+	for text in result["opens"][:limit]:
+		print(f"[electrical] open: {text}")
+	for where in result["shorted"][:limit]:
+		print(f"[electrical] TiN at {where}: all contacts on one net")
+	for a, b, r in sorted(result["resistance"], key=lambda item: (net_name(result, item[0]), net_name(result, item[1])))[:limit]:
+		print(f"[electrical] {net_name(result, a)} - {net_name(result, b)}: {r:.1f} Ohm")
+	if limit is not None and len(result["resistance"]) > limit:
+		print(f"[electrical] ... {len(result['resistance']) - limit} more pad pair(s)")
+	print(
+		f"[electrical] {result['nets']} net(s), {sum(len(c) for c in result['pads'].values())} pad(s), "
+		f"{len(result['resistors'])} resistor(s), {len(result['shorts'])} short(s), {len(result['opens'])} open(s), "
+		f"{len(result['expected'])} expected"
+	)
+
+def check_gds(filename, cell=None, sheet=SHEET_RESISTANCE, limit=20, expected=()):
+	# expected: cell names of calibration structures (e.g. ("SHORT_L50um",))
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	result = extract(top, sheet, lib.precision / lib.unit, expected)
+	report(result, limit)
+	return result
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (2, 3):
+		print("usage: python lib_electrical.py input.gds [cell]")
+		sys.exit(1)
+	check_gds(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None, limit=None)
@@ -0,0 +1,239 @@
+# AIST 2025 enclosure and extension checks
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Enclosure and extension rules from a rule deck
+#
+# rules = [
+#     {"inner": 35, "outer": [33, 34], "enclosure": 1}, # CT2PN inside N++ or P++ by 1 um
+#     {"inner": 41, "outer": 36, "enclosure": 5},       # PW inside MET by 5 um
+#     {"inner": 30, "outer": 36, "extension": 2},       # MET beyond the SiWG edges it crosses
+# ]
+#
+# Layers are given as 36 (any datatype) or "36/0"; a list is the union of its
+# layers. enclosure: every inner shape lies inside the outer layer, with
+# its edges at least d from the outer edges. extension: the outer layer
+# extends at least d beyond the inner edges it crosses (the part of the inner
+# layer covered by the outer layer is enclosed by it, the common edges aside).
+#
+# Every cell is checked once: its own inner shapes against the outer layer of
+# the cell and everything below it. Inner shapes that are not wholly inside
+# the outer layer there may be enclosed by a parent, partly or wholly, so in
+# cells that are placed they are checked again (outside pieces and edges) in
+# every parent that places them, up to the top cell; only cells without
+# parents report them as outside. Edge pairs come from the lib_drc grid hash:
+# an inner edge closer than d to a parallel outer edge on the same side (the
+# inner edge inside) is a violation. Markers go to lib_drc.DRC_LAYER,
+# datatype DRC_ENCLOSURE or DRC_EXTENSION.
+#
+# usage: python lib_enclosure.py input.gds rules.json [markers.gds]
+
+import json
+import os
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_drc
+import lib_flatten
+import lib_region
+import lib_rewrite
+import lib_rtree
+import lib_tile
+
+DRC_ENCLOSURE = 2
+DRC_EXTENSION = 3
+
+def parse_keys(spec):
+	# 36, "36/0" or a list of them (union) -> [(layer, datatype or None)]
+	if isinstance(spec, (list, tuple)):
+		return [key for item in spec for key in parse_keys(item)]
+	return [(spec, None)] if isinstance(spec, int) else [lib_rewrite.parse_layer(spec)]
+
+def key_name(keys):
+	return ",".join(str(layer) if datatype is None else f"{layer}/{datatype}" for layer, datatype in keys)
+
+def parse_rules(rules):
+	# [(rule name, inner keys, outer keys, "enclosure"/"extension", distance)]
+	deck = []
+	for rule in rules:
+		kind = "enclosure" if "enclosure" in rule else "extension"
+		inner = parse_keys(rule["inner"])
+		outer = parse_keys(rule["outer"])
+		name = f"{key_name(inner)} {'in' if kind == 'enclosure' else 'under'} {key_name(outer)}"
+		deck.append((name, inner, outer, kind, float(rule[kind])))
+	return deck
+
+def own_polygons(cell, keys):
+	return [p.points for key in keys for p in lib_drc.layer_polygons(cell, *key)]
+
+def nearby_polygons(cell, keys, inner, distance):
+	# flattened polygons of cell on keys that come within distance of inner shapes
+	polygons = [p for key in keys for p in lib_flatten.flat_polygons(cell, *key)]
+	if not polygons or not inner:
+		return []
+	hits = lib_rtree.RTree(lib_tile.polygon_boxes(polygons)).query_pairs(lib_tile.polygon_boxes(inner), distance)[0]
+	return [polygons[k] for k in np.unique(hits)]
+
+def same_side(a, b, i, j, tol):
+	# mask of inner edge i parallel to outer edge j (within 45 deg, same
+	# direction) and lying on its interior side
+	da = b[i] - a[i]
+	db = b[j] - a[j]
+	nb = np.stack([-db[:, 1], db[:, 0]], axis=1)
+	side = np.stack([np.einsum("ij,ij->i", a[i] - a[j], nb), np.einsum("ij,ij->i", b[i] - a[j], nb)])
+	length_a = np.hypot(*da.T)
+	length_b = np.hypot(*db.T)
+	return (np.einsum("ij,ij->i", da, db) > lib_drc.FACING_COS * length_a * length_b) & np.all(side >= -tol * length_b, axis=0)
+
+def enclosure_edges(inner, outer, distance, skip_coincident=False, precision=1e-3):
+	# [(distance, marker points)] of inner edges closer than distance to an outer edge
+	a_in, b_in = lib_drc.polygon_edges(inner, precision)
+	a_out, b_out = lib_drc.polygon_edges(outer, precision)
+	n = len(a_in)
+	a = np.concatenate([a_in, a_out])
+	b = np.concatenate([b_in, b_out])
+	i, j = lib_drc.candidate_pairs(a, b, distance)
+	keep = (i < n) & (j >= n)
+	i, j = i[keep], j[keep]
+	d = lib_drc.segment_distance(a[i], b[i], a[j], b[j])
+	keep = d < distance - precision / 2
+	if skip_coincident:
+		keep &= d > precision / 2
+	i, j, d = i[keep], j[keep], d[keep]
+	keep = same_side(a, b, i, j, precision / 2) & (lib_drc.projection_overlap(a, b, i, j) > precision / 2)
+	return [(dist, lib_drc.marker(a[k], b[k], a[l], b[l], distance)) for k, l, dist in zip(i[keep], j[keep], d[keep])]
+
+def check_rule(inner, outer, kind, distance, precision=1e-3, defer=False):
+	# ([(kind, distance, marker points)], [inner shapes left to the parents]);
+	# defer=True leaves the inner shapes not wholly inside the outer layer to
+	# the parents instead of reporting their outside pieces
+	merged = gdstk.boolean(inner, [], "or", precision)
+	outer = [p.points for p in gdstk.boolean(outer, [], "or", precision)]
+	violations = []
+	orphans = []
+	if kind == "extension":
+		merged = gdstk.boolean(merged, outer, "and", precision)
+	else:
+		pieces = gdstk.boolean(merged, outer, "not", precision)
+		if defer and pieces:
+			tree = lib_rtree.RTree(lib_tile.polygon_boxes([p.points for p in merged]))
+			partial = set()
+			for piece in pieces:
+				for k in tree.query(np.ravel(piece.bounding_box())):
+					if k not in partial and gdstk.boolean(merged[k], piece, "and", precision):
+						partial.add(int(k))
+			orphans = [merged[k].points for k in sorted(partial)]
+			merged = [p for k, p in enumerate(merged) if k not in partial]
+		else:
+			violations += [("outside", 0.0, piece.points) for piece in pieces]
+	if distance > 0 and merged and outer:
+		found = enclosure_edges([p.points for p in merged], outer, distance, kind == "extension", precision)
+		violations += [(kind, d, m) for d, m in found]
+	return violations, orphans
+
+def check_cell(job):
+	# (cell name, [(rule index, kind, distance, marker points)], [(rule index, orphan points)]);
+	# defer: the cell has parents
+	name, checks, precision, defer = job
+	violations = []
+	orphans = []
+	for index, inner, outer, kind, distance in checks:
+		found, left = check_rule(inner, outer, kind, distance, precision, defer)
+		violations += [(index, k, d, m) for k, d, m in found]
+		orphans += [(index, points) for points in left]
+	return name, violations, orphans
+
+def cell_checks(cell, deck, pending=(), own=True):
+	# (rule index, inner, outer, kind, distance) of the own inner shapes of a
+	# cell and of the pending [(rule index, points)] shapes from its children
+	checks = []
+	for index, (_, inner_keys, outer_keys, kind, distance) in enumerate(deck):
+		inner = own_polygons(cell, inner_keys) if own else []
+		inner += [points for k, points in pending if k == index]
+		if inner:
+			checks.append((index, inner, nearby_polygons(cell, outer_keys, inner, distance), kind, distance))
+	return checks
+
+def cell_levels(cells):
+	# {name: height above the leaves}, children come first in increasing order
+	levels = {}
+	def level(cell):
+		if cell.name not in levels:
+			children = [ref.cell for ref in cell.references if isinstance(ref.cell, gdstk.Cell)]
+			levels[cell.name] = 1 + max((level(child) for child in children), default=-1)
+		return levels[cell.name]
+	for cell in cells:
+		level(cell)
+	return levels
+
+def place(points, ref):
+	# points of a referenced cell in the coordinates of every element of ref
+	placed = lib_region.transform_points(points, ref.origin, ref.rotation, ref.magnification, ref.x_reflection)
+	return [placed + offset for offset in lib_region.reference_offsets(ref)]
+
+def check(cells, rules, precision=1e-3, processes=None):
+	# checks each cell once; returns [(cell name, rule name, kind, distance, marker points)]
+	deck = parse_rules(rules)
+	cells = list(cells)
+	by_name = {cell.name: cell for cell in cells}
+	parents = {cell.name: [] for cell in cells}
+	for cell in cells:
+		for ref in cell.references:
+			if isinstance(ref.cell, gdstk.Cell) and ref.cell.name in parents:
+				parents[ref.cell.name].append((cell, ref))
+	violations = []
+	pending = {}
+	def collect(name, found, orphans):
+		violations.extend((name, deck[k][0], kind, d, m) for k, kind, d, m in found)
+		for index, points in orphans:
+			for parent, ref in parents[name]:
+				pending.setdefault(parent.name, []).extend((index, p) for p in place(points, ref))
+	jobs = ((cell.name, checks, precision, bool(parents[cell.name])) for cell in cells for checks in [cell_checks(cell, deck)] if checks)
+	for name, found, orphans in lib_tile.run_tiles(check_cell, jobs, processes):
+		collect(name, found, orphans)
+	# shapes not wholly enclosed in their own cell, checked again in their parents
+	levels = cell_levels(cells)
+	while pending:
+		name = min(pending, key=levels.get)
+		checks = cell_checks(by_name[name], deck, pending.pop(name), own=False)
+		collect(*check_cell((name, checks, precision, bool(parents[name]))))
+	return violations
+
+def add_markers(lib, violations):
+	cells = {cell.name: cell for cell in lib.cells}
+	for name, _, kind, _, points in violations:
+		datatype = DRC_EXTENSION if kind == "extension" else DRC_ENCLOSURE
+		cells[name].add(gdstk.Polygon(points, lib_drc.DRC_LAYER, datatype))
+
+def report(violations):
+	counts = {}
+	for name, rule, kind, d, _ in violations:
+		n, worst = counts.get((name, rule, kind), (0, np.inf))
+		counts[(name, rule, kind)] = (n + 1, min(worst, d))
+	for (name, rule, kind), (n, worst) in sorted(counts.items(), key=str):
+		detail = "" if kind == "outside" else f", min {worst:.3f} um"
+		print(f"[enclosure] {name}: {n} {kind} violation(s) of {rule}{detail}")
+	print(f"[enclosure] {len(violations)} violation(s)")
+
+def check_gds(filename, rules, output=None, processes=None):
+	# checks all cells of a GDS file; markers are written to output (default
+	# "<name>_enclosure.gds") when there are violations
+	lib = gdstk.read_gds(filename)
+	violations = check(lib.cells, rules, lib.precision / lib.unit, processes)
+	report(violations)
+	if violations:
+		output = output or os.path.splitext(filename)[0] + "_enclosure.gds"
+		add_markers(lib, violations)
+		lib.write_gds(output)
+		print(f"[out] saved enclosure markers (layer {lib_drc.DRC_LAYER}) as '{output}'")
+	return violations
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (3, 4):
+		print("usage: python lib_enclosure.py input.gds rules.json [markers.gds]")
+		sys.exit(1)
+	with open(sys.argv[2]) as f:
+		rules = json.load(f)
+	check_gds(sys.argv[1], rules, sys.argv[3] if len(sys.argv) == 4 else None)
@@ -0,0 +1,282 @@
+# AIST 2025 mask-ready flat export
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Flattens a chip and merges all overlapping shapes per (layer, datatype), as
+# expected for mask data preparation. Each layer is cut into a tile grid
+# (lib_tile); every tile is flattened and merged (union clipped to the tile)
+# in a worker process. Pieces that touch an inner tile cut are grouped with
+# the pieces they touch in the neighbouring tiles and each group is stitched
+# by one more union. Very large groups and groups with many holes (gdstk links
+# every hole to its outline, which gets very slow for chip-wide regions) are
+# left cut: the cuts lie on the database grid, so the pieces abut exactly,
+# without gaps or slivers.
+#
+# The chip is never flattened as a whole: a tile job only names the source
+# file, the cell, the layer and the tile box. Each worker reads the (hierarchical)
+# library once and walks it down to the tile with box pruning (LayerIndex: own
+# shapes and reference boxes of every cell, R-tree indexed in the frame of the
+# cell), so it only builds the shapes that cross its tile. At most a bounded
+# number of tiles are in flight and the merged shapes are streamed into the
+# output file. What stays in memory per layer are the pieces on the tile cuts,
+# until they are stitched, so a layer that is one big region across the chip
+# (e.g. a ground plane) is still held as a whole at that point.
+#
+# usage: python lib_flatten.py input.gds output.gds [--cell TOP] [--tile 500]
+#            [--per-layer] [--processes N]
+
+import argparse
+import os
+
+import gdstk
+import numpy as np
+
+import lib_gdsscan
+import lib_region
+import lib_rtree
+import lib_tile
+
+STITCH_POINTS = 100000 # largest group (total vertices) stitched by a union
+STITCH_HOLES = 64      # most holes in a group stitched by a union
+
+def split_on_cuts(polygons, box, cuts, precision=1e-3):
+	# (interior pieces, pieces touching an inner tile cut) of gdstk polygons
+	# clipped to a tile box; cuts flags the (left, bottom, right, top) sides
+	inner = []
+	edge = []
+	eps = precision / 2
+	for polygon in polygons:
+		(x0, y0), (x1, y1) = polygon.bounding_box()
+		on_cut = (
+			(cuts[0] and x0 <= box[0] + eps) or (cuts[1] and y0 <= box[1] + eps) or
+			(cuts[2] and x1 >= box[2] - eps) or (cuts[3] and y1 >= box[3] - eps)
+		)
+		(edge if on_cut else inner).append(polygon.points)
+	return inner, edge
+
+def merge_tile(job):
+	# union of the polygons inside one tile box: (interior pieces, pieces on a cut)
+	box, cuts, polygons, precision = job
+	rect = gdstk.rectangle(box[:2], box[2:])
+	return split_on_cuts(gdstk.boolean(polygons, rect, "and", precision), box, cuts, precision)
+
+def tile_cuts(grid, tile):
+	i, j = tile % grid.nx, tile // grid.nx
+	return (i > 0, j > 0, i < grid.nx - 1, j < grid.ny - 1)
+
+def tile_jobs(grid, polygons, precision):
+	boxes = lib_tile.polygon_boxes(polygons)
+	for tile, items in sorted(grid.assign(boxes).items()):
+		yield grid.box(tile), tile_cuts(grid, tile), [polygons[k] for k in items], precision
+
+def hole_count(points, precision=1e-3):
+	# holes of a gdstk polygon: each one is linked to the outline by a pair of
+	# coincident, opposite edges
+	q = np.round(np.asarray(points) / precision).astype(np.int64)
+	edges = np.concatenate([q, np.roll(q, -1, axis=0)], axis=1)
+	as_void = lambda k: np.ascontiguousarray(k).view(np.dtype((np.void, k.dtype.itemsize * 4))).ravel()
+	return int(np.isin(as_void(edges), as_void(edges[:, [2, 3, 0, 1]])).sum()) // 2
+
+def stitch_group(job):
+	polygons, precision = job
+	return [p.points for p in gdstk.boolean(polygons, [], "or", precision)]
+
+def stitch_groups(pieces, tiles):
+	# connected groups of pieces touching across a tile cut (by bounding box)
+	boxes = lib_tile.polygon_boxes(pieces)
+	i, j = lib_rtree.RTree(boxes).query_pairs(boxes)
+	parent = list(range(len(pieces)))
+	def find(k):
+		while parent[k] != k:
+			parent[k] = parent[parent[k]]
+			k = parent[k]
+		return k
+	for a, b in zip(i, j):
+		if tiles[a] != tiles[b]:
+			parent[find(a)] = find(b)
+	groups = {}
+	for k in range(len(pieces)):
+		groups.setdefault(find(k), []).append(pieces[k])
+	return list(groups.values())
+
+def merge_tiles(func, jobs, precision=1e-3, processes=None, stitch_points=STITCH_POINTS, stitch_holes=STITCH_HOLES):
+	# runs func(job) -> (interior pieces, pieces on a cut) over tile jobs and
+	# yields the interior pieces and the stitched pieces
+	edge = []
+	tiles = []
+	for tile, (inner, on_cut) in enumerate(lib_tile.run_tiles(func, jobs, processes)):
+		yield from inner
+		edge += on_cut
+		tiles += [tile] * len(on_cut)
+	stitch_jobs = []
+	for group in stitch_groups(edge, tiles):
+		if (
+			len(group) == 1 or sum(len(p) for p in group) > stitch_points or
+			sum(hole_count(p, precision) for p in group) > stitch_holes
+		):
+			yield from group
+		else:
+			stitch_jobs.append((group, precision))
+	for stitched in lib_tile.run_tiles(stitch_group, stitch_jobs, processes):
+		yield from stitched
+
+def merge_layer(polygons, bbox, tile_size=500, precision=1e-3, processes=None, stitch_points=STITCH_POINTS):
+	# merged polygons (point arrays) of one flattened layer, yielded tile by tile
+	grid = lib_tile.TileGrid(bbox, tile_size, precision)
+	jobs = tile_jobs(grid, polygons, precision)
+	return merge_tiles(merge_tile, jobs, precision, processes, stitch_points)
+
+def flat_layers(cell, layers=None):
+	# (layer, datatype) pairs of the polygons and paths below cell
+	found = set()
+	for c in [cell] + cell.dependencies(True):
+		for obj in c.polygons:
+			found.add((obj.layer, obj.datatype))
+		for obj in c.paths:
+			found.update(zip(obj.layers, obj.datatypes))
+	return sorted(found if layers is None else found & set(layers))
+
+def flat_polygons(cell, layer, datatype=None, ignore_datatypes=()):
+	# flattened point arrays of one layer (any datatype but ignore_datatypes if None)
+	if datatype is None:
+		return [p.points for p in cell.get_polygons() if p.layer == layer and p.datatype not in ignore_datatypes]
+	return [p.points for p in cell.get_polygons(layer=layer, datatype=datatype)]
+
+def local_box(box, matrix, shift):
+	# (4,) box in the frame of a placed cell that covers box of the parent frame
+	corners = np.array([(box[0], box[1]), (box[2], box[1]), (box[2], box[3]), (box[0], box[3])])
+	p = (corners - shift) @ np.linalg.inv(matrix).T
+	return np.concatenate([p.min(axis=0), p.max(axis=0)])
+
+class LayerIndex:
+	# own shapes of one layer (any datatype if None) and references of every
+	# cell, indexed by box in the frame of the cell, once per cell
+	def __init__(self, layer, datatype=None):
+		self.layer = layer
+		self.datatype = datatype
+		self.cells = {} # name -> (polygons, R-tree, references, R-tree of reference boxes, box or None)
+
+	def get(self, cell):
+		if cell.name not in self.cells:
+			polygons = [
+				p.points for p in cell.get_polygons(depth=0)
+				if p.layer == self.layer and (self.datatype is None or p.datatype == self.datatype)
+			]
+			boxes = lib_tile.polygon_boxes(polygons)
+			refs = []
+			ref_boxes = []
+			for ref in cell.references:
+				if not isinstance(ref.cell, gdstk.Cell) or self.get(ref.cell)[4] is None:
+					continue
+				elements = lib_region.placed_boxes(
+					self.get(ref.cell)[4][None], lib_region.reference_matrix(ref), ref.origin + lib_region.reference_offsets(ref)
+				)
+				refs.append(ref)
+				ref_boxes.append(np.concatenate([elements[:, :2].min(axis=0), elements[:, 2:].max(axis=0)]))
+			ref_boxes = np.array(ref_boxes, dtype=float).reshape(-1, 4)
+			every = np.concatenate([boxes.reshape(-1, 4), ref_boxes])
+			box = np.concatenate([every[:, :2].min(axis=0), every[:, 2:].max(axis=0)]) if len(every) else None
+			self.cells[cell.name] = polygons, lib_rtree.RTree(boxes), refs, lib_rtree.RTree(ref_boxes), box
+		return self.cells[cell.name]
+
+	def polygons(self, cell, box):
+		# placed point arrays of the shapes below cell whose box overlaps box
+		found = []
+		stack = [(cell, np.eye(2), np.zeros(2))]
+		while stack:
+			cell, matrix, shift = stack.pop()
+			polygons, tree, refs, ref_tree, _ = self.get(cell)
+			local = local_box(box, matrix, shift)
+			found += [polygons[k] @ matrix.T + shift for k in tree.query(local)]
+			for r in ref_tree.query(local):
+				ref = refs[r]
+				element = lib_region.reference_matrix(ref)
+				offsets = ref.origin + lib_region.reference_offsets(ref)
+				child = self.get(ref.cell)
+				hits = offsets[lib_rtree.overlaps(lib_region.placed_boxes(child[4][None], element, offsets), local)]
+				placed = hits @ matrix.T + shift
+				if not child[2]:
+					# leaf cell (e.g. a fill square): all its elements at once
+					shapes = [points @ (matrix @ element).T for points in child[0]]
+					found += [points + offset for offset in placed for points in shapes]
+				else:
+					stack += [(ref.cell, matrix @ element, offset) for offset in placed]
+		return found
+
+SOURCES = {} # per process: file name -> gdstk.Library, (cell, layer, datatype) -> LayerIndex
+
+def source_index(filename, cell, layer, datatype):
+	# library read once per process, LayerIndex once per layer
+	if filename not in SOURCES:
+		SOURCES.clear()
+		SOURCES[filename] = gdstk.read_gds(filename)
+	key = (cell, layer, datatype)
+	if key not in SOURCES:
+		SOURCES[key] = LayerIndex(layer, datatype)
+	return SOURCES[filename][cell], SOURCES[key]
+
+def flat_tile(job):
+	# flattens and merges one tile of one layer read from the source file
+	filename, cell, layer, datatype, box, cuts, precision = job
+	top, index = source_index(filename, cell, layer, datatype)
+	polygons = index.polygons(top, box)
+	if not polygons:
+		return [], []
+	return merge_tile((box, cuts, polygons, precision))
+
+def export(filename, output, cell=None, layers=None, tile_size=500, per_layer=False, processes=None):
+	# writes the merged flat layers of cell (default: the single top cell) into
+	# output, or into "<output>_<layer>_<datatype>.gds" files with per_layer=True;
+	# returns the list of written files
+	with lib_gdsscan.GdsScan(filename) as scan:
+		units = scan.units
+		libname = scan.libname
+		top_level = scan.top_level()
+	if cell is None:
+		if len(top_level) != 1:
+			raise ValueError(f"export(): '{filename}' has {len(top_level)} top cells, choose one")
+		cell = top_level[0]
+	lib = gdstk.read_gds(filename)
+	top = lib[cell]
+	precision = lib.precision / lib.unit
+	bbox = top.bounding_box()
+	keys = flat_layers(top, layers)
+	del lib, top # the workers read the tiles from the file
+	grid = lib_tile.TileGrid(bbox, tile_size, precision)
+	root = os.path.splitext(output)[0]
+	written = []
+	writer = None
+	for layer, datatype in keys:
+		if per_layer or writer is None:
+			if writer is not None:
+				writer.end_structure()
+				writer.close()
+			written.append(f"{root}_{layer}_{datatype}.gds" if per_layer else output)
+			writer = lib_gdsscan.GdsWriter(written[-1], units, libname)
+			writer.begin_structure(cell)
+		jobs = (
+			(filename, cell, layer, datatype, grid.box(tile), tile_cuts(grid, tile), precision)
+			for tile in range(len(grid))
+		)
+		count = 0
+		for polygon in merge_tiles(flat_tile, jobs, precision, processes):
+			writer.add_polygons([polygon], layer, datatype)
+			count += 1
+		print(f"[flat] {layer}/{datatype}: {count} polygons from {len(grid)} tiles")
+	if writer is not None:
+		writer.end_structure()
+		writer.close()
+	SOURCES.clear()
+	return written
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="mask-ready flat export of a GDS file")
+	parser.add_argument("input")
+	parser.add_argument("output")
+	parser.add_argument("--cell", default=None)
+	parser.add_argument("--tile", type=float, default=500)
+	parser.add_argument("--per-layer", action="store_true")
+	parser.add_argument("--processes", type=int, default=None)
+	args = parser.parse_args()
+	for name in export(args.input, args.output, args.cell, None, args.tile, args.per_layer, args.processes):
+		print(f"[out] saved flat GDS as '{name}'")
@@ -0,0 +1,496 @@
+# AIST 2025 GDS record scanner
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Zero-copy scanner over a memory-mapped GDS file. Lists structures, their
+# references, layers and bounding boxes without building gdstk objects, and
+# copies structures record-by-record into a new GDS file. Only the cells that
+# are actually modified need to be materialized with gdstk (read_cells()).
+
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+
+import gdstk
+import numpy as np
+
+# GDS record types
+HEADER       = 0x00
+BGNLIB       = 0x01
+LIBNAME      = 0x02
+UNITS        = 0x03
+ENDLIB       = 0x04
+BGNSTR       = 0x05
+STRNAME      = 0x06
+ENDSTR       = 0x07
+BOUNDARY     = 0x08
+PATH         = 0x09
+SREF         = 0x0A
+AREF         = 0x0B
+TEXT         = 0x0C
+LAYER        = 0x0D
+DATATYPE     = 0x0E
+WIDTH        = 0x0F
+XY           = 0x10
+ENDEL        = 0x11
+SNAME        = 0x12
+COLROW       = 0x13
+NODE         = 0x15
+TEXTTYPE     = 0x16
+PRESENTATION = 0x17
+STRING       = 0x19
+STRANS       = 0x1A
+MAG          = 0x1B
+ANGLE        = 0x1C
+PATHTYPE     = 0x21
+ELFLAGS      = 0x26
+PROPATTR     = 0x2B
+PROPVALUE    = 0x2C
+BOX          = 0x2D
+BOXTYPE      = 0x2E
+PLEX         = 0x2F
+BGNEXTN      = 0x30
+ENDEXTN      = 0x31
+
+ELEMENT_START = (BOUNDARY, PATH, SREF, AREF, TEXT, NODE, BOX)
+
+# GDS data types
+NO_DATA = 0
+INT16   = 2
+INT32   = 3
+REAL64  = 5
+ASCII   = 6
+
+RECORD_HEADER = struct.Struct(">HBB")
+
+def iter_records(data, start=0, end=None):
+	# yields (offset, record type, payload) for every record in a GDS stream
+	end = len(data) if end is None else end
+	offset = start
+	while offset + 4 <= end:
+		length, rtype, _ = RECORD_HEADER.unpack_from(data, offset)
+		if length < 4:
+			raise ValueError(f"iter_records(): broken record at offset {offset}")
+		yield offset, rtype, data[offset+4:offset+length]
+		offset += length
+		if rtype == ENDLIB:
+			break
+
+def decode_string(payload):
+	return bytes(payload).rstrip(b"\0").decode("ascii", errors="replace")
+
+def encode_string(text):
+	data = text.encode("ascii")
+	if len(data) % 2:
+		data += b"\0"
+	return data
+
+def gds_real(payload):
+	# 8-byte excess-64 GDS real
+	b = bytes(payload[:8])
+	sign = -1 if b[0] & 0x80 else 1
+	exponent = (b[0] & 0x7F) - 64
+	mantissa = int.from_bytes(b[1:8], "big") / 2**56
+	return sign * mantissa * 16.0**exponent
+
+def encode_real(value):
+	# 8-byte excess-64 GDS real
+	if value == 0:
+		return bytes(8)
+	sign = 0x80 if value < 0 else 0
+	value = abs(value)
+	exponent = 0
+	while value >= 1:
+		value /= 16
+		exponent += 1
+	while value < 1/16:
+		value *= 16
+		exponent -= 1
+	mantissa = round(value * 2**56)
+	if mantissa == 2**56:
+		mantissa //= 16
+		exponent += 1
+	return bytes([sign | (exponent + 64)]) + mantissa.to_bytes(7, "big")
+
+def units_payload(unit=1e-6, precision=1e-9):
+	# UNITS payload from gdstk style user unit and database unit in meters
+	return encode_real(precision / unit) + encode_real(precision)
+
+def same_units(units1, units2):
+	# compares two UNITS payloads by value, not by encoding
+	a = (gds_real(units1[:8]), gds_real(units1[8:]))
+	b = (gds_real(units2[:8]), gds_real(units2[8:]))
+	return all(abs(x - y) <= 1e-9 * abs(y) for x, y in zip(a, b))
+
+def record(rtype, dtype, payload=b""):
+	return RECORD_HEADER.pack(4 + len(payload), rtype, dtype) + payload
+
+class Structure:
+	__slots__ = ("name", "start", "end", "children", "layers", "bbox")
+
+	def __getstate__(self):
+		return tuple(getattr(self, key) for key in self.__slots__)
+
+	def __setstate__(self, state):
+		for key, value in zip(self.__slots__, state):
+			setattr(self, key, value)
+
+	def __init__(self, name, start):
+		self.name = name
+		self.start = start    # offset of BGNSTR
+		self.end = None       # offset right after ENDSTR
+		self.children = set() # names of referenced structures
+		self.layers = set()   # (layer, datatype/texttype) of own elements
+		self.bbox = None      # own elements only, database units
+
+class Reference:
+	__slots__ = ("name", "x_reflection", "magnification", "rotation", "columns", "rows", "xy")
+
+	def __init__(self):
+		self.name = None
+		self.x_reflection = False
+		self.magnification = 1.0
+		self.rotation = 0.0 # degrees
+		self.columns = 1
+		self.rows = 1
+		self.xy = None      # database units, 1 point (SREF) or 3 points (AREF)
+
+	def transform_points(self, points):
+		# applies magnification, reflection, rotation and translation (no repetition)
+		p = np.asarray(points, dtype=float) * self.magnification
+		if self.x_reflection:
+			p = p * [1, -1]
+		c = np.cos(np.radians(self.rotation))
+		s = np.sin(np.radians(self.rotation))
+		p = np.stack([c*p[:, 0] - s*p[:, 1], s*p[:, 0] + c*p[:, 1]], axis=1)
+		return p + self.xy[0]
+
+	def offsets(self):
+		# array element offsets relative to the first element
+		if self.xy is None or len(self.xy) < 3:
+			return np.zeros((1, 2))
+		v1 = (self.xy[1] - self.xy[0]) / self.columns
+		v2 = (self.xy[2] - self.xy[0]) / self.rows
+		i, j = np.meshgrid(np.arange(self.columns), np.arange(self.rows), indexing="ij")
+		return i.reshape(-1, 1) * v1 + j.reshape(-1, 1) * v2
+
+class GdsScan:
+	def __init__(self, filename, index=None):
+		# index: result of index_state() from an earlier scan of the same file
+		self.filename = filename
+		self._file = open(filename, "rb")
+		self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.data = memoryview(self._mmap)
+		self.libname = ""
+		self.units = b""
+		self.structures = {} # {name: Structure}, in file order
+		self._bbox_cache = {}
+		if index is None:
+			self._index()
+		else:
+			self.libname, self.units, self.structures = index
+
+	def index_state(self):
+		# picklable structure index, to hand a scan to another process
+		return self.libname, self.units, self.structures
+
+	def close(self):
+		self.data.release()
+		self._mmap.close()
+		self._file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	@property
+	def unit(self):
+		# user unit in meters and database unit in meters, like gdstk
+		db_in_user = gds_real(self.units[:8])
+		db_in_meter = gds_real(self.units[8:])
+		return db_in_meter / db_in_user, db_in_meter
+
+	def _index(self):
+		current = None
+		element = None
+		xy_min = []
+		xy_max = []
+		for offset, rtype, payload in iter_records(self.data):
+			if rtype == LIBNAME:
+				self.libname = decode_string(payload)
+			elif rtype == UNITS:
+				self.units = bytes(payload)
+			elif rtype == BGNSTR:
+				current = Structure(None, offset)
+				xy_min = []
+				xy_max = []
+			elif rtype == STRNAME:
+				current.name = decode_string(payload)
+			elif rtype == ENDSTR:
+				current.end = offset + 4
+				if xy_min:
+					current.bbox = np.concatenate([np.min(xy_min, axis=0), np.max(xy_max, axis=0)])
+				self.structures[current.name] = current
+				current = None
+			elif rtype in ELEMENT_START:
+				element = rtype
+				layer = None
+				half_width = 0
+			elif rtype == LAYER:
+				layer = struct.unpack(">h", payload)[0]
+			elif rtype in (DATATYPE, TEXTTYPE, BOXTYPE):
+				current.layers.add((layer, struct.unpack(">h", payload)[0]))
+			elif rtype == WIDTH:
+				half_width = abs(struct.unpack(">i", payload)[0]) // 2
+			elif rtype == SNAME:
+				current.children.add(decode_string(payload))
+			elif rtype == XY and element not in (SREF, AREF):
+				xy = np.frombuffer(payload, dtype=">i4").reshape(-1, 2)
+				xy_min.append(xy.min(axis=0) - half_width)
+				xy_max.append(xy.max(axis=0) + half_width)
+			elif rtype == ENDEL:
+				element = None
+
+	def records(self, name):
+		s = self.structures[name]
+		return iter_records(self.data, s.start, s.end)
+
+	def references(self, name):
+		# detailed references of one structure
+		refs = []
+		ref = None
+		for _, rtype, payload in self.records(name):
+			if rtype in (SREF, AREF):
+				ref = Reference()
+			elif ref is None:
+				continue
+			elif rtype == SNAME:
+				ref.name = decode_string(payload)
+			elif rtype == STRANS:
+				ref.x_reflection = bool(payload[0] & 0x80)
+			elif rtype == MAG:
+				ref.magnification = gds_real(payload)
+			elif rtype == ANGLE:
+				ref.rotation = gds_real(payload)
+			elif rtype == COLROW:
+				ref.columns, ref.rows = struct.unpack(">hh", payload)
+			elif rtype == XY:
+				ref.xy = np.frombuffer(payload, dtype=">i4").reshape(-1, 2).astype(float)
+			elif rtype == ENDEL:
+				refs.append(ref)
+				ref = None
+		return refs
+
+	def top_level(self):
+		referenced = set()
+		for s in self.structures.values():
+			referenced |= s.children
+		return [name for name in self.structures if name not in referenced]
+
+	def dependencies(self, name):
+		# name and every structure below it, children first
+		order = []
+		seen = set()
+		stack = [(name, False)]
+		while stack:
+			current, expanded = stack.pop()
+			if expanded:
+				order.append(current)
+				continue
+			if current in seen or current not in self.structures:
+				continue
+			seen.add(current)
+			stack.append((current, True))
+			stack.extend((c, False) for c in sorted(self.structures[current].children))
+		return order
+
+	def bounding_box(self, name):
+		# hierarchical bounding box in database units, None for empty cells
+		for current in self.dependencies(name):
+			if current in self._bbox_cache:
+				continue
+			boxes = []
+			if self.structures[current].bbox is not None:
+				boxes.append(self.structures[current].bbox)
+			for ref in self.references(current):
+				child = self._bbox_cache.get(ref.name)
+				if child is None:
+					continue
+				corners = np.array([
+					[child[0], child[1]], [child[2], child[1]],
+					[child[2], child[3]], [child[0], child[3]],
+				])
+				p = ref.transform_points(corners)
+				p = (p[None, :, :] + ref.offsets()[:, None, :]).reshape(-1, 2)
+				boxes.append(np.concatenate([p.min(axis=0), p.max(axis=0)]))
+			if boxes:
+				boxes = np.array(boxes, dtype=float)
+				self._bbox_cache[current] = np.concatenate([boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)])
+			else:
+				self._bbox_cache[current] = None
+		return self._bbox_cache[name]
+
+	def user_bounding_box(self, name):
+		# hierarchical bounding box in user units ((xmin, ymin), (xmax, ymax)), like gdstk
+		bbox = self.bounding_box(name)
+		if bbox is None:
+			return None
+		x0, y0, x1, y1 = (round(float(v) * gds_real(self.units[:8]), 9) for v in bbox)
+		return ((x0, y0), (x1, y1))
+
+def read_cells(scan, names):
+	# materializes only the given structures (and their dependencies) with gdstk
+	order = []
+	for name in names:
+		order += [n for n in scan.dependencies(name) if n not in order]
+	fd, filename = tempfile.mkstemp(suffix=".gds")
+	os.close(fd)
+	try:
+		with GdsWriter(filename, scan.units, scan.libname) as writer:
+			for name in order:
+				writer.copy(scan, name)
+		return gdstk.read_gds(filename)
+	finally:
+		os.remove(filename)
+
+class GdsWriter:
+	def __init__(self, filename, units, libname="LIB"):
+		self._file = open(filename, "wb")
+		self.units = units
+		self.names = set()
+		now = datetime.datetime.now()
+		stamp = struct.pack(">6h", now.year, now.month, now.day, now.hour, now.minute, now.second)
+		self._file.write(record(HEADER, INT16, struct.pack(">h", 600)))
+		self._file.write(record(BGNLIB, INT16, stamp + stamp))
+		self._file.write(record(LIBNAME, ASCII, encode_string(libname)))
+		self._file.write(record(UNITS, REAL64, units))
+
+	def close(self):
+		if self._file is None:
+			return
+		self._file.write(record(ENDLIB, NO_DATA))
+		self._file.close()
+		self._file = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def copy(self, scan, name, new_name=None, rename=None, keep_element=None, layer_map=None):
+		# copies a structure from a scan; rename maps referenced names,
+		# keep_element(records) can drop elements and layer_map maps
+		# (layer, datatype) -> (layer, datatype). Unchanged structures are
+		# written as one zero-copy slice of the mapped file.
+		if not same_units(scan.units, self.units):
+			raise ValueError(f"GdsWriter.copy(): units of '{scan.filename}' do not match the output")
+		s = scan.structures[name]
+		new_name = new_name or name
+		self.names.add(new_name)
+		rename = rename or {}
+		layer_map = {k: v for k, v in (layer_map or {}).items() if k in s.layers and k != v}
+		by_element = keep_element is not None or bool(layer_map)
+		if new_name == name and not by_element and not (s.children & rename.keys()):
+			self._file.write(scan.data[s.start:s.end])
+			return
+		write = self._file.write
+		element = None
+		for offset, rtype, payload in scan.records(name):
+			if rtype == STRNAME:
+				write(record(STRNAME, ASCII, encode_string(new_name)))
+				continue
+			if rtype == SNAME:
+				child = decode_string(payload)
+				if child in rename:
+					raw = record(SNAME, ASCII, encode_string(rename[child]))
+				else:
+					raw = scan.data[offset:offset+4+len(payload)]
+			else:
+				raw = scan.data[offset:offset+4+len(payload)]
+			if not by_element:
+				write(raw)
+			elif rtype in ELEMENT_START:
+				element = [(rtype, payload, raw)]
+			elif element is not None:
+				element.append((rtype, payload, raw))
+				if rtype == ENDEL:
+					if keep_element is None or keep_element(element):
+						for r in remap_element(element, layer_map):
+							write(r)
+					element = None
+			else:
+				write(raw)
+
+	def begin_structure(self, name):
+		# opens a structure written element by element with add_polygons()
+		now = datetime.datetime.now()
+		stamp = struct.pack(">6h", now.year, now.month, now.day, now.hour, now.minute, now.second)
+		self.names.add(name)
+		self._file.write(record(BGNSTR, INT16, stamp + stamp))
+		self._file.write(record(STRNAME, ASCII, encode_string(name)))
+
+	def end_structure(self):
+		self._file.write(record(ENDSTR, NO_DATA))
+
+	def add_polygons(self, polygons, layer, datatype=0, max_points=8190):
+		# BOUNDARY elements from (n, 2) point arrays in user units; polygons
+		# above the GDS vertex limit are fractured first
+		scale = 1 / gds_real(self.units[:8]) # user units -> database units
+		write = self._file.write
+		head = record(LAYER, INT16, struct.pack(">h", layer)) + record(DATATYPE, INT16, struct.pack(">h", datatype))
+		for points in polygons:
+			pieces = [points]
+			if len(points) > max_points:
+				pieces = [p.points for p in gdstk.Polygon(points).fracture(max_points, 1 / scale)]
+			for p in pieces:
+				xy = np.round(np.asarray(p) * scale)
+				xy = np.concatenate([xy, xy[:1]]).astype(">i4")
+				write(record(BOUNDARY, NO_DATA))
+				write(head)
+				write(record(XY, INT32, xy.tobytes()))
+				write(record(ENDEL, NO_DATA))
+
+	def add_cells(self, *cells):
+		# writes gdstk cells through a temporary library
+		fd, filename = tempfile.mkstemp(suffix=".gds")
+		os.close(fd)
+		try:
+			precision = gds_real(self.units[8:])
+			lib = gdstk.Library(unit=precision / gds_real(self.units[:8]), precision=precision)
+			lib.add(*cells)
+			lib.write_gds(filename)
+			with GdsScan(filename) as scan:
+				for cell in cells:
+					self.copy(scan, cell.name)
+		finally:
+			os.remove(filename)
+
+def remap_element(element, layer_map):
+	# raw records of an element with its (layer, datatype) mapped
+	layer = element_layer(element) if layer_map else None
+	if layer not in layer_map:
+		return [r for _, _, r in element]
+	new_layer, new_type = layer_map[layer]
+	records = []
+	for rtype, _, raw in element:
+		if rtype == LAYER:
+			raw = record(LAYER, INT16, struct.pack(">h", new_layer))
+		elif rtype in (DATATYPE, TEXTTYPE, BOXTYPE):
+			raw = record(rtype, INT16, struct.pack(">h", new_type))
+		records.append(raw)
+	return records
+
+def element_layer(element):
+	# (layer, datatype) of an element from GdsWriter.copy(keep_element=...), None for references
+	layer = None
+	for rtype, payload, *_ in element:
+		if rtype == LAYER:
+			layer = struct.unpack(">h", payload)[0]
+		elif rtype in (DATATYPE, TEXTTYPE, BOXTYPE):
+			return (layer, struct.unpack(">h", payload)[0])
+	return None
@@ -0,0 +1,129 @@
+# AIST 2025 layout fingerprint
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Canonical geometry hash per cell and a top-level fingerprint of a GDS file.
+# Hashes are computed from the GDS records, so they ignore the timestamps in
+# BGNLIB/BGNSTR, the order of elements inside a cell and the order of cells.
+# A cell hash covers its whole hierarchy: references are hashed through the
+# hash of the referenced cell, not its name.
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import lib_gdsscan as gds
+
+# records that do not change the geometry
+IGNORED_RECORDS = (gds.ELFLAGS, gds.PLEX, gds.PROPATTR, gds.PROPVALUE)
+
+def canonical_xy(payload, closed):
+	xy = np.frombuffer(payload, dtype=">i4").astype(np.int64).reshape(-1, 2)
+	if not closed or len(xy) < 3:
+		return xy.astype(">i8").tobytes()
+	if (xy[0] == xy[-1]).all():
+		xy = xy[:-1]
+	# counter-clockwise orientation
+	area = np.sum(xy[:, 0] * np.roll(xy[:, 1], -1) - np.roll(xy[:, 0], -1) * xy[:, 1])
+	if area < 0:
+		xy = xy[::-1]
+	# start from the lexicographically smallest vertex
+	start = np.lexsort((xy[:, 1], xy[:, 0]))[0]
+	xy = np.roll(xy, -start, axis=0)
+	return xy.astype(">i8").tobytes()
+
+def element_digest(records, child_hash):
+	# records: list of (record type, payload) of one element, without ENDEL
+	kind = records[0][0]
+	h = hashlib.blake2b(digest_size=16)
+	h.update(bytes([kind]))
+	for rtype, payload in records[1:]:
+		if rtype in IGNORED_RECORDS:
+			continue
+		h.update(bytes([rtype]))
+		if rtype == gds.SNAME:
+			h.update(child_hash(gds.decode_string(payload)).encode())
+		elif rtype == gds.XY:
+			h.update(canonical_xy(payload, kind in (gds.BOUNDARY, gds.BOX)))
+		else:
+			h.update(bytes(payload))
+	return h.digest()
+
+def structure_elements(scan, name):
+	# [element records] of one structure, each a list of (record type, payload)
+	elements = []
+	element = None
+	for _, rtype, payload in scan.records(name):
+		if rtype in gds.ELEMENT_START:
+			element = [(rtype, payload)]
+		elif rtype == gds.ENDEL:
+			elements.append(element)
+			element = None
+		elif element is not None:
+			element.append((rtype, payload))
+	return elements
+
+def cell_hashes(scan, names=None):
+	# {cell name: hex digest} for the given cells (default: all) and their
+	# dependencies; missing (external) cells are hashed by name
+	hashes = {}
+	def child_hash(name):
+		return hashes.get(name, "external:" + name)
+	for name in names if names is not None else scan.structures:
+		for current in scan.dependencies(name):
+			if current in hashes:
+				continue
+			digests = sorted(element_digest(e, child_hash) for e in structure_elements(scan, current))
+			h = hashlib.blake2b(digest_size=16)
+			for d in digests:
+				h.update(d)
+			hashes[current] = h.hexdigest()
+	return hashes
+
+def fingerprint(hashes, top, units):
+	h = hashlib.blake2b(digest_size=16)
+	h.update(units)
+	for name in sorted(top):
+		h.update(name.encode() + b"\0" + hashes[name].encode())
+	return h.hexdigest()
+
+def gds_manifest(filename):
+	with gds.GdsScan(filename) as scan:
+		hashes = cell_hashes(scan)
+		top = sorted(scan.top_level())
+		units = scan.units
+	return {
+		"file": os.path.basename(filename),
+		"fingerprint": fingerprint(hashes, top, units),
+		"units": units.hex(),
+		"top": {name: hashes[name] for name in top},
+		"cells": dict(sorted(hashes.items())),
+	}
+
+def manifest_filename(gds_filename):
+	return os.path.splitext(gds_filename)[0] + ".manifest.json"
+
+def read_manifest(filename):
+	if not os.path.exists(filename):
+		return None
+	with open(filename) as f:
+		return json.load(f)
+
+def write_manifest(gds_filename, filename=None):
+	# writes <name>.manifest.json next to the GDS, returns the manifest
+	filename = filename or manifest_filename(gds_filename)
+	manifest = gds_manifest(gds_filename)
+	old = read_manifest(filename)
+	with open(filename, "w") as f:
+		json.dump(manifest, f, indent=1)
+		f.write("\n")
+	status = "unchanged" if old and old["fingerprint"] == manifest["fingerprint"] else "changed"
+	print(f"[out] saved manifest as '{filename}' (fingerprint {manifest['fingerprint']}, {status})")
+	return manifest
+
+if __name__ == "__main__":
+	for gds_filename in sys.argv[1:]:
+		print(gds_manifest(gds_filename)["fingerprint"], gds_filename)
@@ -0,0 +1,197 @@
+# AIST 2025 hierarchy helpers for verification
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Interaction regions of a cell: the places where the shapes of its items (own
+# shapes, every element of every reference) come within a rule distance of the
+# shapes of another item. Checks of the cells themselves run once per unique
+# cell; only these regions need a look at the placed geometry, which is
+# gathered from per-cell flattened layers (in the frame of the referenced cell,
+# indexed once by an R-tree) and moved into the frame of the parent.
+#
+# Regions are keyed by their content relative to the region corner (cells,
+# transforms, own shape coordinates), so congruent regions, e.g. between the
+# neighbouring elements of an array, are checked once. With the cells named by
+# their LayerDigests content hash the keys stay valid from run to run, and
+# results can be cached across edits of the layout.
+
+import hashlib
+
+import gdstk
+import numpy as np
+
+import lib_region
+import lib_rtree
+import lib_tile
+
+def elements(cell):
+	# [(cell, origin, rotation, magnification, x_reflection)] of every element
+	# of every reference to a gdstk.Cell
+	found = []
+	for ref in cell.references:
+		if not isinstance(ref.cell, gdstk.Cell):
+			continue
+		for offset in lib_region.reference_offsets(ref):
+			origin = (ref.origin[0] + offset[0], ref.origin[1] + offset[1])
+			found.append((ref.cell, origin, ref.rotation, ref.magnification, ref.x_reflection))
+	return found
+
+def place(points, element):
+	_, origin, rotation, magnification, x_reflection = element
+	return lib_region.transform_points(points, origin, rotation, magnification, x_reflection)
+
+def unplace(points, element):
+	# parent frame -> frame of the element cell
+	_, origin, rotation, magnification, x_reflection = element
+	p = np.asarray(points, dtype=float) - origin
+	c = np.cos(-rotation)
+	s = np.sin(-rotation)
+	p = np.stack([c*p[:, 0] - s*p[:, 1], s*p[:, 0] + c*p[:, 1]], axis=1)
+	if x_reflection:
+		p = p * [1, -1]
+	return p / magnification
+
+def box_corners(box):
+	x0, y0, x1, y1 = box
+	return np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+
+def corners_box(points):
+	return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+class FlatLayers:
+	# flattened layers of cells in their own frame, indexed once per (cell, layer)
+	def __init__(self, polygons):
+		self.polygons = polygons # polygons(cell, key) -> list of point arrays
+		self.cache = {}
+
+	def get(self, cell, key):
+		# (polygons, boxes, R-tree or None, bounding box or None)
+		if (cell.name, key) not in self.cache:
+			polygons = self.polygons(cell, key)
+			boxes = lib_tile.polygon_boxes(polygons)
+			if polygons:
+				self.cache[cell.name, key] = polygons, boxes, lib_rtree.RTree(boxes), np.concatenate([boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)])
+			else:
+				self.cache[cell.name, key] = polygons, boxes, None, None
+		return self.cache[cell.name, key]
+
+	def element_box(self, element, key):
+		box = self.get(element[0], key)[3]
+		return None if box is None else corners_box(place(box_corners(box), element))
+
+	def near(self, element, key, box):
+		# polygons of an element that overlap box (parent frame), in the parent frame
+		polygons, _, tree, _ = self.get(element[0], key)
+		if tree is None:
+			return []
+		return [place(polygons[k], element) for k in tree.query(corners_box(unplace(box_corners(box), element)))]
+
+def polygons_digest(polygons, precision=1e-3):
+	# order independent hash of point arrays on the database grid
+	h = hashlib.blake2b(digest_size=16)
+	for points in sorted(np.round(p / precision).astype(np.int64).tobytes() for p in polygons):
+		h.update(len(points).to_bytes(4, "little") + points)
+	return h.hexdigest()
+
+class LayerDigests:
+	# content hash of the shapes of a cell and everything below it on one layer
+	def __init__(self, polygons, precision=1e-3):
+		self.polygons = polygons # polygons(cell, key) -> own point arrays of a cell
+		self.precision = precision
+		self.cache = {}
+
+	def own(self, cell, key):
+		return polygons_digest(self.polygons(cell, key), self.precision)
+
+	def get(self, cell, key):
+		if (cell.name, key) not in self.cache:
+			parts = [self.own(cell, key)]
+			for ref in cell.references:
+				if not isinstance(ref.cell, gdstk.Cell):
+					continue
+				offsets = np.round(lib_region.reference_offsets(ref) / self.precision).astype(np.int64)
+				parts.append(
+					f"{self.get(ref.cell, key)}:{ref.origin[0]:.6f}:{ref.origin[1]:.6f}:{ref.rotation:.9f}:"
+					f"{ref.magnification:.9f}:{int(ref.x_reflection)}:{hashlib.blake2b(offsets.tobytes(), digest_size=8).hexdigest()}"
+				)
+			self.cache[cell.name, key] = hashlib.blake2b("\n".join(sorted(parts)).encode(), digest_size=16).hexdigest()
+		return self.cache[cell.name, key]
+
+def interaction_regions(cell, key, distance, flat, own):
+	# [(region box, [item ids])] of one cell and layer; own: the own polygons of
+	# the cell. Items are "own" shapes and element indices of elements(cell).
+	placed = elements(cell)
+	boxes = [flat.element_box(element, key) for element in placed]
+	index = [k for k, box in enumerate(boxes) if box is not None]
+	if not index:
+		return placed, []
+	boxes = np.array([boxes[k] for k in index])
+	tree = lib_rtree.RTree(boxes)
+	grow = np.array([-distance, -distance, distance, distance])
+	regions = []
+	# element against element
+	i, j = tree.query_pairs(boxes, distance)
+	for a, b in zip(i[i < j], j[i < j]):
+		box_a = boxes[a] + grow
+		box_b = boxes[b] + grow
+		region = np.concatenate([np.maximum(box_a[:2], box_b[:2]), np.minimum(box_a[2:], box_b[2:])])
+		regions.append(region)
+	# own shapes against each element, one region per element
+	if own:
+		own_boxes = lib_tile.polygon_boxes(own)
+		p, e = lib_rtree.RTree(own_boxes).query_pairs(boxes, distance)
+		for element in np.unique(e):
+			hits = own_boxes[p[e == element]] + grow
+			near = np.concatenate([hits[:, :2].min(axis=0), hits[:, 2:].max(axis=0)])
+			box = boxes[element] + grow
+			regions.append(np.concatenate([np.maximum(near[:2], box[:2]), np.minimum(near[2:], box[2:])]))
+	result = []
+	own_tree = lib_rtree.RTree(lib_tile.polygon_boxes(own)) if own else None
+	for region in regions:
+		items = [index[k] for k in tree.query(region)]
+		if own_tree is not None and len(own_tree.query(region)):
+			items.append("own")
+		result.append((region, items))
+	return placed, result
+
+def interacting(groups, distance):
+	# (groups reduced to the polygons within distance of a polygon of another
+	# group plus the polygons around those, (n, 4) zones where they meet)
+	if len(groups) < 2:
+		return [], np.zeros((0, 4))
+	polygons = [p for group in groups for p in group]
+	owner = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+	boxes = lib_tile.polygon_boxes(polygons)
+	i, j = lib_tile.box_pairs(boxes, 2 * distance)
+	cross = owner[i] != owner[j]
+	if not cross.any():
+		return [], np.zeros((0, 4))
+	grow = np.array([-distance, -distance, distance, distance])
+	zones = np.concatenate([
+		np.maximum(boxes[i[cross], :2], boxes[j[cross], :2]), np.minimum(boxes[i[cross], 2:], boxes[j[cross], 2:])
+	], axis=1) + grow
+	seed = np.zeros(len(polygons), dtype=bool)
+	seed[i[cross]] = seed[j[cross]] = True
+	keep = seed.copy()
+	keep[i[seed[j]]] = keep[j[seed[i]]] = True
+	reduced = [[p for p, kept in zip(group, keep[owner == g]) if kept] for g, group in enumerate(groups)]
+	return [group for group in reduced if group], np.unique(zones, axis=0)
+
+def region_key(region, items, placed, own_near, precision=1e-3, cell_key=None):
+	# content hash of a region relative to its lower left corner; cells are
+	# described by cell_key(cell) (default: their name)
+	h = hashlib.blake2b(digest_size=16)
+	corner = region[:2]
+	h.update(np.round((region[2:] - corner) / precision).astype(np.int64).tobytes())
+	described = []
+	for item in items:
+		if item == "own":
+			continue
+		cell, origin, rotation, magnification, x_reflection = placed[item]
+		offset = np.round((np.asarray(origin) - corner) / precision).astype(np.int64)
+		described.append(f"{cell_key(cell) if cell_key else cell.name}:{rotation:.9f}:{magnification:.9f}:{int(x_reflection)}:{offset[0]}:{offset[1]}")
+	for name in sorted(described):
+		h.update(name.encode() + b"\0")
+	for points in sorted(np.round((p - corner) / precision).astype(np.int64).tobytes() for p in own_near):
+		h.update(points)
+	return h.hexdigest()
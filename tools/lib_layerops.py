@@ -0,0 +1,168 @@
+# AIST 2025 chip-scale layer algebra
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Boolean expressions over flattened layers, evaluated tile by tile in a
+# process pool (lib_tile) and stitched again at the tile cuts (lib_flatten).
+#
+#     SiWG = layer(30)
+#     chip = Chip("AIST2025_TLab.gds")
+#     dummy_free = chip.evaluate(SiWG - layer(60))
+#     chip.write({(130, 0): SiWG - layer(60), (136, 0): layer(36) & SiWG}, "ops.gds")
+#
+# Operators: | or, & and, - not, ^ xor, e.sized(d) grows (d > 0) or shrinks
+# (d < 0) by d. Each tile reads its shapes from the tile box grown by a halo
+# (the total sizing distance of the expression), so sizing near a tile cut sees
+# the shapes of the neighbouring tile; the result is clipped to the tile box.
+
+import gdstk
+
+import lib_flatten
+import lib_gdsscan
+import lib_tile
+
+class Expr:
+	def __or__(self, other):
+		return Op("or", self, other)
+
+	def __and__(self, other):
+		return Op("and", self, other)
+
+	def __sub__(self, other):
+		return Op("not", self, other)
+
+	def __xor__(self, other):
+		return Op("xor", self, other)
+
+	def sized(self, distance):
+		return Size(self, distance)
+
+class Layer(Expr):
+	def __init__(self, layer, datatype=None):
+		self.key = (layer, datatype) # datatype None: any datatype
+
+	def __repr__(self):
+		layer, datatype = self.key
+		return f"layer({layer})" if datatype is None else f"layer({layer}, {datatype})"
+
+	def leaves(self):
+		return {self.key}
+
+	def halo(self):
+		return 0
+
+	def evaluate(self, shapes, precision):
+		return shapes[self.key]
+
+class Op(Expr):
+	def __init__(self, operation, a, b):
+		self.operation = operation
+		self.a = a
+		self.b = b
+
+	def __repr__(self):
+		return f"({self.a!r} {self.operation} {self.b!r})"
+
+	def leaves(self):
+		return self.a.leaves() | self.b.leaves()
+
+	def halo(self):
+		return max(self.a.halo(), self.b.halo())
+
+	def evaluate(self, shapes, precision):
+		a = self.a.evaluate(shapes, precision)
+		b = self.b.evaluate(shapes, precision)
+		if not a and self.operation in ("and", "not"):
+			return []
+		if not b and self.operation in ("and", "not"):
+			return [] if self.operation == "and" else a
+		return gdstk.boolean(a, b, self.operation, precision)
+
+class Size(Expr):
+	def __init__(self, a, distance):
+		self.a = a
+		self.distance = distance
+
+	def __repr__(self):
+		return f"{self.a!r}.sized({self.distance})"
+
+	def leaves(self):
+		return self.a.leaves()
+
+	def halo(self):
+		return self.a.halo() + abs(self.distance)
+
+	def evaluate(self, shapes, precision):
+		a = self.a.evaluate(shapes, precision)
+		if not a:
+			return []
+		return gdstk.offset(a, self.distance, join="miter", tolerance=2, precision=precision)
+
+def layer(layer, datatype=None):
+	return Layer(layer, datatype)
+
+def expression_tile(job):
+	# evaluates an expression on the shapes around one tile, clipped to the tile box
+	expr, box, cuts, shapes, precision = job
+	result = expr.evaluate(shapes, precision)
+	if not result:
+		return [], []
+	rect = gdstk.rectangle(box[:2], box[2:])
+	return lib_flatten.split_on_cuts(gdstk.boolean(result, rect, "and", precision), box, cuts, precision)
+
+class Chip:
+	# flattened layers of one cell, read once and shared by all expressions
+	def __init__(self, source, cell=None):
+		# source: GDS filename or gdstk.Cell
+		if isinstance(source, gdstk.Cell):
+			self.cell = source
+			self.precision = 1e-3
+			self.units = None
+		else:
+			lib = gdstk.read_gds(source)
+			self.cell = lib[cell] if cell else lib.top_level()[0]
+			self.precision = lib.precision / lib.unit
+			with lib_gdsscan.GdsScan(source) as scan:
+				self.units = scan.units
+		self.bbox = self.cell.bounding_box()
+		self._flat = {}
+
+	def flat(self, key):
+		# (point arrays, boxes) of a flattened layer
+		if key not in self._flat:
+			polygons = lib_flatten.flat_polygons(self.cell, *key)
+			self._flat[key] = polygons, lib_tile.polygon_boxes(polygons)
+		return self._flat[key]
+
+	def jobs(self, expr, grid):
+		halo = expr.halo()
+		tiles = {key: grid.assign(self.flat(key)[1], halo) for key in expr.leaves()}
+		used = sorted(set().union(*(t.keys() for t in tiles.values())))
+		for tile in used:
+			shapes = {}
+			for key, assigned in tiles.items():
+				polygons = self.flat(key)[0]
+				shapes[key] = [polygons[k] for k in assigned.get(tile, [])]
+			yield expr, grid.box(tile), lib_flatten.tile_cuts(grid, tile), shapes, self.precision
+
+	def evaluate(self, expr, tile_size=500, processes=None):
+		# result polygons (point arrays) of an expression over the whole cell
+		if self.bbox is None:
+			return []
+		halo = expr.halo()
+		(x0, y0), (x1, y1) = self.bbox
+		grid = lib_tile.TileGrid(((x0 - halo, y0 - halo), (x1 + halo, y1 + halo)), tile_size, self.precision)
+		return list(lib_flatten.merge_tiles(expression_tile, self.jobs(expr, grid), self.precision, processes))
+
+	def write(self, outputs, filename, name=None, tile_size=500, processes=None):
+		# writes {(layer, datatype): expression} as one flat cell
+		units = self.units
+		if units is None:
+			units = lib_gdsscan.units_payload(1e-6, self.precision * 1e-6)
+		with lib_gdsscan.GdsWriter(filename, units) as writer:
+			writer.begin_structure(name or self.cell.name)
+			for (layer, datatype), expr in outputs.items():
+				polygons = self.evaluate(expr, tile_size, processes)
+				writer.add_polygons(polygons, layer, datatype)
+				print(f"[layerops] {layer}/{datatype} = {expr!r}: {len(polygons)} polygons")
+			writer.end_structure()
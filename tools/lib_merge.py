@@ -0,0 +1,238 @@
+# AIST 2025 merge engine
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# One persistent name index for all merged libraries. Cells with the same name
+# are compared by geometry hash (lib_hash): identical cells are shared, and
+# different cells are renamed to "<prefix>_<name>" with their references
+# rewritten by GdsWriter.copy(). Inputs are pre-processed (lib_rewrite rules)
+# concurrently by preprocess_all(); each worker hands back its intermediate GDS
+# file with the pickled structure index and cell hashes.
+#
+# run() merges a chip from a declarative JSON manifest (inputs, renames,
+# placements, keep-outs, added shapes) and caches every processed input under
+# the hash of its file content and processing options. With a "dicing" entry
+# ({"lane": one-side width, "regions": {name: rectangle}}) the merged chip is
+# checked for shapes in the dicing lanes or across the regions (lib_dicing).
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import pickle
+
+import gdstk
+import numpy as np
+
+import lib_dicing
+import lib_gdsscan
+import lib_hash
+import lib_region
+import lib_rewrite
+
+CACHE_VERSION = 1 # bump when the intermediate format changes
+
+def preprocess(filename, rules, output_filename, keepouts=None):
+	# rewrites one input, strips keep-out regions ([{"cell": name, "regions": [...]}],
+	# names after renaming) and returns (output file, structure index, cell hashes)
+	if keepouts:
+		tmp_filename = output_filename + ".tmp"
+		lib_rewrite.rewrite(filename, tmp_filename, rules)
+		with lib_gdsscan.GdsScan(tmp_filename) as scan:
+			lib = lib_gdsscan.read_cells(scan, [k["cell"] for k in keepouts])
+			modified = []
+			for keepout in keepouts:
+				cell = lib[keepout["cell"]]
+				lib_region.exclude_regions(cell, keepout["regions"])
+				modified.append(cell)
+			with lib_gdsscan.GdsWriter(output_filename, scan.units, scan.libname) as writer:
+				for name in scan.structures:
+					if name not in {cell.name for cell in modified}:
+						writer.copy(scan, name)
+				writer.add_cells(*modified)
+		os.remove(tmp_filename)
+	else:
+		lib_rewrite.rewrite(filename, output_filename, rules)
+	with lib_gdsscan.GdsScan(output_filename) as scan:
+		return output_filename, scan.index_state(), lib_hash.cell_hashes(scan)
+
+def preprocess_all(jobs, processes=None):
+	# jobs: [(input file, rules, output file[, keepouts])] -> [(GdsScan, cell hashes)] in job order
+	if not jobs:
+		return []
+	with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+		results = list(pool.map(preprocess, *zip(*jobs)))
+	return [(lib_gdsscan.GdsScan(filename, index), hashes) for filename, index, hashes in results]
+
+class CellIndex:
+	def __init__(self):
+		self.hashes = {}  # output name -> geometry hash (None for reserved names)
+		self.renames = [] # (source file, original name, output name)
+		self.shared = []  # (source file, name)
+		self.variants = {} # (name, geometry hash) -> output name of a renamed cell
+
+	def reserve(self, name):
+		# names written outside the index, e.g. the new top cell
+		self.hashes[name] = None
+
+	def _unique_name(self, prefix, name, cell_hash):
+		candidates = [f"{prefix}_{name}", f"{prefix}_{name}_{cell_hash[:8]}"]
+		for candidate in candidates:
+			if self.hashes.get(candidate, cell_hash) == cell_hash:
+				return candidate
+		i = 1
+		while f"{candidates[-1]}_{i}" in self.hashes:
+			i += 1
+		return f"{candidates[-1]}_{i}"
+
+	def add_library(self, scan, prefix, rename=None, hashes=None, source=None):
+		# returns ({source name: output name}, [source names to write]);
+		# source names the input in the report (default: the scanned file)
+		rename = rename or {}
+		source = source or scan.filename
+		hashes = hashes or lib_hash.cell_hashes(scan)
+		names = {}
+		new = []
+		for name in scan.structures:
+			cell_hash = hashes[name]
+			wanted = rename.get(name, name)
+			existing = self.hashes.get(wanted, False)
+			if existing is False:
+				out = wanted
+			elif existing == cell_hash:
+				names[name] = wanted
+				self.shared.append((source, name))
+				continue
+			elif (wanted, cell_hash) in self.variants:
+				names[name] = self.variants[(wanted, cell_hash)]
+				self.shared.append((source, name))
+				continue
+			else:
+				out = self._unique_name(prefix, wanted, cell_hash)
+				self.variants[(wanted, cell_hash)] = out
+				self.renames.append((source, name, out))
+			self.hashes[out] = cell_hash
+			names[name] = out
+			new.append(name)
+		return names, new
+
+	def report(self):
+		for filename, name in self.shared:
+			print(f"[merge] shared identical cell '{name}' from '{filename}'")
+		for filename, name, out in self.renames:
+			print(f"[merge] renamed '{name}' from '{filename}' to '{out}' (different geometry)")
+
+def file_hash(filename, memo=None):
+	# content hash; memo {path: [size, mtime_ns, hash]} skips unchanged files
+	stat = os.stat(filename)
+	key = os.path.abspath(filename)
+	if memo is not None and memo.get(key, [None])[:2] == [stat.st_size, stat.st_mtime_ns]:
+		return memo[key][2]
+	h = hashlib.blake2b(digest_size=16)
+	with open(filename, "rb") as f:
+		for chunk in iter(lambda: f.read(1 << 20), b""):
+			h.update(chunk)
+	if memo is not None:
+		memo[key] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+	return h.hexdigest()
+
+def load_manifest(filename):
+	with open(filename) as f:
+		manifest = json.load(f)
+	base = os.path.dirname(os.path.abspath(filename))
+	manifest["output"] = os.path.join(base, manifest.get("output", "merged.gds"))
+	manifest["cache"] = os.path.join(base, manifest.get("cache", ".merge_cache"))
+	for spec in manifest["inputs"]:
+		spec["file"] = os.path.join(base, spec["file"])
+		rules = json.loads(json.dumps(manifest.get("rules", {})))
+		for key, value in spec.get("rules", {}).items():
+			rules[key] = {**rules.get(key, {}), **value} if isinstance(value, dict) else rules.get(key, []) + value
+		rules.setdefault("rename", {})[spec["top"]] = spec["name"]
+		spec["rules"] = rules
+		spec.setdefault("keepouts", [])
+	return manifest
+
+def cached_inputs(manifest, processes=None):
+	# [(GdsScan, cell hashes)] per input, processing only inputs missing in the cache
+	cache = manifest["cache"]
+	os.makedirs(cache, exist_ok=True)
+	memo_filename = os.path.join(cache, "files.json")
+	memo = {}
+	if os.path.exists(memo_filename):
+		with open(memo_filename) as f:
+			memo = json.load(f)
+	inputs = []
+	jobs = []
+	for spec in manifest["inputs"]:
+		options = json.dumps([CACHE_VERSION, spec["rules"], spec["keepouts"]], sort_keys=True)
+		key = hashlib.blake2b((file_hash(spec["file"], memo) + options).encode(), digest_size=16).hexdigest()
+		gds_filename = os.path.join(cache, key + ".gds")
+		index_filename = os.path.join(cache, key + ".index")
+		if os.path.exists(gds_filename) and os.path.exists(index_filename):
+			with open(index_filename, "rb") as f:
+				index, hashes = pickle.load(f)
+			inputs.append((lib_gdsscan.GdsScan(gds_filename, index), hashes))
+			print(f"[cache] reused '{spec['name']}' ({os.path.basename(spec['file'])})")
+		else:
+			inputs.append(None)
+			jobs.append((spec["file"], spec["rules"], gds_filename, spec["keepouts"]))
+	done = iter(preprocess_all(jobs, processes))
+	for i, spec in enumerate(manifest["inputs"]):
+		if inputs[i] is None:
+			scan, hashes = inputs[i] = next(done)
+			with open(os.path.splitext(scan.filename)[0] + ".index", "wb") as f:
+				pickle.dump((scan.index_state(), hashes), f)
+			print(f"[cache] processed '{spec['name']}' ({os.path.basename(spec['file'])})")
+	with open(memo_filename, "w") as f:
+		json.dump(memo, f, indent=1)
+	for (scan, _), spec in zip(inputs, manifest["inputs"]):
+		# the top cell is renamed to the input name by the rules
+		if spec["name"] not in scan.structures:
+			cells = sorted(scan.structures)
+			raise ValueError(
+				f"top cell '{spec['top']}' not found in '{spec['file']}', cells: "
+				+ ", ".join(cells[:20]) + (f", ... ({len(cells)} cells)" if len(cells) > 20 else "")
+			)
+	return inputs
+
+def manifest_shape(shape):
+	# {"layer", "datatype", "rectangle": [[x0, y0], [x1, y1]]} or {"polygon": [[x, y], ...]}
+	layer = shape["layer"]
+	datatype = shape.get("datatype", 0)
+	if "rectangle" in shape:
+		return gdstk.rectangle(*shape["rectangle"], layer=layer, datatype=datatype)
+	return gdstk.Polygon(shape["polygon"], layer=layer, datatype=datatype)
+
+def run(manifest_filename, processes=None):
+	manifest = load_manifest(manifest_filename)
+	inputs = cached_inputs(manifest, processes)
+	top_cell = gdstk.Cell(manifest.get("top", "TOP"))
+	top_cell.add(*[manifest_shape(shape) for shape in manifest.get("shapes", [])])
+	units = inputs[0][0].units
+	writer = lib_gdsscan.GdsWriter(manifest["output"], units, manifest.get("libname", "LIB"))
+	index = CellIndex()
+	index.reserve(top_cell.name)
+	for (scan, hashes), spec in zip(inputs, manifest["inputs"]):
+		names, new = index.add_library(scan, spec["name"], hashes=hashes, source=spec["file"])
+		rename = {name: out for name, out in names.items() if name != out}
+		for name in new:
+			writer.copy(scan, name, names[name], rename)
+		placement = spec.get("placement")
+		if placement is not None:
+			top_cell.add(gdstk.Reference(
+				names[spec["name"]],
+				origin=placement.get("origin", (0, 0)),
+				rotation=np.radians(placement.get("rotation", 0)),
+				magnification=placement.get("magnification", 1),
+				x_reflection=placement.get("x_reflection", False),
+			))
+		scan.close()
+	index.report()
+	writer.add_cells(top_cell)
+	writer.close()
+	print(f"[out] saved merged GDS as '{manifest['output']}'")
+	fingerprint = lib_hash.write_manifest(manifest["output"])
+	dicing = manifest.get("dicing")
+	if dicing:
+		lib_dicing.check_gds(manifest["output"], dicing["regions"], dicing["lane"], cell=top_cell.name)
+	return fingerprint
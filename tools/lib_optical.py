@@ -0,0 +1,172 @@
+# AIST 2025 optical connectivity
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Nets of a waveguide layer: the flattened polygons that touch or overlap are
+# joined by a union-find. Candidate pairs come from the lib_tile grid hash of
+# the polygon edges; two polygons touch when an edge of one crosses or lies
+# within the database precision of an edge of the other (abutting path
+# segments share their end edges), or when one lies inside the other.
+#
+# The nets are checked against an expected map of terminals (e.g. the SSCs of
+# a chip edge), {terminal: (group, device cell)}: the terminals of one group
+# must share a net, different groups must not, and the net of a group must
+# reach a port (lib_ports) of an instance of its device cell. Nets without any
+# port are reported as floating, e.g. a route segment that misses its
+# neighbours. Shapes on IGNORE_DATATYPES (the dummy fill) are no waveguides.
+#
+# usage: python lib_optical.py input.gds [layer] [cell]
+
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_drc
+import lib_dummy
+import lib_flatten
+import lib_ports
+import lib_rtree
+import lib_tile
+
+IGNORE_DATATYPES = (lib_dummy.FILL_DATATYPE,)
+
+def polygon_edges(polygons):
+	# (a, b, owner) of all edges, coincident edges of different polygons kept
+	if not polygons:
+		return np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=int)
+	a = np.concatenate(polygons)
+	b = np.concatenate([np.roll(p, -1, axis=0) for p in polygons])
+	owner = np.repeat(np.arange(len(polygons)), [len(p) for p in polygons])
+	return a, b, owner
+
+def cross(a, b, c):
+	return (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+
+def edges_touch(a0, a1, b0, b1, precision):
+	# mask of edge pairs that cross or come within precision of each other
+	crossing = (cross(a0, a1, b0) * cross(a0, a1, b1) < 0) & (cross(b0, b1, a0) * cross(b0, b1, a1) < 0)
+	return crossing | (lib_drc.segment_distance(a0, a1, b0, b1) <= precision)
+
+def find_root(parent, k):
+	while parent[k] != k:
+		parent[k] = parent[parent[k]]
+		k = parent[k]
+	return k
+
+def touching_pairs(polygons, precision=1e-3):
+	# (i, j) of polygons that touch or overlap
+	a, b, owner = polygon_edges(polygons)
+	i, j = lib_drc.candidate_pairs(a, b, precision)
+	keep = owner[i] != owner[j]
+	i, j = i[keep], j[keep]
+	keep = edges_touch(a[i], b[i], a[j], b[j], precision)
+	pairs = np.unique(np.sort(np.stack([owner[i[keep]], owner[j[keep]]], axis=1), axis=1), axis=0)
+	# polygons inside another one without touching its edges
+	boxes = lib_tile.polygon_boxes(polygons)
+	i, j = lib_tile.box_pairs(boxes)
+	inside = []
+	for p, q in zip(i, j):
+		if np.all(boxes[p, :2] >= boxes[q, :2]) and np.all(boxes[p, 2:] <= boxes[q, 2:]):
+			outer, inner = q, p
+		elif np.all(boxes[q, :2] >= boxes[p, :2]) and np.all(boxes[q, 2:] <= boxes[p, 2:]):
+			outer, inner = p, q
+		else:
+			continue
+		if gdstk.inside(polygons[inner][:1], gdstk.Polygon(polygons[outer]))[0]:
+			inside.append((p, q))
+	return np.concatenate([pairs.reshape(-1, 2), np.array(inside, dtype=int).reshape(-1, 2)])
+
+def components(polygons, precision=1e-3):
+	# net index of every polygon, nets numbered from 0
+	parent = list(range(len(polygons)))
+	for i, j in touching_pairs(polygons, precision):
+		parent[find_root(parent, i)] = find_root(parent, j)
+	roots = np.array([find_root(parent, k) for k in range(len(polygons))], dtype=int)
+	return np.unique(roots, return_inverse=True)[1].ravel() if len(roots) else roots
+
+def point_nets(points, polygons, nets, precision=1e-3):
+	# [set of nets] touched by each point (on or inside a polygon)
+	tree = lib_rtree.RTree(lib_tile.polygon_boxes(polygons))
+	found = []
+	for point in np.asarray(points, dtype=float).reshape(-1, 2):
+		hits = set()
+		for k in tree.query(np.concatenate([point - precision, point + precision])):
+			p = polygons[k]
+			q = np.roll(p, -1, axis=0)
+			near = lib_drc.point_segment_distance(np.repeat(point[None], len(p), axis=0), p, q).min() <= precision
+			if near or gdstk.inside([point], gdstk.Polygon(p))[0]:
+				hits.add(int(nets[k]))
+		found.append(hits)
+	return found
+
+def check(cell, layer, terminals=None, expected=None, precision=1e-3, ignore_datatypes=IGNORE_DATATYPES):
+	# {"nets": count, "polygons": count, "floating": [box], "problems": [text]};
+	# terminals {name: (x, y)}, expected {name: (group, device cell name)}
+	polygons = lib_flatten.flat_polygons(cell, layer, ignore_datatypes=ignore_datatypes)
+	nets = components(polygons, precision)
+	count = int(nets.max()) + 1 if len(nets) else 0
+	ports = lib_ports.PortIndex().flat(cell)
+	on_layer = ports["layer"] == layer
+	names = [name for name, keep in zip(ports["name"], on_layer) if keep]
+	port_nets = point_nets(ports["position"][on_layer], polygons, nets, precision)
+	# devices reached by each net: instance paths of the ports on it
+	devices = {}
+	for name, hits in zip(names, port_nets):
+		for net in hits:
+			devices.setdefault(net, set()).add(name.rsplit("/", 1)[0])
+	boxes = lib_tile.polygon_boxes(polygons)
+	floating = [
+		np.concatenate([boxes[nets == net, :2].min(axis=0), boxes[nets == net, 2:].max(axis=0)])
+		for net in range(count) if net not in devices
+	]
+	problems = []
+	terminals = terminals or {}
+	expected = expected or {}
+	names = list(terminals)
+	terminal_nets = dict(zip(names, point_nets([terminals[name] for name in names], polygons, nets, precision)))
+	groups = {}
+	for name in names:
+		hits = terminal_nets[name]
+		if not hits:
+			problems.append(f"{name}: not on any {layer} shape")
+		elif name in expected:
+			groups.setdefault(expected[name][0], {}).setdefault(min(hits), []).append(name)
+	owner = {}
+	for group, by_net in groups.items():
+		if len(by_net) > 1:
+			problems.append(f"group {group}: broken into {len(by_net)} nets ({'; '.join(', '.join(t) for t in by_net.values())})")
+		for net, members in by_net.items():
+			if net in owner:
+				problems.append(f"groups {owner[net]} and {group}: cross-connected ({members[0]})")
+			owner.setdefault(net, group)
+			device = expected[members[0]][1]
+			if device and not any(path.rsplit("/", 1)[-1].startswith(f"{device}:") for path in devices.get(net, ())):
+				problems.append(f"group {group}: net of {', '.join(members)} does not reach {device}")
+	return {"nets": count, "polygons": len(polygons), "floating": floating, "problems": problems}
+
+def report(result, layer, limit=20):
+	for box in result["floating"][:limit]:
+		print(f"[optical] floating net at ({box[0]:.1f}, {box[1]:.1f}) - ({box[2]:.1f}, {box[3]:.1f})")
+	if limit is not None and len(result["floating"]) > limit:
+		print(f"[optical] ... {len(result['floating']) - limit} more floating net(s)")
+	for problem in result["problems"]:
+		print(f"[optical] {problem}")
+	print(
+		f"[optical] layer {layer}: {result['polygons']} polygons, {result['nets']} nets, "
+		f"{len(result['floating'])} floating, {len(result['problems'])} problem(s)"
+	)
+
+def check_gds(filename, layer, terminals=None, expected=None, cell=None, limit=20):
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	result = check(top, layer, terminals, expected, lib.precision / lib.unit)
+	report(result, layer, limit)
+	return result
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (2, 3, 4):
+		print("usage: python lib_optical.py input.gds [layer] [cell]")
+		sys.exit(1)
+	layer = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+	check_gds(sys.argv[1], layer, cell=sys.argv[3] if len(sys.argv) == 4 else None, limit=None)
@@ -0,0 +1,127 @@
+# AIST 2025 layer overlap checker
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Finds every overlap of one layer group with another outside allowed regions,
+# e.g. metal (MET) over Si waveguides (SiWG, RIB) outside the PIN contacts
+# (CT2PN), where the metal is easily shorted by the Si below. The flattened
+# layers are cut into tiles (lib_tile) and each tile computes
+# (A and B) not ALLOWED in a worker; overlaps split by tile cuts are stitched
+# again (lib_flatten). Every overlap is reported with its area and the cell
+# paths of the shapes of both layer groups below it.
+#
+# usage: python lib_overlap.py input.gds 36 30,40 [35]
+
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_flatten
+import lib_region
+import lib_rtree
+import lib_tile
+
+def overlap_tile(job):
+	box, cuts, a, b, allowed, precision = job
+	rect = gdstk.rectangle(box[:2], box[2:])
+	region = gdstk.boolean(gdstk.boolean(a, rect, "and", precision), b, "and", precision)
+	if region and allowed:
+		region = gdstk.boolean(region, allowed, "not", precision)
+	return lib_flatten.split_on_cuts(region, box, cuts, precision)
+
+def overlap_jobs(grid, a, b, allowed, precision):
+	# tiles with shapes of both groups only
+	boxes = [lib_tile.polygon_boxes(polygons) for polygons in (a, b, allowed)]
+	tiles_a, tiles_b, tiles_allowed = (grid.assign(bx) for bx in boxes)
+	for tile in sorted(tiles_a.keys() & tiles_b.keys()):
+		yield (
+			grid.box(tile), lib_flatten.tile_cuts(grid, tile),
+			[a[k] for k in tiles_a[tile]], [b[k] for k in tiles_b[tile]],
+			[allowed[k] for k in tiles_allowed.get(tile, [])], precision,
+		)
+
+def inverse_transform(points, ref, offset):
+	# points in the coordinates of the referenced cell (one array element)
+	p = np.asarray(points, dtype=float) - ref.origin - offset
+	c = np.cos(-ref.rotation)
+	s = np.sin(-ref.rotation)
+	p = np.stack([c*p[:, 0] - s*p[:, 1], s*p[:, 0] + c*p[:, 1]], axis=1)
+	if ref.x_reflection:
+		p = p * [1, -1]
+	return p / ref.magnification
+
+class Locator:
+	# cell paths of the shapes on some layers below a cell; own shapes and
+	# reference element boxes are indexed once per cell
+	def __init__(self, layers):
+		self.layers = set(layers)
+		self.cells = {}
+
+	def index(self, cell):
+		if cell.name not in self.cells:
+			own = [p for p in cell.get_polygons(depth=0) if p.layer in self.layers]
+			refs = [
+				(ref, lib_region.reference_element_boxes(ref), lib_region.reference_offsets(ref))
+				for ref in cell.references if isinstance(ref.cell, gdstk.Cell)
+			]
+			boxes = np.array([np.ravel(p.bounding_box()) for p in own]).reshape(-1, 4)
+			self.cells[cell.name] = own, boxes, refs
+		return self.cells[cell.name]
+
+	def locate(self, cell, points):
+		# cell path ("TOP/child/...") to the first cell whose own shapes
+		# intersect the polygon points (in cell coordinates), None if not found
+		box = np.concatenate([points.min(axis=0), points.max(axis=0)])
+		own, boxes, refs = self.index(cell)
+		hits = [own[k] for k in np.flatnonzero(lib_rtree.overlaps(boxes, box))]
+		if hits and gdstk.boolean(hits, gdstk.Polygon(points), "and"):
+			return cell.name
+		for ref, element_boxes, offsets in refs:
+			for offset in offsets[lib_rtree.overlaps(element_boxes, box)]:
+				path = self.locate(ref.cell, inverse_transform(points, ref, offset))
+				if path is not None:
+					return f"{cell.name}/{path}"
+		return None
+
+def find_overlaps(cell, layers_a, layers_b, allowed_layers=(), tile_size=500, precision=1e-3, processes=None):
+	# [(overlap points, area, cell path of the A shape, cell path of the B shape)]
+	flat = lambda layers: [p for layer in layers for p in lib_flatten.flat_polygons(cell, layer)]
+	a = flat(layers_a)
+	b = flat(layers_b)
+	if not a or not b:
+		return []
+	grid = lib_tile.TileGrid(cell.bounding_box(), tile_size, precision)
+	jobs = overlap_jobs(grid, a, b, flat(allowed_layers), precision)
+	locate_a = Locator(layers_a)
+	locate_b = Locator(layers_b)
+	overlaps = []
+	for points in lib_flatten.merge_tiles(overlap_tile, jobs, precision, processes):
+		area = gdstk.Polygon(points).area()
+		overlaps.append((points, area, locate_a.locate(cell, points), locate_b.locate(cell, points)))
+	return overlaps
+
+def report(overlaps, name_a="A", name_b="B", limit=20):
+	# largest overlaps first, at most limit lines (None: all)
+	ranked = sorted(overlaps, key=lambda o: -o[1])
+	for points, area, path_a, path_b in ranked[:limit]:
+		x, y = points.mean(axis=0)
+		print(f"[overlap] {area:.3f} um2 at ({x:.1f}, {y:.1f}): {name_a} in {path_a}, {name_b} in {path_b}")
+	if limit is not None and len(ranked) > limit:
+		print(f"[overlap] ... {len(ranked) - limit} smaller overlap(s) not listed")
+	print(f"[overlap] {len(overlaps)} {name_a} over {name_b} overlap(s), {sum(o[1] for o in overlaps):.3f} um2")
+
+def check_gds(filename, layers_a, layers_b, allowed_layers=(), cell=None, name_a="A", name_b="B", limit=20, processes=None):
+	# checks the top cell of a GDS file (or cell) and prints the overlaps
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	overlaps = find_overlaps(top, layers_a, layers_b, allowed_layers, precision=lib.precision / lib.unit, processes=processes)
+	report(overlaps, name_a, name_b, limit)
+	return overlaps
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (4, 5):
+		print("usage: python lib_overlap.py input.gds layers_a layers_b [allowed_layers]  (layers: 36 or 30,40)")
+		sys.exit(1)
+	layers = [[int(x) for x in arg.split(",")] for arg in sys.argv[2:]]
+	check_gds(sys.argv[1], *layers, name_a=sys.argv[2], name_b=sys.argv[3], limit=None)
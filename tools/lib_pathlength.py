@@ -0,0 +1,195 @@
+# AIST 2025 waveguide path length extraction
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Centerline length of the waveguide polygons, from the geometry alone. A
+# waveguide segment of constant width w and centerline length L (straight or
+# bent, as drawn by FlexPath) has area A = w*L and perimeter P = 2*(L + w), so
+# L is the larger root of t^2 - P/2*t + A = 0; tapers give their mean width.
+# All polygons are measured at once (numpy over the concatenated vertices).
+# Bend length: the edges between two small turns (< BEND_TURN, the chords of
+# an arc) on both sides of the segment, halved (inner and outer arc average
+# to the centerline); the rest is straight.
+#
+# Nets are the lib_optical nets of the polygons with the device cells (e.g.
+# the MMIs) left out, so the arms of an interferometer between its splitter
+# and combiner are nets of their own. check_delays() measures the arms of
+# every placed interferometer cell once and compares the difference of the two
+# longest arms with the intended dL.
+#
+# circuit_netlist() turns a layout into a netlist for sim/circuit/lib_circuit:
+# the instances of the device cells (named by their lib_ports instance path),
+# their ports that meet directly, and a "waveguide" instance (length, bend)
+# for every net between exactly two device ports.
+#
+# usage: python lib_pathlength.py input.gds [layer] [cell] [--exclude CELL ...]
+
+import argparse
+
+import gdstk
+import numpy as np
+
+import lib_optical
+import lib_ports
+import lib_region
+import lib_tile
+
+BEND_TURN = np.pi / 4 # largest turn (rad) between two chords of an arc
+
+def centerline_lengths(polygons):
+	# (length, width, bend length) of each polygon, (n,) arrays
+	n = len(polygons)
+	if n == 0:
+		return np.zeros(0), np.zeros(0), np.zeros(0)
+	counts = np.array([len(p) for p in polygons])
+	starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+	owner = np.repeat(np.arange(n), counts)
+	points = np.concatenate(polygons)
+	k = np.arange(len(points))
+	following = np.where(k + 1 == starts[owner] + counts[owner], starts[owner], k + 1)
+	previous = np.where(k == starts[owner], starts[owner] + counts[owner] - 1, k - 1)
+	d = points[following] - points
+	lengths = np.hypot(*d.T)
+	perimeter = np.bincount(owner, lengths, n)
+	area = np.abs(np.bincount(owner, points[:, 0]*points[following, 1] - points[following, 0]*points[:, 1], n)) / 2
+	# turn at each vertex, from the edge before it to the edge after it
+	e = d[previous]
+	turn = np.abs(np.arctan2(e[:, 0]*d[:, 1] - e[:, 1]*d[:, 0], np.einsum("ij,ij->i", e, d)))
+	small = (turn > 1e-9) & (turn < BEND_TURN)
+	bend_side = np.bincount(owner, lengths * (small & small[following]), n)
+	length = perimeter/4 + np.sqrt(np.maximum(perimeter**2/16 - area, 0))
+	width = np.divide(area, length, out=np.zeros(n), where=length > 0)
+	return length, width, np.minimum(bend_side / 2, length)
+
+def device_free_polygons(cell, layer, exclude=(), cache=None, ignore_datatypes=lib_optical.IGNORE_DATATYPES):
+	# flattened point arrays of one layer without the shapes of the exclude
+	# cells (and everything below them) and of the dummy fill, each cell
+	# flattened once
+	cache = {} if cache is None else cache
+	if cell.name not in cache:
+		polygons = [p.points for p in cell.get_polygons(depth=0) if p.layer == layer and p.datatype not in ignore_datatypes]
+		for ref in cell.references:
+			if not isinstance(ref.cell, gdstk.Cell) or ref.cell.name in exclude:
+				continue
+			below = device_free_polygons(ref.cell, layer, exclude, cache, ignore_datatypes)
+			for offset in lib_region.reference_offsets(ref):
+				polygons += [
+					lib_region.transform_points(p, ref.origin, ref.rotation, ref.magnification, ref.x_reflection) + offset
+					for p in below
+				]
+		cache[cell.name] = polygons
+	return cache[cell.name]
+
+def net_lengths(polygons, precision=1e-3):
+	# [{"straight", "bend", "length", "width", "polygons", "box"}] per lib_optical net
+	nets = lib_optical.components(polygons, precision)
+	count = int(nets.max()) + 1 if len(nets) else 0
+	length, width, bend = centerline_lengths(polygons)
+	boxes = lib_tile.polygon_boxes(polygons)
+	total = np.bincount(nets, length, count)
+	bends = np.bincount(nets, bend, count)
+	found = []
+	for net in range(count):
+		members = nets == net
+		found.append({
+			"straight": total[net] - bends[net], "bend": bends[net], "length": total[net],
+			"width": (width[members].min(), width[members].max()), "polygons": int(members.sum()),
+			"box": np.concatenate([boxes[members, :2].min(axis=0), boxes[members, 2:].max(axis=0)]),
+		})
+	return found
+
+def check_delays(cell, layer, delays, exclude=(), precision=1e-3, tolerance=0.01):
+	# [(cell name, intended dL, measured dL, arm lengths)] of every interferometer
+	# cell placed below cell, delays {cell name: dL}; each cell is measured once,
+	# in its own frame. Mismatches are reported.
+	cells = {c.name: c for c in [cell] + cell.dependencies(True) if isinstance(c, gdstk.Cell)}
+	cache = {}
+	results = []
+	for name, intended in sorted(delays.items()):
+		if name not in cells:
+			print(f"[pathlength] {name}: not placed")
+			continue
+		arms = sorted((net["length"] for net in net_lengths(device_free_polygons(cells[name], layer, exclude, cache), precision)), reverse=True)
+		measured = arms[0] - arms[1] if len(arms) > 1 else np.nan
+		results.append((name, intended, measured, arms[:2]))
+		state = "ok" if abs(measured - intended) <= tolerance else "MISMATCH"
+		print(
+			f"[pathlength] {name}: dL {measured:.3f} um (intended {intended:g} um), "
+			f"arms {', '.join(f'{arm:.3f}' for arm in arms[:2])} um: {state}"
+		)
+	return results
+
+def device_cell(port):
+	# "A:0/GC:2[4]/o1" -> "GC"
+	return port.rsplit("/", 1)[0].rsplit("/", 1)[-1].split(":")[0]
+
+def circuit_netlist(cell, layer, devices, precision=1e-3, scale=1e-6):
+	# {"instances": {name: (model, {parameters})}, "connections": [(port, port)],
+	#  "problems": [text]}; devices: cell names, lengths in m (scale: m per unit)
+	ports = lib_ports.PortIndex().flat(cell)
+	keep = [k for k, name in enumerate(ports["name"]) if ports["layer"][k] == layer and device_cell(name) in devices]
+	names = [ports["name"][k] for k in keep]
+	positions = ports["position"][keep].reshape(-1, 2)
+	instances = {name.rsplit("/", 1)[0]: (device_cell(name), {}) for name in names}
+	connections = []
+	problems = []
+	# ports that meet directly
+	direct = set()
+	keys = {}
+	for k, point in enumerate(np.round(positions / precision).astype(np.int64)):
+		keys.setdefault(tuple(point), []).append(k)
+	for members in keys.values():
+		if len(members) == 2:
+			connections.append((names[members[0]], names[members[1]]))
+			direct.update(members)
+	# waveguide nets between the device ports
+	polygons = device_free_polygons(cell, layer, set(devices))
+	nets = lib_optical.components(polygons, precision)
+	length, _, bend = centerline_lengths(polygons)
+	count = int(nets.max()) + 1 if len(nets) else 0
+	total = np.bincount(nets, length, count)
+	bends = np.bincount(nets, bend, count)
+	on_net = {}
+	for k, hits in enumerate(lib_optical.point_nets(positions, polygons, nets, precision)):
+		if k not in direct and hits:
+			on_net.setdefault(min(hits), []).append(names[k])
+	for net, members in sorted(on_net.items()):
+		if len(members) != 2:
+			problems.append(f"net of {total[net]:.1f} um joins {len(members)} device port(s): {', '.join(members)}")
+			continue
+		name = f"wg{net}"
+		instances[name] = ("waveguide", {"length": total[net] * scale, "bend": bends[net] * scale})
+		connections += [(members[0], f"{name}/o1"), (f"{name}/o2", members[1])]
+	return {"instances": instances, "connections": connections, "problems": problems}
+
+def report(nets, limit=20):
+	# longest nets first
+	ranked = sorted(nets, key=lambda net: -net["length"])
+	for net in ranked[:limit]:
+		x0, y0, x1, y1 = net["box"]
+		print(
+			f"[pathlength] net at ({x0:.1f}, {y0:.1f}) - ({x1:.1f}, {y1:.1f}): {net['length']:.3f} um "
+			f"(straight {net['straight']:.3f}, bend {net['bend']:.3f}), {net['polygons']} polygon(s)"
+		)
+	if limit is not None and len(ranked) > limit:
+		print(f"[pathlength] ... {len(ranked) - limit} more net(s)")
+	print(f"[pathlength] {len(nets)} net(s), {sum(net['length'] for net in nets):.3f} um in total")
+
+def check_gds(filename, layer, delays=None, exclude=(), cell=None, limit=20, tolerance=0.01):
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	precision = lib.precision / lib.unit
+	nets = net_lengths(device_free_polygons(top, layer, exclude), precision)
+	report(nets, limit)
+	if delays:
+		check_delays(top, layer, delays, exclude, precision, tolerance)
+	return nets
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="waveguide centerline length per net")
+	parser.add_argument("input")
+	parser.add_argument("layer", nargs="?", type=int, default=30)
+	parser.add_argument("cell", nargs="?")
+	parser.add_argument("--exclude", nargs="*", default=[], help="device cells left out of the nets")
+	args = parser.parse_args()
+	check_gds(args.input, args.layer, exclude=set(args.exclude), cell=args.cell, limit=None)
@@ -0,0 +1,248 @@
+# AIST 2025 cell ports and netlist extraction
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Named ports of a cell (position, orientation, width, layer) are stored as
+# labels on PORT_LAYER: the label text is the port name, the texttype the
+# layer of the port, the label rotation the direction pointing out of the cell
+# and the width a GDS property, so ports are written into the GDS and read
+# back with it. The ports of every cell are read once (PortIndex) and placed
+# through references as numpy arrays, all elements of an array at once, with
+# the same transform as gdstk (magnification, x reflection, rotation, origin).
+# External ports (pads, SSC facets: meant to be probed or coupled from
+# outside the chip) carry a second property; they are the terminals of a cell
+# and are not matched against other ports.
+#
+# The netlist of a cell connects the ports of its instances (every element of
+# every reference) and its own ports that meet: same layer, same position
+# (within tolerance). Connected ports with different widths or not facing each
+# other are reported as mismatches. Instance ports that meet no other port are
+# routed when the layer of the flattened cell continues just outside them (a
+# waveguide or wire route drawn without ports), open otherwise; fill shapes
+# (lib_dummy.FILL_DATATYPE) do not count. Each cell is extracted once,
+# whatever its instance count. The port labels are for the tools only: the
+# flat export leaves labels out and the merge drops PORT_LAYER.
+#
+# usage: python lib_ports.py input.gds [cell]
+
+import sys
+
+import gdstk
+import numpy as np
+
+import lib_dummy
+import lib_flatten
+import lib_region
+
+PORT_LAYER = 63    # label layer of the ports
+PORT_WIDTH = 1     # GDS property attribute holding the port width
+PORT_EXTERNAL = 2  # GDS property attribute marking external ports
+PROBE = 0.01       # um outside an unmatched port where a route is looked for
+
+def add_port(cell, name, position, orientation, width, layer, external=False):
+	# orientation (rad): direction pointing out of the cell; external: a
+	# terminal of the chip (pad, facet), never connected to another port
+	label = gdstk.Label(name, position, rotation=orientation, layer=PORT_LAYER, texttype=layer)
+	label.set_gds_property(PORT_WIDTH, f"{width:g}")
+	if external:
+		label.set_gds_property(PORT_EXTERNAL, "1")
+	cell.add(label)
+	PORTS.cells.pop(cell.name, None)
+	return label
+
+def label_width(label):
+	value = label.get_gds_property(PORT_WIDTH)
+	return float(value.strip("\0 ")) if value else 0.0
+
+def empty_ports():
+	return {
+		"name": [], "position": np.zeros((0, 2)), "orientation": np.zeros(0),
+		"width": np.zeros(0), "layer": np.zeros(0, dtype=int), "external": np.zeros(0, dtype=bool),
+	}
+
+def transform_ports(ports, ref, prefix):
+	# ports of ref.cell placed by every element of ref; names "<prefix>[k]/<port>"
+	# for arrays, "<prefix>/<port>" otherwise
+	if not ports["name"]:
+		return empty_ports()
+	offsets = lib_region.reference_offsets(ref)
+	position = lib_region.transform_points(ports["position"], ref.origin, ref.rotation, ref.magnification, ref.x_reflection)
+	orientation = ref.rotation + (-1 if ref.x_reflection else 1) * ports["orientation"]
+	if len(offsets) == 1:
+		names = [f"{prefix}/{name}" for name in ports["name"]]
+	else:
+		names = [f"{prefix}[{k}]/{name}" for k in range(len(offsets)) for name in ports["name"]]
+	return {
+		"name": names,
+		"position": (offsets[:, None, :] + position[None]).reshape(-1, 2),
+		"orientation": np.tile(np.mod(orientation, 2*np.pi), len(offsets)),
+		"width": np.tile(ports["width"] * ref.magnification, len(offsets)),
+		"layer": np.tile(ports["layer"], len(offsets)),
+		"external": np.tile(ports["external"], len(offsets)),
+	}
+
+def concat_ports(parts):
+	if not parts:
+		return empty_ports()
+	return {
+		"name": [name for part in parts for name in part["name"]],
+		**{key: np.concatenate([part[key] for part in parts]) for key in ("position", "orientation", "width", "layer", "external")},
+	}
+
+class PortIndex:
+	# own ports of cells and the ports of their instances, read once per cell
+	def __init__(self):
+		self.cells = {}
+		self.placed = {}
+		self.flat_cache = {}
+
+	def own(self, cell):
+		# {"name": [...], "position": (n, 2), "orientation": (n,), "width": (n,), "layer": (n,), "external": (n,)}
+		if cell.name not in self.cells:
+			labels = [label for label in cell.labels if label.layer == PORT_LAYER]
+			self.cells[cell.name] = {
+				"name": [label.text for label in labels],
+				"position": np.array([label.origin for label in labels], dtype=float).reshape(-1, 2),
+				"orientation": np.mod([label.rotation for label in labels], 2*np.pi).astype(float),
+				"width": np.array([label_width(label) for label in labels], dtype=float),
+				"layer": np.array([label.texttype for label in labels], dtype=int),
+				"external": np.array([label.get_gds_property(PORT_EXTERNAL) is not None for label in labels], dtype=bool),
+			}
+		return self.cells[cell.name]
+
+	def instances(self, cell):
+		# ports of all reference elements of a cell in its frame; references to
+		# the same cell are numbered "<cell>:0", "<cell>:1", ...
+		if cell.name not in self.placed:
+			count = {}
+			parts = []
+			for ref in cell.references:
+				if not isinstance(ref.cell, gdstk.Cell):
+					continue
+				k = count[ref.cell.name] = count.get(ref.cell.name, -1) + 1
+				parts.append(transform_ports(self.own(ref.cell), ref, f"{ref.cell.name}:{k}"))
+			self.placed[cell.name] = concat_ports(parts)
+		return self.placed[cell.name]
+
+	def flat(self, cell):
+		# ports of the instances of a cell and of everything below them, in its
+		# frame, named by instance path ("<cell>:0/<cell>:1[3]/o1")
+		if cell.name not in self.flat_cache:
+			count = {}
+			parts = [self.instances(cell)]
+			for ref in cell.references:
+				if not isinstance(ref.cell, gdstk.Cell):
+					continue
+				k = count[ref.cell.name] = count.get(ref.cell.name, -1) + 1
+				parts.append(transform_ports(self.flat(ref.cell), ref, f"{ref.cell.name}:{k}"))
+			self.flat_cache[cell.name] = concat_ports(parts)
+		return self.flat_cache[cell.name]
+
+	def port(self, ref, name, element=0):
+		# (position, orientation) of a port of ref.cell in the frame of the parent
+		ports = self.own(ref.cell)
+		if name not in ports["name"]:
+			raise KeyError(f"port(): cell '{ref.cell.name}' has no port '{name}'")
+		k = ports["name"].index(name)
+		single = {key: value[k:k + 1] for key, value in ports.items() if key != "name"}
+		placed = transform_ports({"name": [name], **single}, ref, ref.cell.name)
+		return placed["position"][element], placed["orientation"][element]
+
+PORTS = PortIndex() # own ports of the cells looked up by port(), cleared by add_port()
+
+def port(ref, name, element=0):
+	# (position, orientation) of a port of ref.cell in the frame of the parent
+	return PORTS.port(ref, name, element)
+
+def netlist(cell, index=None, tolerance=1e-3):
+	# {"connections": [(port, port)], "exports": [(own port, instance port)],
+	#  "mismatches": [(port, port, reason)], "terminals": [external instance ports],
+	#  "routed": [instance ports on a route of the cell], "open": [instance ports]}
+	index = index or PortIndex()
+	own = index.own(cell)
+	ports = concat_ports([{**own, "name": [f"{cell.name}/{name}" for name in own["name"]]}, index.instances(cell)])
+	n_own = len(own["name"])
+	result = {"connections": [], "exports": [], "mismatches": [], "terminals": [], "routed": [], "open": []}
+	if not ports["name"]:
+		return result
+	external = np.flatnonzero(ports["external"])
+	result["terminals"] = [ports["name"][k] for k in external if k >= n_own]
+	inside = np.flatnonzero(~ports["external"])
+	ports = {key: [value[k] for k in inside] if key == "name" else value[inside] for key, value in ports.items()}
+	n_own = int(np.sum(inside < n_own))
+	if not ports["name"]:
+		return result
+	key = np.concatenate([np.round(ports["position"] / tolerance).astype(np.int64), ports["layer"][:, None]], axis=1)
+	_, group, counts = np.unique(key, axis=0, return_inverse=True, return_counts=True)
+	group = np.ravel(group)
+	order = np.argsort(group, kind="stable")
+	starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+	single = []
+	for start, count in zip(starts, counts):
+		members = order[start:start + count]
+		if count == 1:
+			if members[0] >= n_own:
+				single.append(members[0])
+			continue
+		for a, b in zip(members[:-1], members[1:]):
+			name_a, name_b = ports["name"][a], ports["name"][b]
+			if a < n_own or b < n_own:
+				result["exports"].append((name_a, name_b))
+				continue
+			result["connections"].append((name_a, name_b))
+			if abs(ports["width"][a] - ports["width"][b]) > tolerance:
+				result["mismatches"].append((name_a, name_b, f"width {ports['width'][a]:g} / {ports['width'][b]:g}"))
+			turn = np.mod(ports["orientation"][a] - ports["orientation"][b], 2*np.pi)
+			if abs(turn - np.pi) > 1e-6:
+				result["mismatches"].append((name_a, name_b, f"angle {np.degrees(turn):.1f} deg"))
+	for layer in np.unique(ports["layer"][single]):
+		members = [k for k in single if ports["layer"][k] == layer]
+		angle = ports["orientation"][members]
+		probes = ports["position"][members] + PROBE * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+		polygons = lib_flatten.flat_polygons(cell, int(layer), ignore_datatypes=(lib_dummy.FILL_DATATYPE,))
+		routed = gdstk.inside(probes, polygons) if polygons else [False] * len(members)
+		for k, hit in zip(members, routed):
+			result["routed" if hit else "open"].append(ports["name"][k])
+	return result
+
+def extract(top, tolerance=1e-3):
+	# {cell name: netlist} of top and every cell below it that places ports
+	index = PortIndex()
+	netlists = {}
+	for cell in [top] + top.dependencies(True):
+		if isinstance(cell, gdstk.Cell) and cell.name not in netlists:
+			found = netlist(cell, index, tolerance)
+			if any(found.values()):
+				netlists[cell.name] = found
+	return netlists
+
+def report(netlists, limit=20):
+	# cells with open ports or mismatches, then the totals
+	for name, found in sorted(netlists.items()):
+		if not found["open"] and not found["mismatches"]:
+			continue
+		print(f"[ports] {name}: {len(found['open'])} open port(s), {len(found['mismatches'])} mismatch(es)")
+		for a, b, reason in found["mismatches"][:limit]:
+			print(f"[ports]   mismatch {a} - {b}: {reason}")
+		for a in found["open"][:limit]:
+			print(f"[ports]   open {a}")
+		if limit is not None and len(found["open"]) > limit:
+			print(f"[ports]   ... {len(found['open']) - limit} more open port(s)")
+	total = {key: sum(len(found[key]) for found in netlists.values()) for key in ("connections", "exports", "terminals", "routed", "open", "mismatches")}
+	print(
+		f"[ports] {len(netlists)} cell(s): {total['connections']} connection(s), {total['exports']} export(s), "
+		f"{total['terminals']} terminal(s), {total['routed']} routed, {total['open']} open port(s), {total['mismatches']} mismatch(es)"
+	)
+
+def check_gds(filename, cell=None, limit=20):
+	lib = gdstk.read_gds(filename)
+	top = lib[cell] if cell else lib.top_level()[0]
+	netlists = extract(top, lib.precision / lib.unit)
+	report(netlists, limit)
+	return netlists
+
+if __name__ == "__main__":
+	if len(sys.argv) not in (2, 3):
+		print("usage: python lib_ports.py input.gds [cell]")
+		sys.exit(1)
+	check_gds(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None, limit=None)
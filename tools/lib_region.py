@@ -0,0 +1,162 @@
+# AIST 2025 region exclusion
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Removes everything in a cell that touches keep-out regions (rectangles or
+# polygons). Polygons, paths, labels and every element of every (array)
+# reference are indexed by bounding box in an R-tree; an array reference only
+# loses the elements that hit a region, the others are kept.
+
+import gdstk
+import numpy as np
+
+import lib_rtree
+
+def transform_points(points, origin=(0, 0), rotation=0, magnification=1, x_reflection=False):
+	# gdstk.Reference transform of (n, 2) points
+	p = np.asarray(points, dtype=float) * magnification
+	if x_reflection:
+		p = p * [1, -1]
+	c = np.cos(rotation)
+	s = np.sin(rotation)
+	return np.stack([c*p[:, 0] - s*p[:, 1], s*p[:, 0] + c*p[:, 1]], axis=1) + origin
+
+def reference_offsets(ref):
+	if ref.repetition.size == 0:
+		return np.zeros((1, 2))
+	return np.asarray(ref.repetition.get_offsets())
+
+def reference_matrix(ref):
+	# 2 x 2 linear part of a gdstk.Reference transform
+	c = np.cos(ref.rotation)
+	s = np.sin(ref.rotation)
+	return ref.magnification * np.array([[c, -s], [s, c]]) @ np.diag([1, -1 if ref.x_reflection else 1])
+
+def placed_boxes(boxes, matrix, offsets):
+	# (k * n, 4) boxes of (n, 4) boxes under matrix, moved by each of (k, 2) offsets
+	x0, y0, x1, y1 = boxes.T
+	corners = np.stack([np.stack([x0, y0], 1), np.stack([x1, y0], 1), np.stack([x1, y1], 1), np.stack([x0, y1], 1)], 1)
+	corners = corners @ matrix.T
+	lo = corners.min(axis=1)
+	hi = corners.max(axis=1)
+	return np.concatenate([
+		(offsets[:, None, :] + lo[None]).reshape(-1, 2), (offsets[:, None, :] + hi[None]).reshape(-1, 2)
+	], axis=1)
+
+def reference_element_boxes(ref):
+	# (n, 4) bounding box of every element of a reference
+	offsets = reference_offsets(ref)
+	bbox = ref.cell.bounding_box() if isinstance(ref.cell, gdstk.Cell) else None
+	if bbox is None:
+		# raw or unresolved cells: the box of the whole reference (or its origins)
+		whole = ref.bounding_box()
+		if whole is None:
+			points = offsets + ref.origin
+			return np.concatenate([points, points], axis=1)
+		return np.repeat(np.asarray(whole, dtype=float).reshape(1, 4), len(offsets), axis=0)
+	(x0, y0), (x1, y1) = bbox
+	corners = transform_points(
+		[(x0, y0), (x1, y0), (x1, y1), (x0, y1)],
+		ref.origin, ref.rotation, ref.magnification, ref.x_reflection
+	)
+	lo = corners.min(axis=0)
+	hi = corners.max(axis=0)
+	return np.concatenate([offsets + lo, offsets + hi], axis=1)
+
+def region_polygon(region):
+	# rectangles ((x0, y0), (x1, y1)) or polygon points or gdstk.Polygon
+	if isinstance(region, gdstk.Polygon):
+		return region
+	points = np.asarray(region, dtype=float)
+	if points.shape == (2, 2):
+		return gdstk.rectangle(points[0], points[1])
+	return gdstk.Polygon(points)
+
+def is_rectangle(polygon):
+	points = polygon.points
+	if len(points) != 4:
+		return False
+	(x0, y0), (x1, y1) = polygon.bounding_box()
+	return np.all(np.isin(points[:, 0], (x0, x1))) and np.all(np.isin(points[:, 1], (y0, y1)))
+
+def box_hits_polygon(box, polygon):
+	rect = gdstk.rectangle(box[:2], box[2:])
+	if gdstk.any_inside(rect.points, polygon) or gdstk.any_inside(polygon.points, rect):
+		return True
+	return len(gdstk.boolean(rect, polygon, "and")) > 0
+
+class ItemIndex:
+	# bounding boxes of the items of one cell (not of its children)
+	def __init__(self, cell):
+		self.cell = cell
+		self.items = [] # (kind, object, element index)
+		boxes = []
+		for kind, objects in (("polygon", cell.polygons), ("path", cell.paths)):
+			for obj in objects:
+				bbox = obj.bounding_box()
+				if bbox is None:
+					continue
+				self.items.append((kind, obj, 0))
+				boxes.append(np.ravel(bbox))
+		for label in cell.labels:
+			self.items.append(("label", label, 0))
+			boxes.append(np.concatenate([label.origin, label.origin]))
+		for ref in cell.references:
+			element_boxes = reference_element_boxes(ref)
+			self.items += [("reference", ref, i) for i in range(len(element_boxes))]
+			boxes += list(element_boxes)
+		self.boxes = np.array(boxes, dtype=float).reshape(-1, 4)
+		self.tree = lib_rtree.RTree(self.boxes)
+
+	def query(self, region, exact=False):
+		# item indices that touch a region; exact=True tests polygon geometry
+		# instead of the bounding box for polygons and paths
+		polygon = region_polygon(region)
+		(x0, y0), (x1, y1) = polygon.bounding_box()
+		hits = self.tree.query((x0, y0, x1, y1))
+		if is_rectangle(polygon) and not exact:
+			return hits
+		keep = []
+		for i in hits:
+			kind, obj, _ = self.items[i]
+			if exact and kind == "polygon":
+				hit = len(gdstk.boolean(obj, polygon, "and")) > 0
+			elif exact and kind == "path":
+				hit = len(gdstk.boolean(obj.to_polygons(), polygon, "and")) > 0
+			elif kind == "label":
+				hit = gdstk.inside([obj.origin], polygon)[0]
+			else:
+				hit = box_hits_polygon(self.boxes[i], polygon)
+			if hit:
+				keep.append(i)
+		return np.array(keep, dtype=int)
+
+def exclude_regions(cell, regions, exact=False):
+	# removes every item (and array element) of cell that touches a region;
+	# returns the list of removed items as (kind, object, element index)
+	index = ItemIndex(cell)
+	hits = set()
+	for region in regions:
+		hits.update(int(i) for i in index.query(region, exact))
+	removed = [index.items[i] for i in sorted(hits)]
+	elements = {}
+	for kind, obj, element in removed:
+		if kind == "reference":
+			elements.setdefault(id(obj), (obj, set()))[1].add(element)
+		else:
+			cell.remove(obj)
+	for ref, dropped in elements.values():
+		cell.remove(ref)
+		offsets = reference_offsets(ref)
+		remaining = [i for i in range(len(offsets)) if i not in dropped]
+		if not remaining:
+			continue
+		# keep the other elements as an explicit repetition
+		kept = ref.copy()
+		kept.origin = np.asarray(ref.origin) + offsets[remaining[0]]
+		if len(remaining) == 1:
+			kept.repetition = None
+		else:
+			kept.repetition = gdstk.Repetition(offsets=offsets[remaining[1:]] - offsets[remaining[0]])
+		cell.add(kept)
+	return removed
@@ -0,0 +1,77 @@
+# AIST 2025 streaming GDS rewriter
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Applies a rule table to a GDS file without building a library: cell renames,
+# (layer, datatype) remapping and layer deletion. Structures untouched by the
+# rules are copied as raw slices of the memory-mapped input.
+#
+# rules = {
+#     "rename": {"MAIN_ARRAY": "Sherry_1"},
+#     "remap":  [["130/*", "30/*"], ["136/0", "36/0"]],
+#     "drop":   ["0/*"],
+# }
+# "*" matches any datatype; in a remap target it keeps the datatype.
+#
+# usage: python lib_rewrite.py input.gds output.gds rules.json
+
+import json
+import sys
+
+import lib_gdsscan
+
+def parse_layer(spec):
+	# "30/0", "30/*", "30", [30, 0] or (30, None) -> (layer, datatype or None)
+	if isinstance(spec, str):
+		layer, _, datatype = spec.partition("/")
+		return int(layer), None if datatype in ("", "*") else int(datatype)
+	layer, datatype = spec
+	return int(layer), None if datatype in (None, "*") else int(datatype)
+
+def matches(rule, layer):
+	return rule[0] == layer[0] and rule[1] in (None, layer[1])
+
+def layer_rules(rules, layers):
+	# concrete (drop set, layer map) for the layers present in one structure
+	drop = [parse_layer(spec) for spec in rules.get("drop", [])]
+	remap = [(parse_layer(a), parse_layer(b)) for a, b in rules.get("remap", [])]
+	dropped = set()
+	layer_map = {}
+	for layer in layers:
+		if any(matches(rule, layer) for rule in drop):
+			dropped.add(layer)
+			continue
+		for source, target in remap:
+			if matches(source, layer):
+				layer_map[layer] = (target[0], layer[1] if target[1] is None else target[1])
+				break
+	return dropped, layer_map
+
+def copy_structure(writer, scan, name, rules, new_name=None, rename=None):
+	# copies one structure applying the layer rules; new_name/rename default to rules["rename"]
+	rename = rules.get("rename", {}) if rename is None else rename
+	new_name = new_name or rename.get(name, name)
+	dropped, layer_map = layer_rules(rules, scan.structures[name].layers)
+	keep_element = None
+	if dropped:
+		keep_element = lambda element: lib_gdsscan.element_layer(element) not in dropped
+	writer.copy(scan, name, new_name, rename, keep_element, layer_map)
+
+def rewrite_structures(scan, writer, rules, names=None):
+	# copies the structures of scan (default: all) into writer applying rules
+	for name in names if names is not None else scan.structures:
+		copy_structure(writer, scan, name, rules)
+
+def rewrite(input_filename, output_filename, rules):
+	with lib_gdsscan.GdsScan(input_filename) as scan:
+		with lib_gdsscan.GdsWriter(output_filename, scan.units, scan.libname) as writer:
+			rewrite_structures(scan, writer, rules)
+
+if __name__ == "__main__":
+	if len(sys.argv) != 4:
+		print("usage: python lib_rewrite.py input.gds output.gds rules.json")
+		sys.exit(1)
+	with open(sys.argv[3]) as f:
+		rules = json.load(f)
+	rewrite(sys.argv[1], sys.argv[2], rules)
+	print(f"[out] saved rewritten GDS as '{sys.argv[2]}'")
@@ -0,0 +1,83 @@
+# AIST 2025 spatial index
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Static R-tree over axis-aligned boxes, bulk loaded with Sort-Tile-Recursive
+# packing. Every level is a flat numpy array of node boxes whose children are
+# consecutive runs of node_size entries of the level below, so a query walks
+# the levels with vectorized box tests: O(k log n) for k hits.
+
+import numpy as np
+
+def as_boxes(bboxes):
+	# gdstk style ((xmin, ymin), (xmax, ymax)) or (n, 4) -> (n, 4) float array
+	boxes = np.asarray(bboxes, dtype=float)
+	return boxes.reshape(-1, 4)
+
+def overlaps(boxes, box):
+	# inclusive box test, touching boxes overlap
+	return ~(
+		(boxes[:, 2] < box[0]) | (boxes[:, 0] > box[2]) |
+		(boxes[:, 3] < box[1]) | (boxes[:, 1] > box[3])
+	)
+
+class RTree:
+	def __init__(self, bboxes, node_size=16):
+		boxes = as_boxes(bboxes)
+		self.size = len(boxes)
+		self.node_size = node_size
+		self.order = str_order(boxes, node_size)
+		self.levels = [boxes[self.order]] # levels[0]: items in leaf order, levels[-1]: root
+		while len(self.levels[-1]) > node_size:
+			below = self.levels[-1]
+			count = (len(below) + node_size - 1) // node_size
+			starts = np.arange(count) * node_size
+			self.levels.append(np.concatenate([
+				np.minimum.reduceat(below[:, :2], starts),
+				np.maximum.reduceat(below[:, 2:], starts),
+			], axis=1))
+
+	def query(self, bbox):
+		# indices of the boxes that overlap bbox, in input order numbering
+		if self.size == 0:
+			return np.zeros(0, dtype=int)
+		box = as_boxes(bbox)[0]
+		level = len(self.levels) - 1
+		nodes = np.arange(len(self.levels[level]))
+		while True:
+			nodes = nodes[overlaps(self.levels[level][nodes], box)]
+			if level == 0 or len(nodes) == 0:
+				break
+			# children of the surviving nodes
+			level -= 1
+			first = nodes * self.node_size
+			counts = np.minimum(first + self.node_size, len(self.levels[level])) - first
+			nodes = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+		return np.sort(self.order[nodes])
+
+	def query_pairs(self, other_boxes, expand=0.0):
+		# (i, j) pairs with box i of this tree overlapping other box j grown by expand
+		other = as_boxes(other_boxes)
+		i_list = []
+		j_list = []
+		for j, box in enumerate(other):
+			hits = self.query(box + [-expand, -expand, expand, expand])
+			i_list.append(hits)
+			j_list.append(np.full(len(hits), j))
+		if not i_list:
+			return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+		return np.concatenate(i_list), np.concatenate(j_list)
+
+def str_order(boxes, node_size):
+	# Sort-Tile-Recursive: vertical slices by x center, then y center inside each slice
+	n = len(boxes)
+	if n == 0:
+		return np.zeros(0, dtype=int)
+	cx = (boxes[:, 0] + boxes[:, 2]) / 2
+	cy = (boxes[:, 1] + boxes[:, 3]) / 2
+	leaves = (n + node_size - 1) // node_size
+	slices = int(np.ceil(np.sqrt(leaves)))
+	slice_size = slices * node_size
+	by_x = np.argsort(cx, kind="stable")
+	slice_id = np.arange(n) // slice_size
+	return by_x[np.lexsort((cy[by_x], slice_id))]
@@ -0,0 +1,111 @@
+# AIST 2025 tiling helpers
+# created on: 2026/10/19
+# last change: 2026/10/19
+
+# Regular tile grid over a chip, vectorized assignment of polygons to tiles
+# (with optional halo) and a process pool runner that keeps only a bounded
+# number of tiles in flight, so chip-scale jobs run in bounded memory.
+
+import collections
+import concurrent.futures
+import math
+
+import numpy as np
+
+def polygon_boxes(polygons):
+	# (n, 4) bounding boxes of point arrays
+	if len(polygons) == 0:
+		return np.zeros((0, 4))
+	return np.array([np.concatenate([p.min(axis=0), p.max(axis=0)]) for p in polygons])
+
+class TileGrid:
+	def __init__(self, bbox, tile_size, precision=1e-3):
+		# tile edges are snapped to the database grid, so that neighbouring
+		# tiles share exactly the same cut lines and stitch without slivers
+		(x0, y0), (x1, y1) = bbox
+		self.precision = precision
+		self.tile_size = max(1, round(tile_size / precision)) * precision
+		self.x0 = math.floor(x0 / precision) * precision
+		self.y0 = math.floor(y0 / precision) * precision
+		self.nx = max(1, math.ceil((x1 - self.x0) / self.tile_size))
+		self.ny = max(1, math.ceil((y1 - self.y0) / self.tile_size))
+
+	def __len__(self):
+		return self.nx * self.ny
+
+	def box(self, tile, halo=0):
+		# (xmin, ymin, xmax, ymax) of tile index tile = i + nx*j
+		i, j = tile % self.nx, tile // self.nx
+		return (
+			round((self.x0 + i*self.tile_size - halo) / self.precision) * self.precision,
+			round((self.y0 + j*self.tile_size - halo) / self.precision) * self.precision,
+			round((self.x0 + (i+1)*self.tile_size + halo) / self.precision) * self.precision,
+			round((self.y0 + (j+1)*self.tile_size + halo) / self.precision) * self.precision,
+		)
+
+	def cover(self, boxes, halo=0):
+		# (tile, item) index pairs, sorted by tile, for boxes touching each
+		# tile grown by halo
+		boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+		ix0 = np.clip(np.floor((boxes[:, 0] - halo - self.x0) / self.tile_size), 0, self.nx - 1).astype(int)
+		iy0 = np.clip(np.floor((boxes[:, 1] - halo - self.y0) / self.tile_size), 0, self.ny - 1).astype(int)
+		ix1 = np.clip(np.floor((boxes[:, 2] + halo - self.x0) / self.tile_size), 0, self.nx - 1).astype(int)
+		iy1 = np.clip(np.floor((boxes[:, 3] + halo - self.y0) / self.tile_size), 0, self.ny - 1).astype(int)
+		w = ix1 - ix0 + 1
+		counts = w * (iy1 - iy0 + 1)
+		item = np.repeat(np.arange(len(boxes)), counts)
+		k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+		tile = (ix0[item] + k % w[item]) + self.nx * (iy0[item] + k // w[item])
+		order = np.argsort(tile, kind="stable")
+		return tile[order], item[order]
+
+	def assign(self, boxes, halo=0):
+		# {tile: item indices} for boxes touching each tile grown by halo
+		tile, item = self.cover(boxes, halo)
+		if len(tile) == 0:
+			return {}
+		starts = np.flatnonzero(np.r_[True, tile[1:] != tile[:-1]])
+		return {int(t): items for t, items in zip(tile[starts], np.split(item, starts[1:]))}
+
+def box_pairs(boxes, distance=0, size=None):
+	# (i, j), i < j, of boxes that overlap (or touch) when each is grown by
+	# distance/2, found through a grid hash with bins of size (default: the
+	# median box size, at least 2*distance)
+	boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+	if len(boxes) < 2:
+		return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+	if size is None:
+		size = max(2 * distance, float(np.median(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]))))
+	grid = TileGrid((boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)), size)
+	tile, item = grid.cover(boxes, distance / 2)
+	# all pairs inside each bin: entry e is paired with the following entries of its bin
+	ends = np.searchsorted(tile, tile, side="right")
+	counts = ends - np.arange(len(tile)) - 1
+	first = np.repeat(np.arange(len(tile)), counts)
+	second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+	i = np.minimum(item[first], item[second])
+	j = np.maximum(item[first], item[second])
+	pairs = np.unique(i * len(boxes) + j)
+	i, j = pairs // len(boxes), pairs % len(boxes)
+	keep = ~(
+		(boxes[i, 2] + distance < boxes[j, 0]) | (boxes[j, 2] + distance < boxes[i, 0]) |
+		(boxes[i, 3] + distance < boxes[j, 1]) | (boxes[j, 3] + distance < boxes[i, 1])
+	)
+	return i[keep], j[keep]
+
+def run_tiles(func, jobs, processes=None, in_flight=None):
+	# yields func(job) in job order; jobs may be a generator, at most in_flight
+	# jobs are materialized at once. processes=1 runs serially in this process.
+	if processes == 1:
+		for job in jobs:
+			yield func(job)
+		return
+	with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+		in_flight = in_flight or 4 * pool._max_workers
+		pending = collections.deque()
+		for job in jobs:
+			pending.append(pool.submit(func, job))
+			if len(pending) >= in_flight:
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()